@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: AsyncSnifferDevice timeout check, lost responses and failed transmits against the NCJ29D5 emulator
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import asyncio
+import sys
+
+from console_helper import *
+from ncj29d5_emulator import *
+from AsyncSnifferDevice import *
+
+class _LossyEmulator(Ncj29d5Emulator):
+    '''
+        @brief loses the next lost_responses responses / lost_resets reset notifications, fails the next failed_transmits
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lost_responses = 0
+        self.lost_resets = 0
+        self.failed_transmits = 0
+
+    def _respond(self, gid: int, oid: int, status: EnumUciStatus, ready: float, payload=b''):
+        if self.lost_responses > 0:
+            self.lost_responses -= 1
+            return
+        super()._respond(gid, oid, status, ready, payload)
+
+    def hard_reset(self):
+        if self.lost_resets > 0:
+            self.lost_resets -= 1
+            return
+        super().hard_reset()
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        if self.failed_transmits > 0:
+            self.failed_transmits -= 1
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT, b'', False)
+        return super().transmit_uci_command(msg, append_crc, timeout_ms)
+
+async def _run(late_response_ms: int) -> dict:
+    emulator = _LossyEmulator(EmulatorTraffic(frame_rate_hz=10), EmulatorTiming(reset_time_s=0), seed=1)
+    results = {}
+    async with AsyncSnifferDevice(emulator, late_response_ms=late_response_ms) as sniffer:
+        await sniffer.hard_reset()
+        # a response which never arrives, then the next command of the same OID after late_response_ms
+        emulator.lost_responses = 1
+        results['lost response'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        await asyncio.sleep(late_response_ms / 1000)
+        results['next command'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        results['next but one'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        # a command not transmitted has no response to wait for
+        emulator.failed_transmits = 1
+        results['failed transmit'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        results['after transmit'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        # a lost reset notification does not take the next one
+        emulator.lost_resets = 1
+        results['lost reset'] = (await sniffer.hard_reset()).status
+        results['next reset'] = (await sniffer.hard_reset()).status
+        # a lost response, the next command comes at once, the reset forgets the lost response
+        emulator.lost_responses = 1
+        results['lost before reset'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        await sniffer.hard_reset()
+        results['after reset'] = (await sniffer.sniffer_cfg_ranging_app(9, 14)).status
+        log_i(str(sniffer.stats))
+    return results
+
+_EXPECTED = {'lost response': EnumUciStatus.UCI_STATUS_FAILED, 'next command': EnumUciStatus.UCI_STATUS_OK,
+             'next but one': EnumUciStatus.UCI_STATUS_OK, 'failed transmit': EnumUciStatus.UCI_STATUS_FAILED,
+             'after transmit': EnumUciStatus.UCI_STATUS_OK, 'lost reset': EnumUciStatus.UCI_STATUS_FAILED,
+             'next reset': EnumUciStatus.UCI_STATUS_REBOOT, 'lost before reset': EnumUciStatus.UCI_STATUS_FAILED,
+             'after reset': EnumUciStatus.UCI_STATUS_OK}
+
+def run(late_response_ms=100) -> dict:
+    '''
+        @return: dict of step -> (status, expected status)
+    '''
+    results = asyncio.run(_run(late_response_ms))
+    return {step: (results[step], expected) for step, expected in _EXPECTED.items()}
+
+def main() -> int:
+    failed = False
+    for step, (status, expected) in run().items():
+        log_i(f"{step:>18}: {EnumUciStatus(status).name}")
+        if status != expected:
+            log_e(f"{step}: {EnumUciStatus(status).name}, expected {expected.name}")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
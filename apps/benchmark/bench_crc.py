@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: CRC16 micro-benchmark, table-driven nxp_crc against the crcengine based implementation
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import timeit
+
+import nxp_crc
+from console_helper import *
+
+try:
+    import crcengine
+except ImportError:
+    crcengine = None
+
+def legacy_calculate_crc(frame: list[int]) -> int:
+    ''' previous nxp_crc.calculate_crc, builds the crc engine on every call '''
+    return crcengine.new('crc16-xmodem').calculate(frame)
+
+def run(frame_len=40, number=20000) -> dict:
+    '''
+        @brief time the crc of one frame_len bytes frame, number times per variant
+        @return: dict of variant -> ns per frame
+    '''
+    frame = bytes(i & 0xFF for i in range(frame_len))
+    frame_list = list(frame)
+    frame_view = memoryview(bytearray(frame))
+    variants = {
+        'nxp_crc_bytes': lambda: nxp_crc.calculate_crc(frame),
+        'nxp_crc_memoryview': lambda: nxp_crc.calculate_crc(frame_view),
+        'nxp_crc_list': lambda: nxp_crc.calculate_crc(frame_list),
+        'nxp_crc_chunked': lambda: nxp_crc.calculate_crc(frame_view[4:], nxp_crc.calculate_crc(frame_view[:4])),
+    }
+    if crcengine is not None:
+        assert legacy_calculate_crc(frame_list) == nxp_crc.calculate_crc(frame)
+        variants['crcengine_legacy'] = lambda: legacy_calculate_crc(frame_list)
+    results = {}
+    for name, func in variants.items():
+        results[name] = min(timeit.repeat(func, number=number, repeat=3)) / number * 1e9
+    batch = [frame] * 1000
+    results['nxp_crc_batch'] = min(timeit.repeat(lambda: nxp_crc.calculate_crc_batch(batch), number=number // 1000 or 1, repeat=3)) \
+        / ((number // 1000 or 1) * len(batch)) * 1e9
+    return results
+
+def main():
+    for frame_len in [8, 40, 259]:
+        results = run(frame_len)
+        log_i(f"CRC16 frame length {frame_len} bytes:")
+        for name, ns in results.items():
+            log_i(f"  {name:>20}: {ns:10.1f} ns/frame")
+    if crcengine is None:
+        log_w("crcengine not installed, legacy implementation skipped")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: frame path benchmark, received frame -> UCILayer.wait_response -> SnifferRxResult
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import time
+import tracemalloc
+
+from console_helper import *
+from uci_port import *
+from uci_defs import *
+from uci_layer import UCILayer
+from uci_sniffer_rx_rsp import *
+
+def build_rx_mode_rsp_frame(psdu_len=20) -> bytes:
+    '''
+        @brief a SNIFFER_START_RX_MODE_RSP frame, UCI header + payload
+    '''
+    rssi = lambda dbm: round(dbm / SNIFFER_RSSI_SCALE)
+    payload = SNIFFER_RX_RESULT_STRUCT.pack(EnumUciStatus.UCI_STATUS_OK.value, 0, 1, 0,
+                                            rssi(-80), rssi(-70), rssi(-100), rssi(-95), psdu_len)
+    payload += bytes(range(psdu_len))
+    header = bytes([(EnumUciMessageType.UCI_MT_RESPONSE << 5) | EnumUciGid.UWB_SNIFFER_GID.value,
+                    EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value, 0, len(payload)])
+    return header + payload
+
+class ReplayUCIDevice(UCIDevice):
+    '''
+        @brief hands out the same frame on every receive, as list[int] (previous data path) or as memoryview
+    '''
+    def __init__(self, frame: bytes, as_list=False):
+        super().__init__(None, EnumUCIPortType.UCI_INTF_ABSTRACT)
+        self.frame = frame
+        self.as_list = as_list
+
+    def open(self):
+        return self
+
+    def close(self):
+        return True
+
+    def hard_reset(self):
+        pass
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, b'', False)
+
+    def receive_uci_message(self, timeout_ms=200, crc_enabled=False) -> UCIPortResult:
+        # a fresh buffer per frame, like the SPI transfer returns
+        frame = bytearray(self.frame)
+        if self.as_list:
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, list(frame), True)
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, memoryview(frame), True)
+
+def run(frames=20000, psdu_len=20) -> dict:
+    '''
+        @return: dict of path -> {'ns_per_frame', 'peak_bytes_per_frame'}
+    '''
+    frame = build_rx_mode_rsp_frame(psdu_len)
+    results = {}
+    for name, as_list in [('list', True), ('memoryview', False)]:
+        layer = UCILayer(ReplayUCIDevice(frame, as_list))
+        start = time.perf_counter_ns()
+        for _ in range(frames):
+            layer.wait_response()
+        elapsed_ns = time.perf_counter_ns() - start
+        tracemalloc.start()
+        peak = 0
+        for _ in range(1000):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            result = layer.wait_response()
+            peak += tracemalloc.get_traced_memory()[1] - base
+            del result
+        tracemalloc.stop()
+        results[name] = {'ns_per_frame': elapsed_ns / frames, 'peak_bytes_per_frame': peak / 1000}
+    return results
+
+def main():
+    for psdu_len in [20, 127]:
+        results = run(psdu_len=psdu_len)
+        log_i(f"frame path, PSDU length {psdu_len} bytes:")
+        for name, result in results.items():
+            log_i(f"  {name:>10}: {result['ns_per_frame']:10.1f} ns/frame, {result['peak_bytes_per_frame']:8.1f} bytes allocated/frame")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: decode throughput benchmark of the sniffer response classes
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import math
+import struct
+import timeit
+
+from console_helper import *
+from uci_defs import *
+from uci_sniffer_rx_rsp import *
+
+def legacy_rx_result_from_bytes(byte_stream):
+    ''' previous SnifferRxResult.from_bytes, one struct.unpack per field '''
+    if not isinstance(byte_stream, bytes):
+        byte_stream = bytes(byte_stream)
+    status = struct.unpack("<B", byte_stream[0:1])[0]
+    rx_status = struct.unpack("<H", byte_stream[4:6])[0]
+    rx_frame_num = struct.unpack("<B", byte_stream[6:7])[0]
+    rx_err_num = struct.unpack("<B", byte_stream[7:8])[0]
+    min_overall_rssi = struct.unpack("<i", byte_stream[8:12])[0] * 10 * math.log10(2) / (2 ** 25)
+    max_overall_rssi = struct.unpack("<i", byte_stream[16:20])[0] * 10 * math.log10(2) / (2 ** 25)
+    min_noise_rssi = struct.unpack("<i", byte_stream[20:24])[0] * 10 * math.log10(2) / (2 ** 25)
+    max_noise_rssi = struct.unpack("<i", byte_stream[28:32])[0] * 10 * math.log10(2) / (2 ** 25)
+    payload_len = struct.unpack("<B", byte_stream[32:33])[0]
+    payload = byte_stream[33:33 + payload_len]
+    return (status, rx_status, rx_frame_num, rx_err_num, min_overall_rssi, max_overall_rssi,
+            min_noise_rssi, max_noise_rssi, payload_len, payload)
+
+def legacy_ranging_result_from_bytes(byte_stream):
+    ''' previous SnifferRangingResult.from_bytes, one struct.unpack per element '''
+    if not isinstance(byte_stream, bytes):
+        byte_stream = bytes(byte_stream)
+    rx_result_list = []
+    for i in range(round((len(byte_stream)-4)/4) - 1):
+        rx_result_list.append(struct.unpack("<I", byte_stream[4+4*i:8+4*i])[0])
+    return rx_result_list
+
+def build_rx_result_payload(psdu_len=20) -> bytes:
+    rssi = lambda dbm: round(dbm / SNIFFER_RSSI_SCALE)
+    return SNIFFER_RX_RESULT_STRUCT.pack(EnumUciStatus.UCI_STATUS_OK.value, 0, 1, 0,
+                                         rssi(-80), rssi(-70), rssi(-100), rssi(-95), psdu_len) + bytes(psdu_len)
+
+def _read_status(rx_result):
+    return rx_result.status, rx_result.rx_status
+
+def _read_fields(rx_result):
+    return rx_result.min_overall_rssi, rx_result.max_overall_rssi, rx_result.min_noise_rssi, \
+        rx_result.max_noise_rssi, rx_result.payload
+
+def run(number=20000, psdu_len=20, sequence_len=32) -> dict:
+    '''
+        @return: dict of decoder -> frames per second
+    '''
+    rx_payload = build_rx_result_payload(psdu_len)
+    rx_view = memoryview(bytearray(rx_payload))
+    rx_list = list(rx_payload)
+    ranging_payload = bytes(4) + struct.pack(f'<{sequence_len + 1}I', *range(sequence_len + 1))
+    ranging_view = memoryview(bytearray(ranging_payload))
+    variants = {
+        'rx_result_legacy_list': lambda: legacy_rx_result_from_bytes(rx_list),
+        'rx_result_list': lambda: SnifferRxResult.from_bytes(rx_list),
+        'rx_result_memoryview': lambda: SnifferRxResult.from_bytes(rx_view),
+        # filter pipelines only look at the status fields of most frames
+        'rx_result_status_eager': lambda: _read_status(SnifferRxResult.from_bytes(rx_view)),
+        'rx_result_status_lazy': lambda: _read_status(LazySnifferRxResult.from_bytes(rx_view)),
+        'rx_result_fields_eager': lambda: _read_fields(SnifferRxResult.from_bytes(rx_view)),
+        'rx_result_fields_lazy': lambda: _read_fields(LazySnifferRxResult.from_bytes(rx_view)),
+        'ranging_result_legacy': lambda: legacy_ranging_result_from_bytes(ranging_payload),
+        'ranging_result_memoryview': lambda: SnifferRangingResult.from_bytes(ranging_view),
+        'ranging_status_memoryview': lambda: SnifferRangingStatusResult.from_bytes(ranging_view),
+    }
+    results = {}
+    for name, func in variants.items():
+        results[name] = number / min(timeit.repeat(func, number=number, repeat=3))
+    return results
+
+def main():
+    results = run()
+    log_i("sniffer response decode throughput:")
+    for name, frames_per_s in results.items():
+        log_i(f"  {name:>26}: {frames_per_s:12.0f} frames/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: continuous rx benchmark, SnifferDevice.stream_rx against the NCJ29D5 emulator
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import time
+
+from console_helper import *
+from ncj29d5_emulator import *
+from SnifferDevice import *
+
+def run(frame_rate_hz=1000, frames=1000, seed=1) -> dict:
+    '''
+        @brief receive frames from the emulated sniffer with FT4222 timing
+        @return: dict of setup -> {'frames_per_s', 'missed_ratio', 'mean_rearm_gap_us', 'max_rearm_gap_us'}
+    '''
+    setups = [
+        ('1 cycle immediate', 1, EnumSnifferRxRearmMode.SNIFFER_RX_REARM_IMMEDIATE),
+        ('1 cycle deferred', 1, EnumSnifferRxRearmMode.SNIFFER_RX_REARM_DEFERRED),
+        ('8 cycles immediate', 8, EnumSnifferRxRearmMode.SNIFFER_RX_REARM_IMMEDIATE),
+    ]
+    results = {}
+    for name, rx_cycles, rearm in setups:
+        emulator = Ncj29d5Emulator(EmulatorTraffic(frame_rate_hz=frame_rate_hz), EmulatorTiming(reset_time_s=0), seed=seed)
+        sniffer = SnifferDevice(emulator)
+        sniffer.sniffer_cfg_ranging_app(9, 14)
+        start = time.perf_counter()
+        for result in sniffer.stream_rx(10, 2, rx_cycles=rx_cycles, rx_timeout_us=100000, rearm=rearm, max_frames=frames):
+            pass
+        elapsed = time.perf_counter() - start
+        stats = sniffer.rx_stream_stats
+        results[name] = {'frames_per_s': stats.frames / elapsed,
+                         'missed_ratio': emulator.stats.missed_frames / max(emulator.stats.air_frames, 1),
+                         'mean_rearm_gap_us': stats.mean_gap_us,
+                         'max_rearm_gap_us': stats.gap_max_s * 1e6}
+    return results
+
+def main():
+    for frame_rate_hz in [200, 1000]:
+        results = run(frame_rate_hz=frame_rate_hz)
+        log_i(f"stream_rx, {frame_rate_hz} frames/s on the air:")
+        for name, result in results.items():
+            log_i(f"  {name:>18}: {result['frames_per_s']:8.1f} frames/s, {result['missed_ratio'] * 100:5.1f} % missed, "
+                  + f"re-arm gap {result['mean_rearm_gap_us']:8.1f} us mean, {result['max_rearm_gap_us']:8.1f} us max")
+
+if __name__ == '__main__':
+    main()
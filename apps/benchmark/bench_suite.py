@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: benchmark suite of the UCI host stack, per-stage costs, end-to-end throughput and command latency,
+       results as JSON, compared against a stored baseline
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+from console_helper import *
+from uci_defs import *
+from ncj29d5_emulator import *
+from SnifferDevice import *
+
+import bench_crc
+import bench_frame_path
+import bench_sniffer_decode
+import bench_stream_rx
+
+BENCH_SUITE_VERSION = 1
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    '''
+        @param better: 'lower' or 'higher'
+    '''
+    return {'value': value, 'unit': unit, 'better': better}
+
+@contextlib.contextmanager
+def _quiet():
+    # the response callbacks log every command, keep the console out of the measurement
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def bench_uci_message(number=20000) -> dict:
+    payload = list(bench_sniffer_decode.build_rx_result_payload())
+    frame = memoryview(bytearray(bench_frame_path.build_rx_mode_rsp_frame()))
+    encode = lambda: UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                                EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, len(payload), payload).to_byte_stream()
+    decode = lambda: UciMessage.from_bytes(frame)
+    return {
+        'uci_message.encode': _metric(min(timeit.repeat(encode, number=number, repeat=3)) / number * 1e9, 'ns', 'lower'),
+        'uci_message.decode': _metric(min(timeit.repeat(decode, number=number, repeat=3)) / number * 1e9, 'ns', 'lower'),
+    }
+
+def bench_crc_stage() -> dict:
+    return {f'crc.{name}': _metric(ns, 'ns', 'lower') for name, ns in bench_crc.run().items()
+            if name != 'crcengine_legacy'}
+
+def bench_decode_stage() -> dict:
+    return {f'decode.{name}': _metric(frames_per_s, 'frames/s', 'higher')
+            for name, frames_per_s in bench_sniffer_decode.run().items() if 'legacy' not in name}
+
+def bench_dispatch_stage() -> dict:
+    results = {}
+    for name, result in bench_frame_path.run().items():
+        results[f'dispatch.{name}'] = _metric(result['ns_per_frame'], 'ns', 'lower')
+        results[f'dispatch.{name}.allocated'] = _metric(result['peak_bytes_per_frame'], 'bytes', 'lower')
+    return results
+
+def bench_end_to_end(frames=5000) -> dict:
+    '''
+        @brief stream_rx frames/s, host only (emulator without timing) and with the FT4222 timing
+    '''
+    emulator = Ncj29d5Emulator(EmulatorTraffic(frame_rate_hz=1e6), None, seed=1)
+    sniffer = SnifferDevice(emulator)
+    with _quiet():
+        sniffer.sniffer_cfg_ranging_app(9, 14)
+        start = time.perf_counter()
+        for result in sniffer.stream_rx(10, 2, rx_cycles=8, max_frames=frames):
+            pass
+        elapsed = time.perf_counter() - start
+    results = {'end_to_end.stream_rx_host': _metric(frames / elapsed, 'frames/s', 'higher')}
+    with _quiet():
+        emulated = bench_stream_rx.run(frame_rate_hz=1000, frames=500)
+    for name, result in emulated.items():
+        results[f"end_to_end.stream_rx_emulated.{name.replace(' ', '_')}"] = _metric(result['frames_per_s'], 'frames/s', 'higher')
+    return results
+
+def bench_command_latency(repeat=200) -> dict:
+    '''
+        @brief round trip of every SnifferDevice command method against the emulator without timing, median in us
+    '''
+    emulator = Ncj29d5Emulator(EmulatorTraffic(frame_rate_hz=1e6), None, seed=1)
+    sniffer = SnifferDevice(emulator)
+    # the repeated configs would be skipped by the config cache, every call has to reach the emulator
+    sniffer.set_config_cache(False)
+    ranging_cmd = []
+    for index in range(4):
+        ranging_cmd += sniffer.sniffer_generate_ranging_cmd(9, 0, 0, 100, index)
+    commands = {
+        'sniffer_cfg_ranging_app': lambda: sniffer.sniffer_cfg_ranging_app(9, 14),
+        'sniffer_cfg_rx_mode': lambda: sniffer.sniffer_cfg_rx_mode(10, 2),
+        'sniffer_start_rx_mode': lambda: sniffer.sniffer_start_rx_mode(),
+        'sniffer_cfg_tx_mode': lambda: sniffer.sniffer_cfg_tx_mode(9, 0, 1, 0),
+        'sniffer_start_tx_mode': lambda: sniffer.sniffer_start_tx_mode([0x11, 0x22, 0x33, 0x44]),
+        'sniffer_cfg_ranging_seq': lambda: sniffer.sniffer_cfg_ranging_seq(ranging_cmd),
+        'sniffer_start_ranging': lambda: sniffer.sniffer_start_ranging(),
+        'sniffer_get_ranging_status': lambda: sniffer.sniffer_get_ranging_status(),
+        'sniffer_get_ranging_result': lambda: sniffer.sniffer_get_ranging_result(),
+        'sniffer_get_payload': lambda: sniffer.sniffer_get_payload(0),
+    }
+    results = {}
+    with _quiet():
+        for name, command in commands.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                command()
+                samples.append(time.perf_counter() - start)
+            results[f'command.{name}'] = _metric(statistics.median(samples) * 1e6, 'us', 'lower')
+    return results
+
+def run() -> dict:
+    '''
+        @return: dict of metric name -> {'value', 'unit', 'better'}
+    '''
+    results = {}
+    for stage in [bench_uci_message, bench_crc_stage, bench_decode_stage, bench_dispatch_stage,
+                  bench_end_to_end, bench_command_latency]:
+        results.update(stage())
+    return results
+
+def compare(results: dict, baseline: dict, threshold_percent: float) -> list:
+    '''
+        @return: list of (name, baseline value, value, change in percent) of the metrics which got worse
+                 by more than threshold_percent, metrics missing on either side are skipped
+    '''
+    regressions = []
+    for name, metric in results.items():
+        if name not in baseline or baseline[name]['value'] == 0:
+            continue
+        reference = baseline[name]['value']
+        change = (metric['value'] - reference) / reference * 100
+        worse = change if metric['better'] == 'lower' else -change
+        if worse > threshold_percent:
+            regressions.append((name, reference, metric['value'], change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="UCI host stack benchmark suite")
+    parser.add_argument('--output', default='bench_results.json', help="JSON file of the results")
+    parser.add_argument('--baseline', help="JSON file of a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    results = run()
+    with open(args.output, 'w') as file:
+        json.dump({'version': BENCH_SUITE_VERSION,
+                   'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'results': results}, file, indent=2)
+    for name, metric in results.items():
+        log_i(f"  {name:>52}: {metric['value']:14.1f} {metric['unit']}")
+    log_i(f"results written to {args.output}")
+
+    if args.baseline is None:
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        log_i(f"no regression above {args.threshold:.1f} % against {args.baseline}")
+        return
+    for name, reference, value, change in regressions:
+        log_e(f"regression {name}: {reference:.1f} -> {value:.1f} {results[name]['unit']} ({change:+.1f} %)")
+    sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: time-share capture check, sniffer_capture switching targets against the NCJ29D5 emulator
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import sys
+import threading
+import time
+
+from console_helper import *
+from ncj29d5_emulator import *
+from SnifferOrchestrator import *
+
+class _BatchCounter():
+    '''
+        @brief stands in for the pipe of a worker, counts the records of the batches
+    '''
+    def __init__(self):
+        self.frames = 0
+        self.records = 0
+        self.switches = 0
+        self.last_target = None
+
+    def send_bytes(self, data):
+        view = memoryview(data)
+        offset = 1
+        while offset < len(view):
+            _, target_index, length = SNIFFER_BATCH_RECORD_STRUCT.unpack_from(view, offset)
+            offset += SNIFFER_BATCH_RECORD_STRUCT.size
+            if view[offset] == EnumUciStatus.UCI_STATUS_OK.value:
+                self.frames += 1
+            if self.last_target is not None and target_index != self.last_target:
+                self.switches += 1
+            self.last_target = target_index
+            self.records += 1
+            offset += length
+
+def run(frame_rate_hz=200, duration_s=2.0, dwell_ms=50, seed=1) -> dict:
+    '''
+        @brief capture three targets in turn for duration_s with every time-share policy
+        @return: dict of policy name -> {'captured', 'received', 'switches'}, captured frames have to match
+                 the frames the emulator received
+    '''
+    targets = [SnifferTarget(5, 0, 9), SnifferTarget(9, 2, 10), SnifferTarget(9, 0, 12, weight=2)]
+    results = {}
+    for policy in EnumSnifferTimeSharePolicy:
+        emulator = Ncj29d5Emulator(EmulatorTraffic(frame_rate_hz=frame_rate_hz), EmulatorTiming(reset_time_s=0), seed=seed)
+        sniffer = SnifferDevice(emulator)
+        sniffer.set_lazy_decode(True)
+        sniffer.hard_reset()
+        sniffer.wait_response(timeout_ms=200)
+        counter = _BatchCounter()
+        stop_event = threading.Event()
+        capture = threading.Thread(target=sniffer_capture, args=(sniffer, targets, counter, stop_event),
+                                   kwargs={'policy': policy, 'dwell_ms': dwell_ms, 'max_dwell_ms': 4 * dwell_ms})
+        capture.start()
+        time.sleep(duration_s)
+        stop_event.set()
+        capture.join()
+        results[policy.name] = {'captured': counter.frames, 'received': emulator.stats.rx_frames,
+                                'switches': counter.switches}
+    return results
+
+def main() -> int:
+    failed = False
+    for name, result in run().items():
+        lost = result['received'] - result['captured']
+        log_i(f"{name:>32}: {result['captured']:5d} of {result['received']:5d} received frames captured, "
+              + f"{result['switches']:4d} switches")
+        if lost != 0:
+            log_e(f"{name}: {lost} received frames not captured")
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
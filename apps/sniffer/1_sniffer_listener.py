@@ -9,6 +9,7 @@
                        All rights reserved
 """
 
+import argparse
 import sys
 from nxp_ft4222h import *
 from console_helper import *
@@ -19,8 +20,17 @@ from uci_defs import *
 from uci_layer import *
 from SnifferDevice import *
 from SnifferRegionParams import *
+from SnifferPcapWriter import *
+from SnifferWarmBoot import *
 
 def main():
+    parser = argparse.ArgumentParser(description="sniffer listener demo script")
+    parser.add_argument('pcap', nargs='?', help="optional pcapng file of the sniffed frames")
+    parser.add_argument('--warm-boot', action='store_true',
+                        help="store the config on the dongle (NVM) and skip it on the next run, "
+                             + "the profile is recorded in ~/.python_sniffer_profiles.json")
+    args = parser.parse_args()
+
     print_forthink_logo()
     log_i("**************************************************************")
     log_i("Start of sniffer listener demo script...")
@@ -38,13 +48,6 @@ def main():
     # register and initialize sniffer Device (include UCI layer)
     sniffer_app = SnifferDevice(dongle.ft4222_device)
 
-    # hard reset UWB Device, activate the device
-    sniffer_app.device.hard_reset()
-    result = sniffer_app.wait_response(timeout_ms=200)
-
-    if result.status is not EnumUciStatus.UCI_STATUS_REBOOT:
-        log_e(": " + str(result.status))
-
     # python-uwbzero uwbmac_fira_ranging app parameter
     sniffer_param = SnifferParam(channel=9)
     sniffer_param.set_sfd_id(2)
@@ -55,18 +58,41 @@ def main():
     # sniffer_param.set_sfd_id(0)
     # sniffer_param.set_preamble_id(9)
 
-    sniffer_app.sniffer_cfg_ranging_app(sniffer_param.channel_id, sniffer_param.tx_power)
-    sniffer_app.sniffer_cfg_rx_mode(sniffer_param.preamble_id, sniffer_param.sfd_id)
+    if args.warm_boot:
+        # hard reset UWB Device, activate the device with the profile stored on the dongle by the last run (warm boot),
+        # or configure and store it (cold boot); stream_rx skips the rx mode config applied here
+        warm_boot = SnifferWarmBoot(sniffer_app)
+        boot_mode = warm_boot.boot('sniffer_listener', sniffer_param)
+        log_i(f"{boot_mode.name}: {warm_boot.stats.last_boot_s * 1e3:.1f} ms")
+    else:
+        # hard reset UWB Device, activate the device
+        sniffer_app.hard_reset()
+        result = sniffer_app.wait_response(timeout_ms=200)
+
+        if result.status is not EnumUciStatus.UCI_STATUS_REBOOT:
+            log_e(": " + str(result.status))
+
+        sniffer_app.sniffer_cfg_ranging_app(sniffer_param.channel_id, sniffer_param.tx_power)
+
+    # optional pcapng capture: python 1_sniffer_listener.py capture.pcapng
+    pcap_writer = SnifferPcapWriter(args.pcap) if args.pcap is not None else None
 
-    # start sniffer listener
+    # start sniffer listener, the rx mode is re-armed as soon as a frame is received
     # may print UCI_PORT_STATUS_ERR_TIMEOUT, just ignore it
-    while True:
-        try:
-            result = sniffer_app.sniffer_start_rx_mode()
+    try:
+        for result in sniffer_app.stream_rx(sniffer_param.preamble_id, sniffer_param.sfd_id,
+                                            rx_cycles=sniffer_param.rx_cycles, rx_timeout_us=sniffer_param.rx_timeout):
             if result.status == EnumUciStatus.UCI_STATUS_OK.value:
-                log_i(str(result.uci_result))
-        except KeyboardInterrupt:
-            break
+                if pcap_writer is not None:
+                    pcap_writer.write(result.uci_result, sniffer_param.channel_id)
+                else:
+                    log_i(str(result.uci_result))
+    except KeyboardInterrupt:
+        pass
+    log_i(str(sniffer_app.rx_stream_stats))
+    if pcap_writer is not None:
+        pcap_writer.close()
+        log_i(str(pcap_writer.stats))
 
     log_i("**************************************************************")
     log_i("End of sniffer listener demo script...")
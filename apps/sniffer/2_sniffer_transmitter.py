@@ -39,7 +39,7 @@ def main():
     sniffer_app = SnifferDevice(dongle.ft4222_device)
 
     # hard reset UWB Device, activate the device
-    sniffer_app.device.hard_reset()
+    sniffer_app.hard_reset()
     result = sniffer_app.wait_response(timeout_ms=200)
 
     if result.status is not EnumUciStatus.UCI_STATUS_REBOOT:
@@ -68,7 +68,7 @@ def main():
                 time.sleep(1)
             except KeyboardInterrupt:
                 break
-        sniffer_app.device.hard_reset()
+        sniffer_app.hard_reset()
 
     log_i("**************************************************************")
     log_i("End of sniffer transmitter demo script...")
@@ -39,7 +39,7 @@ def main():
     sniffer_app = SnifferDevice(dongle.ft4222_device)
 
     # hard reset UWB Device, activate the device
-    sniffer_app.device.hard_reset()
+    sniffer_app.hard_reset()
     result = sniffer_app.wait_response(timeout_ms=200)
 
     if result.status is not EnumUciStatus.UCI_STATUS_REBOOT:
@@ -82,19 +82,18 @@ def main():
         result = sniffer_app.sniffer_start_ranging()    # by default, first frame's timeout is about 16.7s
         if result.status == EnumUciStatus.UCI_STATUS_OK.value:
             log_i("sniffer listener sequence successfully")
-            result = sniffer_app.sniffer_get_ranging_status()
-            log_i(str(result.uci_result))
-            result = sniffer_app.sniffer_get_ranging_result() # get all timestamp difference from first frame's timestamp
-            log_i(str(result.uci_result))
-            for i in range(sniffer_param.tx_num):
-                result = sniffer_app.sniffer_get_payload(i)
+            # ranging status, timestamp differences from the first frame's timestamp and the payloads in one pipeline
+            status_result, ranging_result, payload_results = sniffer_app.sniffer_read_ranging(range(sniffer_param.tx_num))
+            log_i(str(status_result.uci_result))
+            log_i(str(ranging_result.uci_result))
+            for i, result in enumerate(payload_results):
                 if result.uci_result.status == EnumUciStatus.UCI_STATUS_OK.value:
                     log_i(f"get payload {i}:")
                     log_i(str(result.uci_result))
         else:
             log_i("sniffer listener sequence failed")
     except KeyboardInterrupt:
-        sniffer_app.device.hard_reset()
+        sniffer_app.hard_reset()
 
     log_i("**************************************************************")
     log_i("End of sniffer listener sequence demo script...")
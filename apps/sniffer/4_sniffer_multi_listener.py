@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: sniffer listener demo script with all connected dongles
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+from console_helper import *
+from forthink_uwb_dongle import *
+
+from uci_defs import *
+from SnifferDevice import *
+from SnifferOrchestrator import *
+
+def main():
+    print_forthink_logo()
+    log_i("**************************************************************")
+    log_i("Start of sniffer multi listener demo script...")
+    log_i("**************************************************************")
+
+    # every dongle listens with the same parameters, pass sniffer_params={location: SnifferParam} to set them per dongle
+    sniffer_param = SnifferParam(channel=9)
+    sniffer_param.set_sfd_id(2)
+    sniffer_param.set_preamble_id(10)
+
+    orchestrator = SnifferOrchestrator(default_param=sniffer_param)
+    orchestrator.start()
+    if len(orchestrator.workers) == 0:
+        return
+
+    try:
+        while orchestrator.is_alive():
+            for frame in orchestrator.poll(timeout_ms=200):
+                if frame.rx_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+                    log_i(f"dongle {frame.location}:")
+                    log_i(str(frame.rx_result))
+    except KeyboardInterrupt:
+        pass
+    orchestrator.stop()
+    for worker in orchestrator.workers:
+        log_i(f"dongle {worker.location}:")
+        log_i(str(worker.stats))
+
+    log_i("**************************************************************")
+    log_i("End of sniffer multi listener demo script...")
+    log_i("**************************************************************")
+
+if __name__ == '__main__':
+    main()
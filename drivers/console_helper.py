@@ -9,30 +9,193 @@
                        All rights reserved
 """
 
+import atexit
 import colorama 
-import traceback
+import queue
+import sys
+import threading
+import time
+from enum import IntEnum
 
 from math import ceil
 
 colorama.init()
 
-def log_i(info):
-    print(colorama.Fore.GREEN + '[dbg/I] '+ info + colorama.Fore.RESET)
+class EnumLogLevel(IntEnum):
+    LOG_LEVEL_DEBUG = 0
+    LOG_LEVEL_INFO = 1
+    LOG_LEVEL_PRINT = 2
+    LOG_LEVEL_WARNING = 3
+    LOG_LEVEL_ERROR = 4
+    LOG_LEVEL_NONE = 5
 
-def log_d(info):
-    print(colorama.Fore.CYAN + '[dbg/D] ' + info + colorama.Fore.RESET)
 
-def log_w(warn):
-    print(colorama.Fore.YELLOW + '[dbg/W] ' + warn + colorama.Fore.RESET)
+class ConsoleLogStats():
+    '''
+        @brief counters of the console log
+            emitted: messages printed or queued for the log thread
+            suppressed: messages dropped by the rate limit
+            dropped: messages lost because the queue of the log thread was full
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.emitted = 0
+        self.suppressed = 0
+        self.dropped = 0
+
+    def __str__(self) -> str:
+        return f" CONSOLE_LOG_STATS:\n" \
+            + f"         emitted: {self.emitted}\n" \
+            + f"      suppressed: {self.suppressed}\n" \
+            + f"         dropped: {self.dropped}\n"
+
+
+_LOG_PREFIX = {
+    EnumLogLevel.LOG_LEVEL_DEBUG: colorama.Fore.CYAN + '[dbg/D] ',
+    EnumLogLevel.LOG_LEVEL_INFO: colorama.Fore.GREEN + '[dbg/I] ',
+    EnumLogLevel.LOG_LEVEL_PRINT: colorama.Fore.WHITE + '[dbg/P] ',
+    EnumLogLevel.LOG_LEVEL_WARNING: colorama.Fore.YELLOW + '[dbg/W] ',
+    EnumLogLevel.LOG_LEVEL_ERROR: colorama.Fore.RED + '[dbg/E] ',
+}
+
+# messages below the level are dropped before they are formatted,
+# the response callbacks log every frame at debug level, set_log_level(LOG_LEVEL_DEBUG) shows them
+_log_level = EnumLogLevel.LOG_LEVEL_INFO
+# rate limit per call site: at most _log_rate_max messages per _log_rate_interval_s, 0 disables
+_log_rate_max = 0
+_log_rate_interval_s = 1.0
+_log_rate_sites = {}    # (code, line) -> [window start, messages, suppressed]
+_log_queue = None
+_log_thread = None
+_log_stats = ConsoleLogStats()
+
+def set_log_level(level: EnumLogLevel):
+    global _log_level
+    _log_level = EnumLogLevel(level)
+
+def get_log_level() -> EnumLogLevel:
+    return _log_level
+
+def log_enabled(level: EnumLogLevel) -> bool:
+    '''
+        @brief True if a message of level is printed, guard for log messages which are costly to build
+    '''
+    return level >= _log_level
+
+def set_log_rate_limit(max_messages: int, interval_s=1.0):
+    '''
+        @brief limit every log call site to max_messages per interval_s, 0 disables the limit
+               the number of suppressed messages is appended to the next message of the call site
+    '''
+    global _log_rate_max, _log_rate_interval_s, _log_rate_sites
+    _log_rate_max = max_messages
+    _log_rate_interval_s = interval_s
+    _log_rate_sites = {}
+
+def get_log_stats() -> ConsoleLogStats:
+    return _log_stats
+
+def start_log_thread(queue_size=4096):
+    '''
+        @brief print the log messages from a thread, the callers only format and queue them
+               a full queue drops the message (get_log_stats().dropped), a log call never waits for the console
+    '''
+    global _log_queue, _log_thread
+    if _log_thread is not None:
+        return
+    _log_queue = queue.Queue(maxsize=queue_size)
+    _log_thread = threading.Thread(target=_log_thread_loop, args=(_log_queue,), name="console-log", daemon=True)
+    _log_thread.start()
+    atexit.register(stop_log_thread)
+
+def stop_log_thread():
+    '''
+        @brief print the queued messages and stop the log thread, the messages are printed directly again
+    '''
+    global _log_queue, _log_thread
+    if _log_thread is None:
+        return
+    log_queue = _log_queue
+    thread = _log_thread
+    _log_queue = None
+    _log_thread = None
+    log_queue.put(None)
+    thread.join()
+
+def _log_thread_loop(log_queue):
+    while True:
+        text = log_queue.get()
+        if text is None:
+            break
+        sys.stdout.write(text)
+        if log_queue.empty():
+            sys.stdout.flush()
+    sys.stdout.flush()
+
+def _log(level: EnumLogLevel, msg, args):
+    '''
+        @param msg: str, formatted with msg % args if args are given, or a callable returning the str
+    '''
+    suppressed = 0
+    if _log_rate_max or level == EnumLogLevel.LOG_LEVEL_ERROR:
+        # the caller of log_x()
+        frame = sys._getframe(2)
+    if _log_rate_max:
+        key = (frame.f_code, frame.f_lineno)
+        now = time.monotonic()
+        site = _log_rate_sites.get(key)
+        if site is None or now - site[0] >= _log_rate_interval_s:
+            if site is not None:
+                suppressed = site[2]
+            _log_rate_sites[key] = [now, 1, 0]
+        elif site[1] >= _log_rate_max:
+            site[2] += 1
+            _log_stats.suppressed += 1
+            return
+        else:
+            site[1] += 1
+    if callable(msg):
+        msg = msg()
+    elif args:
+        msg = msg % args
+    if level == EnumLogLevel.LOG_LEVEL_ERROR:
+        msg = f'{frame.f_code.co_filename}:{frame.f_lineno} {msg}'
+    if suppressed:
+        msg += f' ({suppressed} suppressed)'
+    text = _LOG_PREFIX[level] + msg + colorama.Fore.RESET + '\n'
+    _log_stats.emitted += 1
+    log_queue = _log_queue
+    if log_queue is None:
+        sys.stdout.write(text)
+        return
+    try:
+        log_queue.put_nowait(text)
+    except queue.Full:
+        _log_stats.dropped += 1
+
+# log_x(msg, *args): msg % args is only built if the level is enabled, msg may also be a callable returning the message
+
+def log_i(info, *args):
+    if _log_level <= EnumLogLevel.LOG_LEVEL_INFO:
+        _log(EnumLogLevel.LOG_LEVEL_INFO, info, args)
+
+def log_d(info, *args):
+    if _log_level <= EnumLogLevel.LOG_LEVEL_DEBUG:
+        _log(EnumLogLevel.LOG_LEVEL_DEBUG, info, args)
+
+def log_w(warn, *args):
+    if _log_level <= EnumLogLevel.LOG_LEVEL_WARNING:
+        _log(EnumLogLevel.LOG_LEVEL_WARNING, warn, args)
 
-def log_p(lg):
-    print(colorama.Fore.WHITE + '[dbg/P] ' + lg + colorama.Fore.RESET)
+def log_p(lg, *args):
+    if _log_level <= EnumLogLevel.LOG_LEVEL_PRINT:
+        _log(EnumLogLevel.LOG_LEVEL_PRINT, lg, args)
 
-def log_e(err):
-    frame_info = traceback.extract_stack()[-2]
-    filename = frame_info.filename
-    lineno = frame_info.lineno
-    print(colorama.Fore.RED + f'[dbg/E] {filename}:{lineno} {err}' + colorama.Fore.RESET)
+def log_e(err, *args):
+    if _log_level <= EnumLogLevel.LOG_LEVEL_ERROR:
+        _log(EnumLogLevel.LOG_LEVEL_ERROR, err, args)
 
 
 def as_hex(input: int | list[int] | list[list[int]], uppercase = True, prepend_bytes: int = 0) -> str:
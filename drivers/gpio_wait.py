@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: GPIO wait engine for the handshake lines (RDY_N / INT_N) of the UCI SPI interface
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import threading
+import time
+from enum import IntEnum
+
+from console_helper import *
+from uci_port import *
+
+class EnumGpioWaitStrategy(IntEnum):
+    GPIO_WAIT_BUSY_POLL = 0       # poll the pin back-to-back until the level matches (legacy behaviour)
+    GPIO_WAIT_HYBRID = 1          # spin a few polls, then poll with an exponential sleep backoff
+    GPIO_WAIT_POLLER_THREAD = 2   # one poller thread per device, shared by all pins
+    GPIO_WAIT_TRIGGER = 3         # hardware GPIO trigger queue, where the interface provides it
+
+
+class GpioWaitStats():
+    '''
+        @brief statistics of a GPIO wait strategy
+            polling_rate_hz: pin reads per second spent waiting, i.e. the USB load caused by waiting
+            errors: waits failed because reading the pin raised (poller thread)
+            wake latency: time between the last poll which still saw the old level and the waiter resuming,
+                          the upper bound of how late a level change is noticed
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.waits = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.polls = 0
+        self.wait_time_s = 0.0
+        self.wake_latency_sum_s = 0.0
+        self.wake_latency_max_s = 0.0
+
+    def record(self, polls: int, wait_time_s: float, wake_latency_s: float, timed_out: bool, failed=False):
+        self.waits += 1
+        self.polls += polls
+        self.wait_time_s += wait_time_s
+        if failed:
+            self.errors += 1
+            return
+        if timed_out:
+            self.timeouts += 1
+            return
+        self.wake_latency_sum_s += wake_latency_s
+        if wake_latency_s > self.wake_latency_max_s:
+            self.wake_latency_max_s = wake_latency_s
+
+    @property
+    def polling_rate_hz(self) -> float:
+        if self.wait_time_s <= 0:
+            return 0.0
+        return self.polls / self.wait_time_s
+
+    @property
+    def mean_wake_latency_us(self) -> float:
+        woken = self.waits - self.timeouts - self.errors
+        if woken <= 0:
+            return 0.0
+        return self.wake_latency_sum_s / woken * 1e6
+
+    @property
+    def max_wake_latency_us(self) -> float:
+        return self.wake_latency_max_s * 1e6
+
+    def __str__(self) -> str:
+        return f" GPIO_WAIT_STATS:\n" \
+            + f"            waits: {self.waits}\n" \
+            + f"         timeouts: {self.timeouts}\n" \
+            + f"           errors: {self.errors}\n" \
+            + f"            polls: {self.polls}\n" \
+            + f"     polling_rate: {self.polling_rate_hz:.1f} Hz\n" \
+            + f"mean_wake_latency: {self.mean_wake_latency_us:.1f} us\n" \
+            + f" max_wake_latency: {self.max_wake_latency_us:.1f} us\n"
+
+
+class GpioWaiter():
+    '''
+        @brief base class of the GPIO wait strategies
+    '''
+    strategy = EnumGpioWaitStrategy.GPIO_WAIT_BUSY_POLL
+
+    def __init__(self):
+        self.stats = GpioWaitStats()
+
+    def wait(self, pin, poll_function, gpio_level: bool, timeout_ms=0) -> EnumUCIPortStatus:
+        '''
+            @brief wait until poll_function() returns gpio_level
+            @param pin: pin identifier, used by strategies which share work between pins
+            @param poll_function: callable returning the current pin level
+            @param timeout_ms: 0 means wait forever
+            @return: UCI_PORT_STATUS_OK or UCI_PORT_STATUS_ERR_TIMEOUT
+        '''
+        start = time.perf_counter()
+        deadline = start + timeout_ms / 1000 if timeout_ms != 0 else None
+        polls = 0
+        last_miss = start
+        while True:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                self.stats.record(polls, now - start, 0.0, True)
+                return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT
+            current_gpio_level = poll_function()
+            polls += 1
+            if current_gpio_level == gpio_level:
+                now = time.perf_counter()
+                self.stats.record(polls, now - start, now - last_miss if polls > 1 else 0.0, False)
+                return EnumUCIPortStatus.UCI_PORT_STATUS_OK
+            last_miss = time.perf_counter()
+            self.backoff(polls, deadline)
+
+    def backoff(self, polls: int, deadline):
+        '''
+            @brief called after every poll which missed the expected level
+        '''
+        pass
+
+    def close(self):
+        pass
+
+
+class BusyPollGpioWaiter(GpioWaiter):
+    '''
+        @brief poll the pin back-to-back, lowest latency but one core and the USB bus fully loaded
+    '''
+    strategy = EnumGpioWaitStrategy.GPIO_WAIT_BUSY_POLL
+
+
+class HybridGpioWaiter(GpioWaiter):
+    '''
+        @brief poll back-to-back for spin_polls reads, then sleep between polls,
+               the sleep grows by backoff from min_sleep_us up to max_sleep_us
+    '''
+    strategy = EnumGpioWaitStrategy.GPIO_WAIT_HYBRID
+
+    def __init__(self, spin_polls=20, min_sleep_us=50, max_sleep_us=1000, backoff=2.0):
+        super().__init__()
+        self.spin_polls = spin_polls
+        self.min_sleep_s = min_sleep_us / 1e6
+        self.max_sleep_s = max_sleep_us / 1e6
+        self.backoff_factor = backoff
+        # backoff <= 1 or no min sleep: every poll after the spin sleeps min_sleep_s
+        self.sleep_grows = backoff > 1 and min_sleep_us > 0
+        # polls after which the sleep reached max_sleep_s, long waits must not grow the exponent further
+        self.max_backoff_steps = 1
+        if self.sleep_grows:
+            while min_sleep_us * backoff ** (self.max_backoff_steps - 1) < max_sleep_us:
+                self.max_backoff_steps += 1
+
+    def backoff(self, polls: int, deadline):
+        if polls <= self.spin_polls:
+            return
+        if not self.sleep_grows:
+            sleep_s = min(self.min_sleep_s, self.max_sleep_s)
+        elif polls - self.spin_polls > self.max_backoff_steps:
+            sleep_s = self.max_sleep_s
+        else:
+            sleep_s = self.min_sleep_s * (self.backoff_factor ** (polls - self.spin_polls - 1))
+            if sleep_s > self.max_sleep_s:
+                sleep_s = self.max_sleep_s
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining < sleep_s:
+                sleep_s = max(remaining, 0)
+        time.sleep(sleep_s)
+
+
+class PollerThreadGpioWaiter(GpioWaiter):
+    '''
+        @brief one poller thread per device, shared by all pins
+            the thread only reads the pins somebody waits for, every interval_us,
+            and sleeps on a condition while nobody waits
+            a poll_function which raises is logged and fails the waiters of its pin with UCI_PORT_STATUS_ERR_GENERAL,
+            the thread keeps polling the other pins
+    '''
+    strategy = EnumGpioWaitStrategy.GPIO_WAIT_POLLER_THREAD
+
+    def __init__(self, interval_us=200):
+        super().__init__()
+        self.interval_s = interval_us / 1e6
+        self.condition = threading.Condition()
+        self.waiters = {}   # pin -> list of [gpio_level, poll_function, event, last_miss_time, polls, failed]
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._poll_loop, name="gpio-poller", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def wait(self, pin, poll_function, gpio_level: bool, timeout_ms=0) -> EnumUCIPortStatus:
+        if not self.running:
+            self.start()
+        start = time.perf_counter()
+        waiter = [gpio_level, poll_function, threading.Event(), start, 0, False]
+        with self.condition:
+            self.waiters.setdefault(pin, []).append(waiter)
+            self.condition.notify()
+        woken = waiter[2].wait(timeout_ms / 1000 if timeout_ms != 0 else None)
+        now = time.perf_counter()
+        if not woken:
+            with self.condition:
+                pin_waiters = self.waiters.get(pin, [])
+                if waiter in pin_waiters:
+                    pin_waiters.remove(waiter)
+                else:
+                    # matched between the timeout and taking the lock
+                    woken = True
+        if not woken:
+            self.stats.record(waiter[4], now - start, 0.0, True)
+            return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT
+        if waiter[5]:
+            self.stats.record(waiter[4], now - start, 0.0, False, failed=True)
+            return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
+        self.stats.record(waiter[4], now - start, now - waiter[3], False)
+        return EnumUCIPortStatus.UCI_PORT_STATUS_OK
+
+    def _poll_loop(self):
+        while True:
+            with self.condition:
+                while self.running and not any(self.waiters.values()):
+                    self.condition.wait()
+                if not self.running:
+                    return
+                pins = [(pin, list(pin_waiters)) for pin, pin_waiters in self.waiters.items() if pin_waiters]
+            for pin, pin_waiters in pins:
+                # all waiters of one pin share a single read
+                try:
+                    current_gpio_level = pin_waiters[0][1]()
+                except Exception as e:
+                    log_e(f"GPIO wait: polling pin {pin} failed: {e!r}")
+                    self._fail(pin, pin_waiters)
+                    continue
+                now = time.perf_counter()
+                with self.condition:
+                    for waiter in pin_waiters:
+                        waiter[4] += 1
+                        if waiter[0] == current_gpio_level:
+                            if waiter in self.waiters[pin]:
+                                self.waiters[pin].remove(waiter)
+                                waiter[2].set()
+                        else:
+                            waiter[3] = now
+            time.sleep(self.interval_s)
+
+    def _fail(self, pin, pin_waiters):
+        with self.condition:
+            for waiter in pin_waiters:
+                if waiter in self.waiters[pin]:
+                    self.waiters[pin].remove(waiter)
+                    waiter[5] = True
+                    waiter[2].set()
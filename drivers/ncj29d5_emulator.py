@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: NCJ29D5 sniffer firmware emulator, a UCIDevice without hardware
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+import nxp_crc
+from uci_port import *
+from uci_defs import *
+from uci_sniffer_rx_rsp import SNIFFER_RSSI_SCALE, SNIFFER_RX_RESULT_STRUCT, SNIFFER_TRX_STATUS_STRUCT, \
+                               SNIFFER_CIR_CMD_STRUCT, SNIFFER_CIR_RSP_STRUCT, SNIFFER_CIR_TAP_SIZE, \
+                               SNIFFER_FIRST_PATH_RSP_STRUCT, SNIFFER_FIRST_PATH_INDEX_SCALE, \
+                               SNIFFER_CFO_RSP_STRUCT, SNIFFER_CFO_SCALE
+
+# CFG_RX_MODE: radio, preamble index, sts offset, toa mode, rx delay, rx timeout, rx cycles, cipher, xtal comp
+EMULATOR_RX_MODE_CFG_STRUCT = struct.Struct('<BBBBHIBBB')
+# CFG_TX_MODE: radio, preamble index, sts offset, toa mode, tx delay, tx timeout, tx cycles, ...
+EMULATOR_TX_MODE_CFG_STRUCT = struct.Struct('<BBBBHIBBBBB')
+# taps of the CIR memory
+EMULATOR_CIR_TAPS = 1024
+# CFG_RANGING_SEQ entry: action, radio, preamble index, sts offset, delay, timeout, data in psdu, psdu index
+EMULATOR_RANGING_CMD_STRUCT = struct.Struct('<BBBBHIBB')
+
+# status of a START_RX_MODE response for the rx_status error bits, the firmware reports an RX timeout
+# as UCI_STATUS_RANGING_RX_TIMEOUT with RX_PRMBL_TIMEOUT (assumed, the result then carries status and rx_status only)
+_RX_STATUS_TO_UCI_STATUS = {
+    0x01: EnumUciStatus.UCI_STATUS_RANGING_RX_PHY_TOA_FAILED,
+    0x02: EnumUciStatus.UCI_STATUS_RANGING_RX_TIMEOUT,
+    0x04: EnumUciStatus.UCI_STATUS_RANGING_RX_TIMEOUT,
+    0x08: EnumUciStatus.UCI_STATUS_RANGING_RX_TIMEOUT,
+    0x10: EnumUciStatus.UCI_STATUS_RANGING_RX_PHY_DEC_FAILED,
+    0x20: EnumUciStatus.UCI_STATUS_RANGING_RX_PHY_DEC_FAILED,
+    0x40: EnumUciStatus.UCI_STATUS_RANGING_RX_PHY_DEC_FAILED,
+    0x80: EnumUciStatus.UCI_STATUS_FAILED,
+    0x100: EnumUciStatus.UCI_STATUS_RANGING_RX_PHY_STS_FAILED,
+}
+EMULATOR_RX_STATUS_PRMBL_TIMEOUT = 0x04
+
+
+class EmulatorTraffic():
+    '''
+        @brief UWB frames on the air seen by the emulated sniffer
+            frame_rate_hz: mean frame rate, 0 means no traffic (every RX cycle times out)
+            poisson: exponential inter-arrival times instead of a fixed interval
+            payload_len: (min, max) PSDU length, the first 4 bytes carry a frame counter
+            rx_error_mix: {rx_status bit: probability} of receiving a frame with this error
+            crc_error_rate: probability of a corrupted CRC16 of a received UCI frame (crc enabled only)
+    '''
+    def __init__(self, frame_rate_hz=100.0, poisson=False, payload_len=(16, 32), rssi_dbm=-70.0, noise_dbm=-95.0,
+                 rx_error_mix=None, crc_error_rate=0.0):
+        self.frame_rate_hz = frame_rate_hz
+        self.poisson = poisson
+        self.payload_len = payload_len
+        self.rssi_dbm = rssi_dbm
+        self.noise_dbm = noise_dbm
+        self.rx_error_mix = rx_error_mix if rx_error_mix is not None else {}
+        self.crc_error_rate = crc_error_rate
+
+
+class EmulatorTiming():
+    '''
+        @brief SPI / GPIO timing of the FT4222 bridge and the firmware
+            every FT4222 call is one USB round trip of usb_round_trip_us, a command takes tx_round_trips,
+            a received frame rx_round_trips, plus the SPI transfer at spi_frequency_hz.
+            firmware_latency_us: command to response, reset_time_s: duration of hard_reset()
+    '''
+    def __init__(self, spi_frequency_hz=1e07, usb_round_trip_us=125, tx_round_trips=4, rx_round_trips=6,
+                 firmware_latency_us=200, reset_time_s=0.2):
+        self.spi_frequency_hz = spi_frequency_hz
+        self.usb_round_trip_s = usb_round_trip_us / 1e6
+        self.tx_round_trips = tx_round_trips
+        self.rx_round_trips = rx_round_trips
+        self.firmware_latency_s = firmware_latency_us / 1e6
+        self.reset_time_s = reset_time_s
+
+    def transfer_time_s(self, length: int, round_trips: int) -> float:
+        return round_trips * self.usb_round_trip_s + length * 8 / self.spi_frequency_hz
+
+
+class Ncj29d5EmulatorStats():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.commands = 0
+        self.responses = 0
+        self.notifications = 0
+        self.air_frames = 0
+        self.missed_frames = 0
+        self.rx_frames = 0
+        self.rx_errors = 0
+        self.rx_timeouts = 0
+        self.crc_errors = 0
+        self.usb_round_trips = 0
+
+    def __str__(self) -> str:
+        return f" NCJ29D5_EMULATOR_STATS:\n" \
+            + f"        commands: {self.commands}\n" \
+            + f"       responses: {self.responses}\n" \
+            + f"   notifications: {self.notifications}\n" \
+            + f"      air_frames: {self.air_frames}\n" \
+            + f"   missed_frames: {self.missed_frames}\n" \
+            + f"       rx_frames: {self.rx_frames}\n" \
+            + f"       rx_errors: {self.rx_errors}\n" \
+            + f"     rx_timeouts: {self.rx_timeouts}\n" \
+            + f"      crc_errors: {self.crc_errors}\n" \
+            + f" usb_round_trips: {self.usb_round_trips}\n"
+
+
+class Ncj29d5Emulator(UCIDevice):
+    '''
+        @brief in-process UCIDevice emulating the sniffer GID 0x0E command set of the NCJ29D5 firmware
+            frames on the air follow EmulatorTraffic, a frame is only received while an RX cycle is armed,
+            the others count as missed_frames. With timing (EmulatorTiming) the calls take as long as
+            on the FT4222, timing=None runs at full speed. seed makes the traffic reproducible.
+            Commands segmented by the packet boundary flag are joined before they are handled.
+    '''
+    def __init__(self, traffic: EmulatorTraffic = None, timing: EmulatorTiming = None, seed=None, max_packet_payload=0):
+        '''
+            @param max_packet_payload: segment the responses / notifications into packets of this payload size,
+                                       0 sends every message in one packet with the extended length
+        '''
+        super().__init__(None, EnumUCIPortType.UCI_INTF_NXP_SPI)
+        self.traffic = traffic if traffic is not None else EmulatorTraffic()
+        self.timing = timing
+        self.max_packet_payload = max_packet_payload
+        self.random = random.Random(seed)
+        self.stats = Ncj29d5EmulatorStats()
+        self.condition = threading.Condition()
+        self.is_ncj29d5 = True
+        self.handlers = {
+            EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value: self._cfg_ranging_app,
+            EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value: self._cfg_rx_mode,
+            EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value: self._start_rx_mode,
+            EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value: self._cfg_tx_mode,
+            EnumSnifferOid.SNIFFER_START_TX_MODE_OID.value: self._start_tx_mode,
+            EnumSnifferOid.SNIFFER_CFG_RANGING_SEQ_OID.value: self._cfg_ranging_seq,
+            EnumSnifferOid.SNIFFER_START_RANGING_OID.value: self._start_ranging,
+            EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value: self._get_ranging_status,
+            EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value: self._get_ranging_result,
+            EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value: self._get_payload,
+            EnumSnifferOid.SNIFFER_GET_CIR_OID.value: self._get_cir,
+            EnumSnifferOid.SNIFFER_GET_FIRST_PATH_INFO_OID.value: self._get_first_path_info,
+            EnumSnifferOid.SNIFFER_GET_CFO_OID.value: self._get_cfo,
+            EnumSnifferOid.SNIFFER_STORE_RADIO_SETTINGS_OID.value: self._store_radio_settings,
+            EnumSnifferOid.SNIFFER_STORE_RANGING_APP_SETTINGS_OID.value: self._store_ranging_app_settings,
+            EnumSnifferOid.SNIFFER_CLEAR_RANGING_APP_SETTINGS_OID.value: self._clear_ranging_app_settings,
+        }
+        # non-volatile memory, kept over hard_reset()
+        self.stored_radio_settings = False
+        self.stored_ranging_app = None
+        self._power_on()
+
+    def _power_on(self):
+        now = time.perf_counter()
+        self.tx_queue = deque()         # (ready time, frame without CRC)
+        self.command_segments = None    # payload of the segmented command received so far
+        # the stored ranging app config is applied at boot
+        self.ranging_app_cfg = self.stored_ranging_app
+        self.channel_configured = self.stored_ranging_app is not None
+        self.rx_cfg = None              # (rx_timeout_s, rx_cycles)
+        self.rx_cycles_left = 0
+        self.rx_cycle_start = 0.0
+        self.rx_frame_num = 0
+        self.rx_err_num = 0
+        self.tx_cfg = None              # (tx_interval_s, tx_cycles)
+        self.ranging_seq = []           # list of (delay_s, timeout_s, psdu_index)
+        self.ranging_status = []
+        self.ranging_timestamps = []
+        self.ranging_payloads = {}
+        self.busy_until = 0.0           # TX / ranging sequence running
+        self.air_frame_counter = 0
+        self.last_rx_frame = None       # air frame counter of the last frame received without error
+        self.next_air_frame = now + self._next_interval()
+
+    def open(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_OPEN
+        return self
+
+    def close(self):
+        self.device_status = EnumUCIDeviceStatus.UCI_DEVICE_STATUS_CLOSED
+        return True
+
+    def hard_reset(self):
+        if self.timing is not None:
+            time.sleep(self.timing.reset_time_s)
+        with self.condition:
+            self._power_on()
+            self._queue_frame(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumSnifferOid.SNIFFER_RESET_STATUS_NTF_OID.value,
+                              bytes([EnumUciStatus.UCI_STATUS_REBOOT.value]), time.perf_counter())
+            self.condition.notify_all()
+
+    def inject_notification(self, gid: int, oid: int, payload: bytes):
+        '''
+            @brief queue an unsolicited notification, e.g. to test the handling of unexpected messages
+        '''
+        with self.condition:
+            self._queue_frame(EnumUciMessageType.UCI_MT_NOTIFICATION, oid, payload, time.perf_counter(), gid)
+            self.condition.notify_all()
+
+    def transmit_uci_command(self, msg, append_crc=False, timeout_ms=0) -> UCIPortResult:
+        command = bytes(msg)
+        if len(command) < 4 or len(command) > 259 + 2:
+            return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM, b'', False)
+        if self.timing is not None:
+            self._elapse(self.timing.transfer_time_s(len(command), self.timing.tx_round_trips))
+            self.stats.usb_round_trips += self.timing.tx_round_trips
+        gid = command[0] & 0x0F
+        oid = command[1] & 0x3F
+        payload = command[4:4 + command[3] + (command[2] << 8)]
+        with self.condition:
+            if command[0] & 0x10 or self.command_segments is not None:
+                if self.command_segments is None:
+                    self.command_segments = bytearray()
+                self.command_segments += payload
+                if command[0] & 0x10:
+                    # more packets follow
+                    return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, bytes(len(command)), False)
+                payload = bytes(self.command_segments)
+                self.command_segments = None
+            self.stats.commands += 1
+            now = time.perf_counter()
+            self._advance(now)
+            ready = now + (self.timing.firmware_latency_s if self.timing is not None else 0.0)
+            if gid != EnumUciGid.UWB_SNIFFER_GID.value:
+                self._respond(gid, oid, EnumUciStatus.UCI_STATUS_UNKNOWN_GID, ready)
+            elif oid not in self.handlers:
+                self._respond(gid, oid, EnumUciStatus.UCI_STATUS_UNKNOWN_OID, ready)
+            elif self.rx_cycles_left > 0 or now < self.busy_until:
+                self._respond(gid, oid, EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            else:
+                self.handlers[oid](payload, ready)
+            self.condition.notify_all()
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, bytes(len(command)), False)
+
+    def receive_uci_message(self, timeout_ms=400, crc_enable=True) -> UCIPortResult:
+        deadline = time.perf_counter() + timeout_ms / 1000 if timeout_ms != 0 else None
+        with self.condition:
+            while True:
+                now = time.perf_counter()
+                self._advance(now)
+                if self.tx_queue and self.tx_queue[0][0] <= now:
+                    frame = self.tx_queue.popleft()[1]
+                    break
+                if deadline is not None and now >= deadline:
+                    return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT, b'', False)
+                wake = self._next_event()
+                if deadline is not None and (wake is None or wake > deadline):
+                    wake = deadline
+                self.condition.wait(wake - now if wake is not None else None)
+        is_crc_valid = False
+        if crc_enable:
+            crc = nxp_crc.calculate_crc(frame)
+            if self.traffic.crc_error_rate > 0 and self.random.random() < self.traffic.crc_error_rate:
+                crc ^= 0x0001
+                self.stats.crc_errors += 1
+            frame += crc.to_bytes(2, 'little')
+            is_crc_valid = nxp_crc.is_crc_valid(frame[:-2], frame[-2] | (frame[-1] << 8))
+        if self.timing is not None:
+            self._elapse(self.timing.transfer_time_s(1 + len(frame), self.timing.rx_round_trips))
+            self.stats.usb_round_trips += self.timing.rx_round_trips
+        return UCIPortResult(EnumUCIPortStatus.UCI_PORT_STATUS_OK, memoryview(frame), is_crc_valid)
+
+    @staticmethod
+    def _elapse(duration_s: float):
+        # sleep the bulk, spin the rest, time.sleep alone is too coarse for transfers of a few 100 us
+        end = time.perf_counter() + duration_s
+        if duration_s > 0.002:
+            time.sleep(duration_s - 0.001)
+        while time.perf_counter() < end:
+            pass
+
+    def _queue_frame(self, message_type, oid: int, payload: bytes, ready: float, gid=EnumUciGid.UWB_SNIFFER_GID.value):
+        segment_size = self.max_packet_payload if self.max_packet_payload > 0 else max(len(payload), 1)
+        for offset in range(0, max(len(payload), 1), segment_size):
+            segment = payload[offset:offset + segment_size]
+            pbf = 0x10 if offset + segment_size < len(payload) else 0
+            frame = bytearray(4 + len(segment))
+            frame[0] = (message_type << 5) | pbf | gid
+            frame[1] = oid
+            frame[2] = len(segment) >> 8
+            frame[3] = len(segment) & 0xFF
+            frame[4:] = segment
+            self.tx_queue.append((ready, frame))
+        if message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+            self.stats.responses += 1
+        else:
+            self.stats.notifications += 1
+
+    def _respond(self, gid: int, oid: int, status: EnumUciStatus, ready: float, payload=b''):
+        self._queue_frame(EnumUciMessageType.UCI_MT_RESPONSE, oid, bytes([status.value]) + payload, ready, gid)
+
+    def _next_interval(self) -> float:
+        rate = self.traffic.frame_rate_hz
+        if rate <= 0:
+            return float('inf')
+        return self.random.expovariate(rate) if self.traffic.poisson else 1 / rate
+
+    def _next_event(self):
+        events = []
+        if self.tx_queue:
+            events.append(self.tx_queue[0][0])
+        if self.rx_cycles_left > 0:
+            events.append(min(self.next_air_frame, self.rx_cycle_start + self.rx_cfg[0]))
+        return min(events) if events else None
+
+    def _air_frame(self):
+        '''
+            @return: (rx_status, payload) of the next frame on the air, payload is None for an erroneous reception
+        '''
+        self.stats.air_frames += 1
+        self.air_frame_counter += 1
+        self.next_air_frame += self._next_interval()
+        draw = self.random.random()
+        for rx_status, probability in self.traffic.rx_error_mix.items():
+            if draw < probability:
+                return rx_status, None
+            draw -= probability
+        low, high = self.traffic.payload_len
+        length = self.random.randint(low, high)
+        payload = self.air_frame_counter.to_bytes(4, 'little')[:length] + self.random.randbytes(max(length - 4, 0))
+        return 0, payload
+
+    def _rx_result(self, rx_status: int, payload) -> bytes:
+        if rx_status != 0:
+            status = _RX_STATUS_TO_UCI_STATUS.get(rx_status & -rx_status, EnumUciStatus.UCI_STATUS_FAILED)
+            return SNIFFER_TRX_STATUS_STRUCT.pack(status.value, rx_status)
+        rssi = round(self.traffic.rssi_dbm / SNIFFER_RSSI_SCALE)
+        noise = round(self.traffic.noise_dbm / SNIFFER_RSSI_SCALE)
+        return SNIFFER_RX_RESULT_STRUCT.pack(EnumUciStatus.UCI_STATUS_OK.value, 0, self.rx_frame_num & 0xFF,
+                                             self.rx_err_num & 0xFF, rssi - 2 ** 20, rssi + 2 ** 20,
+                                             noise - 2 ** 20, noise + 2 ** 20, len(payload)) + payload
+
+    def _advance(self, now: float):
+        '''
+            @brief complete the RX cycles which ended until now
+        '''
+        while self.rx_cycles_left > 0:
+            rx_timeout_s = self.rx_cfg[0]
+            # frames on the air while the receiver was not armed
+            while self.next_air_frame < self.rx_cycle_start:
+                self.stats.air_frames += 1
+                self.stats.missed_frames += 1
+                self.air_frame_counter += 1
+                self.next_air_frame += self._next_interval()
+            cycle_end = self.rx_cycle_start + rx_timeout_s
+            if self.next_air_frame <= cycle_end:
+                if self.next_air_frame > now:
+                    return
+                cycle_end = self.next_air_frame
+                rx_status, payload = self._air_frame()
+                self.rx_frame_num += 1
+                if rx_status == 0:
+                    self.stats.rx_frames += 1
+                    self.last_rx_frame = self.air_frame_counter
+                else:
+                    self.rx_err_num += 1
+                    self.stats.rx_errors += 1
+            else:
+                if cycle_end > now:
+                    return
+                rx_status, payload = EMULATOR_RX_STATUS_PRMBL_TIMEOUT, None
+                self.stats.rx_timeouts += 1
+            ready = cycle_end + (self.timing.firmware_latency_s if self.timing is not None else 0.0)
+            self._queue_frame(EnumUciMessageType.UCI_MT_RESPONSE, EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value,
+                              self._rx_result(rx_status, payload), ready)
+            self.rx_cycles_left -= 1
+            # the next cycle listens right away
+            self.rx_cycle_start = cycle_end
+
+    # GID 0x0E command handlers: handler(payload, ready time of the response)
+    def _ok(self, oid: int, ready: float, payload=b''):
+        self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_OK, ready, payload)
+
+    def _invalid(self, oid: int, ready: float):
+        self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_INVALID_PARAM, ready)
+
+    def _cfg_ranging_app(self, payload, ready):
+        if len(payload) < 4 or struct.unpack_from('<I', payload)[0] not in (6489600, 6988800, 7488000, 7987200):
+            self._invalid(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, ready)
+            return
+        self.ranging_app_cfg = bytes(payload)
+        self.channel_configured = True
+        self._ok(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, ready)
+
+    def _cfg_rx_mode(self, payload, ready):
+        if not self.channel_configured:
+            # the rx mode needs the channel of the ranging app config
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value,
+                          EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        if len(payload) < EMULATOR_RX_MODE_CFG_STRUCT.size:
+            self._invalid(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, ready)
+            return
+        fields = EMULATOR_RX_MODE_CFG_STRUCT.unpack_from(payload)
+        rx_timeout_us, rx_cycles = fields[5], fields[6]
+        if rx_cycles == 0:
+            self._invalid(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, ready)
+            return
+        self.rx_cfg = (rx_timeout_us / 1e6, rx_cycles)
+        self.rx_frame_num = 0
+        self.rx_err_num = 0
+        self._ok(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, ready)
+
+    def _start_rx_mode(self, payload, ready):
+        if self.rx_cfg is None:
+            # the firmware starts with the default rx config: one cycle, ~16.7s timeout
+            self.rx_cfg = (0xFFFFFF / 1e6, 1)
+        self.rx_cycles_left = self.rx_cfg[1]
+        self.rx_cycle_start = ready
+
+    def _cfg_tx_mode(self, payload, ready):
+        if len(payload) < EMULATOR_TX_MODE_CFG_STRUCT.size:
+            self._invalid(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, ready)
+            return
+        fields = EMULATOR_TX_MODE_CFG_STRUCT.unpack_from(payload)
+        self.tx_cfg = (fields[4] / 1e6, fields[6])
+        self._ok(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, ready)
+
+    def _start_tx_mode(self, payload, ready):
+        if self.tx_cfg is None or len(payload) < 1 or payload[0] != len(payload) - 1 or not 2 <= payload[0] <= 127:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_START_TX_MODE_OID.value,
+                          EnumUciStatus.UCI_STATUS_INVALID_PARAM, ready, b'\x00\x00\x00\x00\xA0')
+            return
+        tx_interval_s, tx_cycles = self.tx_cfg
+        self.busy_until = ready + tx_interval_s * max(tx_cycles - 1, 0)
+        self._ok(EnumSnifferOid.SNIFFER_START_TX_MODE_OID.value, self.busy_until, b'\x00\x00\x00\x00\x00')
+
+    def _cfg_ranging_seq(self, payload, ready):
+        size = EMULATOR_RANGING_CMD_STRUCT.size
+        if len(payload) == 0 or len(payload) % size != 0:
+            self._invalid(EnumSnifferOid.SNIFFER_CFG_RANGING_SEQ_OID.value, ready)
+            return
+        self.ranging_seq = [(fields[4] / 1e6, fields[5] / 1e6, fields[7])
+                            for fields in EMULATOR_RANGING_CMD_STRUCT.iter_unpack(bytes(payload))]
+        self._ok(EnumSnifferOid.SNIFFER_CFG_RANGING_SEQ_OID.value, ready)
+
+    def _start_ranging(self, payload, ready):
+        if not self.ranging_seq:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_START_RANGING_OID.value,
+                          EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        # every entry of the sequence receives one frame, delays count from the start command
+        self.ranging_status = []
+        self.ranging_timestamps = []
+        self.ranging_payloads = {}
+        end = ready
+        for delay_s, timeout_s, psdu_index in self.ranging_seq:
+            rx_status, frame_payload = self._air_frame()
+            self.ranging_status.append(rx_status)
+            # RX timestamps in 124.8 MHz ticks
+            self.ranging_timestamps.append(round(delay_s * 124.8e6) if rx_status == 0 else 0)
+            if frame_payload is not None:
+                self.ranging_payloads[psdu_index] = frame_payload
+            end = max(end, ready + delay_s)
+        self.busy_until = end
+        self._ok(EnumSnifferOid.SNIFFER_START_RANGING_OID.value, end)
+
+    def _get_ranging_status(self, payload, ready):
+        self._ok(EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value, ready,
+                 b'\x00\x00\x00' + struct.pack(f'<{len(self.ranging_status)}H', *self.ranging_status))
+
+    def _get_ranging_result(self, payload, ready):
+        first = self.ranging_timestamps[0] if self.ranging_timestamps else 0
+        differences = [(timestamp - first) & 0xFFFFFFFF for timestamp in self.ranging_timestamps]
+        # the list is followed by one word which is not part of it
+        self._ok(EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value, ready,
+                 b'\x00\x00\x00' + struct.pack(f'<{len(differences) + 1}I', *differences, 0))
+
+    def _get_payload(self, payload, ready):
+        if len(payload) < 1 or payload[0] not in self.ranging_payloads:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value,
+                          EnumUciStatus.UCI_STATUS_INVALID_PARAM, ready)
+            return
+        self._ok(EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value, ready, b'\x00\x00\x00' + self.ranging_payloads[payload[0]])
+
+    def first_path_index(self, frame: int) -> int:
+        '''
+            @brief tap of the first path in the CIR of the air frame, drifts slowly with the frame counter
+        '''
+        return 200 + (frame * 7) % 64
+
+    def _get_cir(self, payload, ready):
+        oid = EnumSnifferOid.SNIFFER_GET_CIR_OID.value
+        if len(payload) < SNIFFER_CIR_CMD_STRUCT.size:
+            self._invalid(oid, ready)
+            return
+        tap_offset, tap_count = SNIFFER_CIR_CMD_STRUCT.unpack_from(payload)
+        if tap_count == 0 or tap_offset + tap_count > EMULATOR_CIR_TAPS:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_INVALID_RANGE, ready)
+            return
+        if self.last_rx_frame is None:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        # noise of a few LSB on I and Q, the first path and a reflection 12 taps later
+        taps = bytearray(SNIFFER_CIR_TAP_SIZE * tap_count)
+        taps[0::2] = self.random.randbytes(2 * tap_count)
+        first_path = self.first_path_index(self.last_rx_frame)
+        for tap, i_value, q_value in ((first_path, 12000, -3000), (first_path + 12, 4000, 2500)):
+            if tap_offset <= tap < tap_offset + tap_count:
+                struct.pack_into('<hh', taps, SNIFFER_CIR_TAP_SIZE * (tap - tap_offset), i_value, q_value)
+        self._ok(oid, ready, SNIFFER_CIR_RSP_STRUCT.pack(0, tap_offset, tap_count)[1:] + taps)
+
+    def _store_radio_settings(self, payload, ready):
+        self.stored_radio_settings = True
+        self._ok(EnumSnifferOid.SNIFFER_STORE_RADIO_SETTINGS_OID.value, ready)
+
+    def _store_ranging_app_settings(self, payload, ready):
+        oid = EnumSnifferOid.SNIFFER_STORE_RANGING_APP_SETTINGS_OID.value
+        if self.ranging_app_cfg is None:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        self.stored_ranging_app = self.ranging_app_cfg
+        self._ok(oid, ready)
+
+    def _clear_ranging_app_settings(self, payload, ready):
+        self.stored_ranging_app = None
+        self._ok(EnumSnifferOid.SNIFFER_CLEAR_RANGING_APP_SETTINGS_OID.value, ready)
+
+    def cfo_ppm(self, frame: int) -> float:
+        '''
+            @brief carrier frequency offset of the air frame, a fixed crystal offset with a small jitter
+        '''
+        return 2.5 + 0.01 * (frame % 21 - 10)
+
+    def _get_first_path_info(self, payload, ready):
+        oid = EnumSnifferOid.SNIFFER_GET_FIRST_PATH_INFO_OID.value
+        if self.last_rx_frame is None:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        # the index of the CIR peak plus a fraction of a tap, the first path 3 dB below the overall RSSI
+        index = round(self.first_path_index(self.last_rx_frame) / SNIFFER_FIRST_PATH_INDEX_SCALE) + self.last_rx_frame * 13 % 64
+        power = round((self.traffic.rssi_dbm - 3) / SNIFFER_RSSI_SCALE)
+        self._ok(oid, ready, SNIFFER_FIRST_PATH_RSP_STRUCT.pack(0, index, power)[1:])
+
+    def _get_cfo(self, payload, ready):
+        oid = EnumSnifferOid.SNIFFER_GET_CFO_OID.value
+        if self.last_rx_frame is None:
+            self._respond(EnumUciGid.UWB_SNIFFER_GID.value, oid, EnumUciStatus.UCI_STATUS_REJECTED, ready)
+            return
+        self._ok(oid, ready, SNIFFER_CFO_RSP_STRUCT.pack(0, round(self.cfo_ppm(self.last_rx_frame) / SNIFFER_CFO_SCALE))[1:])
@@ -9,14 +9,34 @@
                        All rights reserved
 """
 
-import crcengine
+import binascii
 
-def calculate_crc(frame: list[int]) -> int:
-    ''' Calculate crc as int based on list of input bytes '''
-    crc = crcengine.new('crc16-xmodem').calculate(frame)
-    return crc
+# CRC16-XMODEM (poly 0x1021, init 0x0000, no reflection, no final xor).
+# binascii.crc_hqx is the table-driven C implementation of exactly this CRC, the 256-entry table is built once
+# by the interpreter, so nothing is set up per frame. It reads any buffer (bytes, bytearray, memoryview) in place.
+CRC16_XMODEM_INIT = 0x0000
 
-def is_crc_valid(frame: list[int], received_crc: int) -> bool:
+def _as_buffer(frame):
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        return frame
+    # list[int] callers
+    return bytes(frame)
+
+def calculate_crc(frame, crc: int = CRC16_XMODEM_INIT) -> int:
+    '''
+    Calculate crc as int based on input bytes (bytes, bytearray, memoryview or list[int])
+
+    Pass the crc of the previous chunk to continue a calculation, e.g. over header and payload:
+        crc = calculate_crc(payload, calculate_crc(header))
+    '''
+    return binascii.crc_hqx(_as_buffer(frame), crc)
+
+def calculate_crc_batch(frames) -> list[int]:
+    ''' Calculate the crc of every frame in frames '''
+    crc_hqx = binascii.crc_hqx
+    return [crc_hqx(_as_buffer(frame), CRC16_XMODEM_INIT) for frame in frames]
+
+def is_crc_valid(frame, received_crc: int) -> bool:
     ''' Check if received crc (int) matches received frame '''
     actual_crc = calculate_crc(frame)
     return actual_crc == received_crc
@@ -1,9 +1,12 @@
 import ft4222
+import threading
 import time
+from collections import deque
 from enum import IntEnum
 
 import nxp_crc
 from uci_port import *
+from gpio_wait import *
 
 class EnumFtdiGpio(IntEnum):
     FTDI_GPIO_RDY_N = 0
@@ -14,6 +17,128 @@ class EnumFtdiSpiMode(IntEnum):
     FTDI_SPI_MODE_SINGLE = 0
     FTDI_SPI_MODE_QUAD = 0
 
+class Ft4222hTriggerGpioWaiter(GpioWaiter):
+    '''
+        @brief wait on the FT4222 GPIO trigger queue instead of reading the pin level
+            both edges of the input pins are queued by the FT4222, so an edge between two checks is never lost.
+            the trigger status is checked with the same spin-then-backoff timing as the hybrid strategy.
+    '''
+    strategy = EnumGpioWaitStrategy.GPIO_WAIT_TRIGGER
+
+    def __init__(self, device, spin_polls=20, min_sleep_us=50, max_sleep_us=1000, backoff=2.0):
+        super().__init__()
+        self.device = device
+        self.hybrid = HybridGpioWaiter(spin_polls, min_sleep_us, max_sleep_us, backoff)
+        self.armed_ports = set()
+
+    @staticmethod
+    def is_supported(gpio_interface) -> bool:
+        return hasattr(gpio_interface, 'gpio_SetInputTrigger') and hasattr(gpio_interface, 'gpio_GetTriggerStatus') \
+            and hasattr(gpio_interface, 'gpio_ReadTriggerQueue')
+
+    def _arm(self, port):
+        if port in self.armed_ports:
+            return
+        with self.device.gpio_lock:
+            self.device.usb_round_trips += 1
+            self.device.ftdi_gpio_interface.gpio_SetInputTrigger(port, ft4222.GPIO.Trigger.RISING | ft4222.GPIO.Trigger.FALLING)
+        self.armed_ports.add(port)
+
+    def _drain(self, port):
+        with self.device.gpio_lock:
+            self.device.usb_round_trips += 1
+            pending = self.device.ftdi_gpio_interface.gpio_GetTriggerStatus(port)
+            if pending:
+                self.device.usb_round_trips += 1
+                return self.device.ftdi_gpio_interface.gpio_ReadTriggerQueue(port, pending)
+        return []
+
+    def wait(self, pin, poll_function, gpio_level: bool, timeout_ms=0) -> EnumUCIPortStatus:
+        port = ft4222.Port.P1 if pin == EnumFtdiGpio.FTDI_GPIO_RDY_N else ft4222.Port.P3
+        self._arm(port)
+        # edges queued before the wait started are stale, the current level decides
+        self._drain(port)
+        start = time.perf_counter()
+        polls = 1
+        if poll_function() == gpio_level:
+            self.stats.record(polls, time.perf_counter() - start, 0.0, False)
+            return EnumUCIPortStatus.UCI_PORT_STATUS_OK
+        expected_edge = ft4222.GPIO.Trigger.RISING if gpio_level else ft4222.GPIO.Trigger.FALLING
+        deadline = start + timeout_ms / 1000 if timeout_ms != 0 else None
+        last_miss = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                self.stats.record(polls, now - start, 0.0, True)
+                return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT
+            events = self._drain(port)
+            polls += 1
+            if any(event == expected_edge for event in events):
+                now = time.perf_counter()
+                self.stats.record(polls, now - start, now - last_miss, False)
+                return EnumUCIPortStatus.UCI_PORT_STATUS_OK
+            last_miss = time.perf_counter()
+            self.hybrid.backoff(polls, deadline)
+
+    def close(self):
+        # the trigger configuration is dropped together with the GPIO handle
+        self.armed_ports.clear()
+
+
+class Ft4222hTransportStats():
+    '''
+        @brief USB round trips and transfer time per UCI frame
+            rx: counted from the GPIO read which saw INT_N asserted until the frame is read, the idle INT_N polls before are not part of the frame
+            tx: counted from the INT_N check until CS_N is released, a pending message read on the way is counted as rx
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rx_frames = 0
+        self.rx_round_trips = 0
+        self.rx_transfer_time_s = 0.0
+        self.last_rx_round_trips = 0
+        self.tx_frames = 0
+        self.tx_round_trips = 0
+        self.last_tx_round_trips = 0
+        self.speculative_hits = 0
+        self.speculative_misses = 0
+
+    def record_rx(self, round_trips: int, transfer_time_s: float):
+        self.rx_frames += 1
+        self.rx_round_trips += round_trips
+        self.rx_transfer_time_s += transfer_time_s
+        self.last_rx_round_trips = round_trips
+
+    def record_tx(self, round_trips: int):
+        self.tx_frames += 1
+        self.tx_round_trips += round_trips
+        self.last_tx_round_trips = round_trips
+
+    @property
+    def rx_round_trips_per_frame(self) -> float:
+        return self.rx_round_trips / self.rx_frames if self.rx_frames else 0.0
+
+    @property
+    def tx_round_trips_per_frame(self) -> float:
+        return self.tx_round_trips / self.tx_frames if self.tx_frames else 0.0
+
+    @property
+    def mean_rx_transfer_us(self) -> float:
+        return self.rx_transfer_time_s / self.rx_frames * 1e6 if self.rx_frames else 0.0
+
+    def __str__(self) -> str:
+        return f" TRANSPORT_STATS:\n" \
+            + f"           rx_frames: {self.rx_frames}\n" \
+            + f"rx_round_trips/frame: {self.rx_round_trips_per_frame:.2f}\n" \
+            + f"    mean_rx_transfer: {self.mean_rx_transfer_us:.1f} us\n" \
+            + f"           tx_frames: {self.tx_frames}\n" \
+            + f"tx_round_trips/frame: {self.tx_round_trips_per_frame:.2f}\n" \
+            + f"    speculative_hits: {self.speculative_hits}\n" \
+            + f"  speculative_misses: {self.speculative_misses}\n"
+
+
 class Ft4222hDeviceManager:
     #gets the unique locations of connected ft4222 devices
     def get_device_locations():
@@ -46,6 +171,25 @@ class Ft4222hDevice(UCIDevice):
         self.device_index = index
         self.device_location = device_location
         self.is_ncj29d5 = bD5
+        # GPIO accesses may come from the poller thread, serialize them on the GPIO interface
+        self.gpio_lock = threading.Lock()
+        self.gpio_waiter = HybridGpioWaiter()
+        # every FT4222 API call is one USB round trip
+        self.usb_round_trips = 0
+        self.transport_stats = Ft4222hTransportStats()
+        # fast path, see set_fast_path()
+        self.hw_slave_select = False
+        self.skip_int_n_check = False
+        self.int_n_idle = False
+        # speculative frame read, see set_speculative_read()
+        self.speculative_read = False
+        self.speculative_default_size = 64
+        self.speculative_history_len = 8
+        self.speculative_history = {}
+        self.speculative_sizes = {}
+        self.expected_rsp_key = None
+        # per-stage timings, see set_perf_probe()
+        self.perf_probe = None
 
     #opens the initialized device based on input parameters and the pre-initialized device_location
     def open(self, spi_frequency_hz=1e07, mode=EnumFtdiSpiMode.FTDI_SPI_MODE_SINGLE):
@@ -77,6 +221,7 @@ class Ft4222hDevice(UCIDevice):
         return self
 
     def close(self) -> None:        
+        self.gpio_waiter.close()
         self.ftdi_spi_interface.close()
         self.ftdi_gpio_interface.close()
         return True
@@ -85,6 +230,17 @@ class Ft4222hDevice(UCIDevice):
     def get_device_info(self):
         return (ft4222.getDeviceInfoDetail(self.device_index, False), ft4222.getDeviceInfoDetail(self.device_index + 1, False))
 
+    #returns the USB serial number of the FT4222, unlike the location it stays the same on every USB port,
+    #None if the device is not listed
+    def get_serial_number(self):
+        number_of_devices = ft4222.createDeviceInfoList()
+        for i in range(number_of_devices):
+            device_info = ft4222.getDeviceInfoDetail(i, False)
+            if device_info['location'] == self.device_location:
+                #the serial number of every interface ends with its letter, 'A' for the SPI interface
+                return device_info['serial'][:-1].decode('ascii', errors='replace')
+        return None
+
     #currently, a clock of 80MHz (SysClock.CLK_80) divided by 8 (Clock.DIV_8) ~= 10 MHz SPI clock
     def get_spi_clock_divider(self, requested_spi_frequency_hz):
         if requested_spi_frequency_hz == 1.25e06: 
@@ -114,19 +270,133 @@ class Ft4222hDevice(UCIDevice):
         else:
             return ft4222.SysClock.CLK_80, ft4222.Clock.DIV_16   # default 5 MHz
            
+    def set_fast_path(self, enable=True, hw_slave_select=False, skip_int_n_check=False) -> None:
+        '''
+        @brief Cut the USB round trips per UCI frame
+        @param hw_slave_select: receive frames with the FT4222 hardware slave select (SS0O) instead of toggling CS_N over GPIO,
+            saves the two CS_N writes per received frame. Only for boards where SS0O is routed to the CS_N of the UWB chip.
+            Commands keep the GPIO CS_N, the RDY_N handshake needs CS_N asserted before the first clock.
+        @param skip_int_n_check: skip the INT_N check before a command when the previous frame was read completely
+            and INT_N was seen released. Only safe while the device talks in response to commands alone: off by default,
+            a start rx mode with several rx cycles (SnifferDevice.stream_rx()) and notifications make the device talk
+            without a command, a command sent meanwhile collides with the pending frame.
+        '''
+        self.hw_slave_select = enable and hw_slave_select
+        self.skip_int_n_check = enable and skip_int_n_check
+        self.int_n_idle = False
+
+    def set_speculative_read(self, enable=True, default_size=64, history_len=8) -> None:
+        '''
+        @brief Read header and payload of a frame with one SPI transfer
+            the host clocks out a guessed frame size and only reads the remainder with a second transfer when the frame is longer.
+            the guess is the largest of the last history_len frames seen for the GID/OID of the pending command,
+            or of the previous frame when no command is pending (stream responses, notifications),
+            default_size (UCI header + payload, without CRC) when nothing was learned yet.
+            Not used together with hardware slave select, the remainder read needs CS_N held between the transfers;
+            CS_N is a GPIO then and every transfer ends its SPI transaction.
+        '''
+        self.speculative_read = enable
+        self.speculative_default_size = default_size
+        self.speculative_history_len = history_len
+        self.speculative_history.clear()
+        self.speculative_sizes.clear()
+
+    @staticmethod
+    def _frame_key(octet0: int, octet1: int) -> int:
+        # message type + GID and OID, the packet boundary flag is not part of the key
+        return ((octet0 & 0xEF) << 8) | (octet1 & 0x3F)
+
+    def _learn_frame_size(self, key: int, frame_size: int) -> None:
+        history = self.speculative_history.get(key)
+        if history is None:
+            history = self.speculative_history[key] = deque(maxlen=self.speculative_history_len)
+        history.append(frame_size)
+        self.speculative_sizes[key] = max(history)
+
+    def _read_frame(self, prefix: int, crc_length: int):
+        #first get the uci header (host clocks out zeroes over SPI (SCLK + MOSI lines))
+        header = self._spi_read_write(bytes(prefix + 4), False)
+        if header is None or len(header) < prefix + 4:
+            return None
+        #identify payload length to receive (two bytes)
+        payload_length = header[prefix + 3] + (header[prefix + 2] << 8)
+        #get the rest of the payload plus 2 extra bytes of CRC-16
+        payload = self._spi_read_write(bytes(payload_length + crc_length), True)
+        if payload is None:
+            return None
+        #one buffer per frame: header without the invalid byte, payload, CRC
+        uci_frame = bytearray(4 + len(payload))
+        uci_frame[:4] = memoryview(header)[prefix:]
+        uci_frame[4:] = payload
+        return memoryview(uci_frame)
+
+    def _read_frame_speculative(self, prefix: int, crc_length: int):
+        frame_size = self.speculative_sizes.get(self.expected_rsp_key, self.speculative_default_size)
+        #CS_N is held over GPIO, the transaction ends with the transfer whether or not a remainder follows
+        data = self._spi_read_write(bytes(prefix + frame_size + crc_length), True)
+        if data is None or len(data) < prefix + 4:
+            return None
+        payload_length = data[prefix + 3] + (data[prefix + 2] << 8)
+        uci_frame_size = 4 + payload_length
+        if uci_frame_size <= frame_size:
+            #the whole frame is in the first transfer, hand out a view of it
+            uci_frame = memoryview(data)[prefix:prefix + uci_frame_size + crc_length]
+            self.transport_stats.speculative_hits += 1
+        else:
+            remainder = self._spi_read_write(bytes(uci_frame_size - frame_size), True)
+            if remainder is None:
+                return None
+            uci_frame = bytearray(uci_frame_size + crc_length)
+            uci_frame[:len(data) - prefix] = memoryview(data)[prefix:]
+            uci_frame[len(data) - prefix:] = remainder
+            uci_frame = memoryview(uci_frame)
+            self.transport_stats.speculative_misses += 1
+        key = self._frame_key(uci_frame[0], uci_frame[1])
+        self._learn_frame_size(key, uci_frame_size)
+        #a frame without a command ahead (next stream response, notification) is guessed like this one
+        self.expected_rsp_key = key
+        return uci_frame
+
+    def get_transport_stats(self) -> Ft4222hTransportStats:
+        return self.transport_stats
+
+    def set_perf_probe(self, probe) -> None:
+        '''
+        @brief record the stage timings of transmit / receive into probe (perf_probe.PerfProbe), None disables
+            rx: int_n_wait, spi, int_n_release, crc, frame per frame key; tx: pending_read, rdy_wait, spi, command per GID/OID
+        '''
+        self.perf_probe = probe
+
+    def _spi_read_write(self, data: bytes, is_end_transaction: bool) -> bytes:
+        #the GPIO poller thread counts its pin reads concurrently
+        with self.gpio_lock:
+            self.usb_round_trips += 1
+        return self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=data, isEndTransaction=is_end_transaction)
+
     def set_rst_n(self, gpio_level: bool) -> None:
-        self.ftdi_gpio_interface.gpio_Write(ft4222.Port.P0, value=gpio_level)
+        with self.gpio_lock:
+            self.usb_round_trips += 1
+            self.ftdi_gpio_interface.gpio_Write(ft4222.Port.P0, value=gpio_level)
 
     def get_rdy_n(self) -> bool:
-        return bool(self.ftdi_gpio_interface.gpio_Read(ft4222.Port.P1))
+        with self.gpio_lock:
+            self.usb_round_trips += 1
+            return bool(self.ftdi_gpio_interface.gpio_Read(ft4222.Port.P1))
 
     def get_int_n(self) -> bool:
-        return bool(self.ftdi_gpio_interface.gpio_Read(ft4222.Port.P3))
+        with self.gpio_lock:
+            self.usb_round_trips += 1
+            return bool(self.ftdi_gpio_interface.gpio_Read(ft4222.Port.P3))
 
     def set_cs_n(self, gpio_level: bool) -> None:
-        self.ftdi_gpio_interface.gpio_Write(ft4222.Port.P2, value=gpio_level)
+        with self.gpio_lock:
+            self.usb_round_trips += 1
+            self.ftdi_gpio_interface.gpio_Write(ft4222.Port.P2, value=gpio_level)
 
     def hard_reset(self) -> None:
+        #the device announces the reset with a notification
+        self.int_n_idle = False
+        self.expected_rsp_key = None
         #put RST_N to low
         self.set_rst_n(False)
         #wait 100ms
@@ -135,6 +405,37 @@ class Ft4222hDevice(UCIDevice):
         self.set_rst_n(True)
         time.sleep(0.1)
 
+    def set_gpio_wait_strategy(self, strategy: EnumGpioWaitStrategy, **kwargs) -> GpioWaiter:
+        '''
+        @brief Select how wait_for_gpio waits for RDY_N / INT_N
+        @param strategy: EnumGpioWaitStrategy
+            GPIO_WAIT_BUSY_POLL: back-to-back pin reads, the legacy behaviour
+            GPIO_WAIT_HYBRID: spin_polls, min_sleep_us, max_sleep_us, backoff (default)
+            GPIO_WAIT_POLLER_THREAD: interval_us
+            GPIO_WAIT_TRIGGER: same kwargs as hybrid, needs an opened device, falls back to hybrid
+                               if the ft4222 module has no GPIO trigger support
+        @return: the new waiter, its stats report polling rate and wake-up latency
+        '''
+        if strategy == EnumGpioWaitStrategy.GPIO_WAIT_BUSY_POLL:
+            waiter = BusyPollGpioWaiter()
+        elif strategy == EnumGpioWaitStrategy.GPIO_WAIT_HYBRID:
+            waiter = HybridGpioWaiter(**kwargs)
+        elif strategy == EnumGpioWaitStrategy.GPIO_WAIT_POLLER_THREAD:
+            waiter = PollerThreadGpioWaiter(**kwargs)
+        elif strategy == EnumGpioWaitStrategy.GPIO_WAIT_TRIGGER:
+            if Ft4222hTriggerGpioWaiter.is_supported(self.ftdi_gpio_interface):
+                waiter = Ft4222hTriggerGpioWaiter(self, **kwargs)
+            else:
+                waiter = HybridGpioWaiter(**kwargs)
+        else:
+            raise ValueError(f"Invalid GPIO wait strategy: {strategy}")
+        self.gpio_waiter.close()
+        self.gpio_waiter = waiter
+        return waiter
+
+    def get_gpio_wait_stats(self) -> GpioWaitStats:
+        return self.gpio_waiter.stats
+
     def wait_for_gpio(self, pin: EnumFtdiGpio, gpio_level: bool, timeout_ms=0):
             if pin == EnumFtdiGpio.FTDI_GPIO_RDY_N:
                 poll_function = self.get_rdy_n
@@ -143,121 +444,151 @@ class Ft4222hDevice(UCIDevice):
             else:
                 return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM
 
-            current_gpio_level = poll_function()
-            start = time.perf_counter()
-            timeout_sec = timeout_ms / 1000
-            while (True):
-                if timeout_ms != 0:
-                    delta = start + timeout_sec - time.perf_counter()
-                    if (delta <= 0):
-                        return EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT
-           
-                current_gpio_level = poll_function()
-                if (current_gpio_level == gpio_level):
-                    return EnumUCIPortStatus.UCI_PORT_STATUS_OK
+            return self.gpio_waiter.wait(pin, poll_function, gpio_level, timeout_ms)
 
     def transmit_uci_command(self, input_command, append_crc=False, timeout_ms=0) -> UCIPortResult:
-        command = list(input_command)
-        target_miso_bytes = []
+        command = bytearray(input_command)
+        target_miso_bytes = b''
         status = EnumUCIPortStatus.UCI_PORT_STATUS_UNDEF
         is_crc_valid = False
 
         if command is None or len(command) < 4:
             status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM
-            return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
+            return UCIPortResult(status, target_miso_bytes, is_crc_valid)
         
         # MAX UCI PACKET LENGTH : 4 + 255 = 259 bytes
         if len(command) > 259:
             status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM
-            return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
+            return UCIPortResult(status, target_miso_bytes, is_crc_valid)
         
         #append CRC16 if required. If append_crc is false, the user is expected to include the crc bytes in the input command
         if append_crc is True:
             crc = nxp_crc.calculate_crc(frame=command)
             command += crc.to_bytes(2, 'little')
             
+        probe = self.perf_probe
+        if probe is not None:
+            tx_start_ns = time.perf_counter_ns()
+        tx_start_round_trips = self.usb_round_trips
         #check if INT_N is asserted before sending the command. If yes, read the response first
-        int_n_level = self.get_int_n()
-        if int_n_level is False:
-            result = self.receive_uci_message(timeout_ms)
-            if result.status is EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-                status = EnumUCIPortStatus.UCI_PORT_STATUS_RECEIVED_PENDING_MSG
-            #response read, wait for INT_N to go high
-            self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms=10)
+        #the fast path trusts INT_N to be released when the previous frame was read completely
+        if not (self.skip_int_n_check and self.int_n_idle):
+            int_n_level = self.get_int_n()
+            if int_n_level is False:
+                rx_start_round_trips = self.usb_round_trips
+                result = self.receive_uci_message(timeout_ms)
+                if result.status is EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                    status = EnumUCIPortStatus.UCI_PORT_STATUS_RECEIVED_PENDING_MSG
+                tx_start_round_trips += self.usb_round_trips - rx_start_round_trips
+                #response read, wait for INT_N to go high
+                self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms=10)
+                if probe is not None:
+                    probe.record('tx.pending_read', time.perf_counter_ns() - tx_start_ns)
+        #a response follows the command
+        self.int_n_idle = False
+        #the response carries the GID/OID of the command, message type response is 0x02 << 5
+        self.expected_rsp_key = self._frame_key((command[0] & 0x0F) | 0x40, command[1])
         
         #put CS_N to low to start transmission
         self.set_cs_n(False)
         #wait for RDY_N to go low
+        if probe is not None:
+            rdy_start_ns = time.perf_counter_ns()
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_RDY_N, False, timeout_ms)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
+            if probe is not None:
+                probe.count('tx.rdy_timeout')
+            return UCIPortResult(status, target_miso_bytes, is_crc_valid)
+        if probe is not None:
+            spi_start_ns = time.perf_counter_ns()
+            probe.record('tx.rdy_wait', spi_start_ns - rdy_start_ns)
         #clock out the data to the device over SPI (SCLK + MOSI lines)
         # target_miso_bytes is the data returned by the device over MISO line during command transmission
-        target_miso_bytes = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes(command), isEndTransaction=True)
+        target_miso_bytes = self._spi_read_write(bytes(command), True)
         #put CS_N to high to stop transmission
         self.set_cs_n(True)
+        self.transport_stats.record_tx(self.usb_round_trips - tx_start_round_trips)
+        if probe is not None:
+            end_ns = time.perf_counter_ns()
+            probe.record('tx.spi', end_ns - spi_start_ns)
+            probe.record('tx.command', end_ns - tx_start_ns, (command[0] & 0x0F, command[1] & 0x3F))
         status = EnumUCIPortStatus.UCI_PORT_STATUS_OK
-        return UCIPortResult(status, list(target_miso_bytes), is_crc_valid)
+        return UCIPortResult(status, target_miso_bytes, is_crc_valid)
 
     def receive_uci_message(self, timeout_ms=400, crc_enable=True) -> UCIPortResult:
-        uci_frame = []
+        '''
+        @brief Read one UCI frame
+        @return: UCIPortResult, the frame (header, payload and CRC16 if crc_enable) is one memoryview
+        '''
+        uci_frame = b''
         is_crc_valid = False
         status = EnumUCIPortStatus.UCI_PORT_STATUS_UNDEF
+        probe = self.perf_probe
+        if probe is not None:
+            wait_start_ns = time.perf_counter_ns()
         #wait for INT_N to go low
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, False, timeout_ms)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
-        #put CS_N to low to start transmission
-        self.set_cs_n(gpio_level=False)
+            self.int_n_idle = False
+            if probe is not None:
+                probe.count('rx.int_n_timeout')
+            return UCIPortResult(status, uci_frame, is_crc_valid)
+        if probe is not None:
+            spi_start_ns = time.perf_counter_ns()
+            probe.record('rx.int_n_wait', spi_start_ns - wait_start_ns)
+        #the read which saw INT_N asserted is the first round trip of the frame
+        rx_start_round_trips = self.usb_round_trips - 1
+        rx_start = time.perf_counter()
+        #put CS_N to low to start transmission, with hardware slave select the FT4222 asserts SS0O for the transfers below
+        if not self.hw_slave_select:
+            self.set_cs_n(gpio_level=False)
         
-        if self.is_ncj29d5 == True:
-            #first get the uci header (host clocks out 4 zeroes over SPI (SCLK + MOSI lines))
-            # NCJ29D5 UCI, contains one invalid byte
-            header = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes([0x00] * 5), isEndTransaction=False)
-            if header is None or len(header) < 5:
-                status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-                return UCIPortResult(status, list(uci_frame), is_crc_valid)
-            #identify payload length to receive (two bytes)
-            payload_length = header[4] +  (header[3] << 8)
-            #get the rest of the payload plus 2 extra bytes of CRC-16
-            if crc_enable == True:
-                payload = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes([0x00] * (payload_length + 2)), isEndTransaction=True)
-            else:
-                payload = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data = bytes([0x00] * (payload_length + 0)), isEndTransaction=True)
-                
+        # NCJ29D5 UCI, contains one invalid byte ahead of the header, NCJ29D6 UCI, no invalid byte
+        prefix = 1 if self.is_ncj29d5 == True else 0
+        crc_length = 2 if crc_enable == True else 0
+        if self.speculative_read and not self.hw_slave_select:
+            frame = self._read_frame_speculative(prefix, crc_length)
         else:
-            # NCJ29D6 UCI, no invalid byte
-            header = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes([0x00] * 4), isEndTransaction=False)
-            if header is None or len(header) < 4:
-                status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-                return UCIPortResult(status, list(uci_frame), is_crc_valid)
-            # identify payload length to receive (two bytes)
-            payload_length = header[3] + (header[2] << 8)
-            if crc_enable == True:
-                payload = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes([0x00] * (payload_length + 2)), isEndTransaction=True)
-            else:
-                payload = self.ftdi_spi_interface.spiMaster_SingleReadWrite(data=bytes([0x00] * (payload_length + 0)), isEndTransaction=True)
+            frame = self._read_frame(prefix, crc_length)
+        if frame is None:
+            if not self.hw_slave_select:
+                self.set_cs_n(gpio_level=True)
+            self.int_n_idle = False
+            if probe is not None:
+                probe.count('rx.spi_error')
+            status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
+            return UCIPortResult(status, uci_frame, is_crc_valid)
+        if probe is not None:
+            release_start_ns = time.perf_counter_ns()
+            probe.record('rx.spi', release_start_ns - spi_start_ns)
         
         #wait for INT_N to go high: Tx done from Slave
         status = self.wait_for_gpio(EnumFtdiGpio.FTDI_GPIO_INT_N, True, timeout_ms)
         if status is not EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
+            self.int_n_idle = False
+            if probe is not None:
+                probe.count('rx.int_n_release_timeout')
+            return UCIPortResult(status, uci_frame, is_crc_valid)
         #put CS_N to high to stop transmission
-        self.set_cs_n(gpio_level=True)
-        #assemble the UCI frame
-        if payload is None:
-            status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_GENERAL
-            return UCIPortResult(status, list(uci_frame), is_crc_valid)
-        
-        if self.is_ncj29d5 == True:
-            uci_frame = header[1:] + payload
-        else:
-            uci_frame = header + payload
+        if not self.hw_slave_select:
+            self.set_cs_n(gpio_level=True)
+        self.int_n_idle = True
+        self.transport_stats.record_rx(self.usb_round_trips - rx_start_round_trips, time.perf_counter() - rx_start)
+        uci_frame = frame
+        if probe is not None:
+            crc_start_ns = time.perf_counter_ns()
+            probe.record('rx.int_n_release', crc_start_ns - release_start_ns)
         
         if crc_enable == True:
             #get the CRC16 from the received frame
             received_crc = uci_frame[-2] | (uci_frame[-1] << 8)
             #validate the CRC16
             is_crc_valid = nxp_crc.is_crc_valid(uci_frame[:-2], received_crc)
+        if probe is not None:
+            end_ns = time.perf_counter_ns()
+            probe.record('rx.crc', end_ns - crc_start_ns)
+            probe.record('rx.frame', end_ns - spi_start_ns, (uci_frame[0] & 0x0F, uci_frame[1] & 0x3F))
+            if crc_enable and not is_crc_valid:
+                probe.count('rx.crc_error')
         status = EnumUCIPortStatus.UCI_PORT_STATUS_OK
-        return UCIPortResult(status, list(uci_frame), is_crc_valid)
+        return UCIPortResult(status, uci_frame, is_crc_valid)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: hot-path instrumentation, per-stage timings in fixed-size log2 histograms
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import atexit
+import json
+import sys
+import time
+
+# bucket i counts durations of [2^(i-1), 2^i) ns, bucket 0 is 0 ns, the last bucket collects everything above
+PERF_HISTOGRAM_BUCKETS = 40
+
+class PerfHistogram():
+    '''
+        @brief log2 histogram of durations in ns, fixed size, record() is O(1)
+    '''
+    __slots__ = ('count', 'sum_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * PERF_HISTOGRAM_BUCKETS
+
+    def record(self, duration_ns: int):
+        if self.count == 0 or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self.count += 1
+        self.sum_ns += duration_ns
+        bucket = duration_ns.bit_length()
+        self.buckets[bucket if bucket < PERF_HISTOGRAM_BUCKETS else PERF_HISTOGRAM_BUCKETS - 1] += 1
+
+    @property
+    def mean_ns(self) -> float:
+        return self.sum_ns / self.count if self.count else 0.0
+
+    def percentile_ns(self, percentile: float) -> int:
+        '''
+            @return: upper bound of the bucket holding the percentile, 0 if empty
+        '''
+        if self.count == 0:
+            return 0
+        rank = self.count * percentile / 100
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(1 << bucket, self.max_ns) if bucket else 0
+        return self.max_ns
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'sum_ns': self.sum_ns, 'min_ns': self.min_ns, 'max_ns': self.max_ns,
+                'mean_ns': self.mean_ns, 'p50_ns': self.percentile_ns(50), 'p99_ns': self.percentile_ns(99),
+                'buckets': list(self.buckets)}
+
+
+class PerfProbe():
+    '''
+        @brief per-stage timings and counters of the transport and UCI layer
+            stages are recorded per key: None for the stage total, (gid, oid) or a frame key per message.
+            The instrumented code only calls the probe behind `if probe is not None`, without a probe
+            the cost is one attribute test per call. Recording is not locked, with several threads
+            recording into one probe a count may get lost now and then.
+    '''
+    def __init__(self):
+        self.histograms = {}    # (stage, key) -> PerfHistogram
+        self.counters = {}      # name -> int
+        self.start_ns = time.perf_counter_ns()
+
+    @staticmethod
+    def now_ns() -> int:
+        return time.perf_counter_ns()
+
+    def record(self, stage: str, duration_ns: int, key=None):
+        histogram = self.histograms.get((stage, key))
+        if histogram is None:
+            histogram = self.histograms[(stage, key)] = PerfHistogram()
+        histogram.record(duration_ns)
+
+    def count(self, name: str, increment=1):
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    def reset(self):
+        self.histograms = {}
+        self.counters = {}
+        self.start_ns = time.perf_counter_ns()
+
+    def get_histogram(self, stage: str, key=None) -> PerfHistogram:
+        return self.histograms.get((stage, key))
+
+    def snapshot(self) -> dict:
+        '''
+            @return: {'elapsed_s', 'counters', 'stages': {stage: {key: histogram dict}}}, keys as strings
+        '''
+        stages = {}
+        for (stage, key), histogram in list(self.histograms.items()):
+            stages.setdefault(stage, {})[self._key_str(key)] = histogram.to_dict()
+        return {'elapsed_s': (time.perf_counter_ns() - self.start_ns) / 1e9, 'counters': dict(self.counters),
+                'stages': stages}
+
+    def dump(self, path=None):
+        '''
+            @brief write the snapshot as JSON to path, the table to stderr without path
+        '''
+        if path is None:
+            sys.stderr.write(str(self))
+            return
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def dump_at_exit(self, path=None):
+        atexit.register(self.dump, path)
+
+    @staticmethod
+    def _key_str(key) -> str:
+        if key is None:
+            return 'all'
+        if isinstance(key, tuple):
+            return '/'.join(f'0x{value:02x}' for value in key)
+        return f'0x{key:04x}' if isinstance(key, int) else str(key)
+
+    def __str__(self) -> str:
+        lines = [f" PERF_PROBE: {(time.perf_counter_ns() - self.start_ns) / 1e9:.1f} s\n"]
+        for (stage, key), histogram in sorted(self.histograms.items(), key=lambda item: (item[0][0], self._key_str(item[0][1]))):
+            lines.append(f"  {stage:>20} {self._key_str(key):>11}: {histogram.count:8d} x, mean {histogram.mean_ns / 1e3:9.1f} us, "
+                         + f"p50 {histogram.percentile_ns(50) / 1e3:9.1f} us, p99 {histogram.percentile_ns(99) / 1e3:9.1f} us, "
+                         + f"max {histogram.max_ns / 1e3:9.1f} us\n")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:>32}: {value}\n")
+        return ''.join(lines)
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: asyncio sniffer device Class
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from console_helper import *
+
+from SnifferDevice import *
+from uci_port import *
+from uci_layer import EnumReaderOverflowPolicy
+
+class AsyncSnifferStats():
+    def __init__(self):
+        self.frames = 0
+        self.frame_drops = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.late_responses = 0
+        self.late_expired = 0
+
+    def __str__(self) -> str:
+        return f" ASYNC_SNIFFER_STATS:\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"     frame_drops: {self.frame_drops}\n" \
+            + f"        timeouts: {self.timeouts}\n" \
+            + f"       cancelled: {self.cancelled}\n" \
+            + f"  late_responses: {self.late_responses}\n" \
+            + f"    late_expired: {self.late_expired}\n"
+
+class AsyncSnifferDevice():
+    '''
+        @brief asyncio front end of SnifferDevice
+            the reader thread of the UCI layer owns the dongle, its results are handed to the event loop,
+            the commands are awaitables, responses resolve the pending waiter of their GID/OID,
+            all other messages go to the frame queue, read with `async for result in device`.
+            One event loop drives several dongles, one reader thread per dongle.
+            A response which comes after its command timed out or was cancelled is dropped, for up to late_response_ms:
+            it would resolve the next command of the same GID/OID instead. A response which never comes is forgotten
+            after late_response_ms (stats.late_expired), a later command of that GID/OID gets its own response.
+    '''
+    def __init__(self, device, frame_queue_size=256, loop=None, late_response_ms=500):
+        self.sniffer = SnifferDevice(device)
+        self.device = device
+        self.loop = loop
+        self.frame_queue_size = frame_queue_size
+        self.frame_queue = None
+        self.waiters = {}           # (message_type, gid, oid) -> deque of asyncio futures
+        self.abandoned = {}         # (message_type, gid, oid) -> deque of the deadlines of the responses given up
+        self.late_response_s = late_response_ms / 1000
+        self.stats = AsyncSnifferStats()
+
+    async def start(self, queue_size=256, overflow_policy=EnumReaderOverflowPolicy.READER_OVERFLOW_DROP_OLDEST,
+                    poll_timeout_ms=10, crc_enabled=False):
+        '''
+            @brief start the reader thread of the device, results are delivered to the running event loop
+        '''
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        if self.frame_queue is None:
+            self.frame_queue = asyncio.Queue(maxsize=self.frame_queue_size)
+        self.sniffer.start_reader(queue_size=queue_size, overflow_policy=overflow_policy,
+                                  poll_timeout_ms=poll_timeout_ms, crc_enabled=crc_enabled, sink=self._reader_sink)
+
+    async def close(self):
+        await asyncio.to_thread(self.sniffer.stop_reader)
+        for futures in self.waiters.values():
+            for future in futures:
+                future.cancel()
+        self.waiters.clear()
+        self.abandoned.clear()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __aiter__(self):
+        return self.frames()
+
+    async def frames(self):
+        '''
+            @brief async iterator of the received messages which no command waits for
+        '''
+        while True:
+            yield await self.frame_queue.get()
+
+    async def get_frame(self, timeout_ms=0):
+        '''
+            @param timeout_ms: 0 means wait forever, like UCILayer.wait_response() / get_frame()
+            @return: UciRspNtfResult, None on timeout
+        '''
+        try:
+            return await asyncio.wait_for(self.frame_queue.get(), timeout_ms / 1000 if timeout_ms != 0 else None)
+        except asyncio.TimeoutError:
+            return None
+
+    def _reader_sink(self, rsp_ntf_result):
+        # reader thread
+        try:
+            self.loop.call_soon_threadsafe(self._on_result, rsp_ntf_result)
+        except RuntimeError:
+            # event loop closed
+            pass
+
+    def _expire_abandoned(self, deadlines: deque, now: float):
+        while deadlines and deadlines[0] <= now:
+            deadlines.popleft()
+            self.stats.late_expired += 1
+
+    def _abandon(self, key):
+        deadlines = self.abandoned.setdefault(key, deque())
+        now = time.monotonic()
+        self._expire_abandoned(deadlines, now)
+        deadlines.append(now + self.late_response_s)
+
+    def _on_result(self, rsp_ntf_result):
+        key = (rsp_ntf_result.message_type, rsp_ntf_result.gid, rsp_ntf_result.oid)
+        deadlines = self.abandoned.get(key)
+        if deadlines:
+            self._expire_abandoned(deadlines, time.monotonic())
+            if deadlines:
+                # response of a wait which timed out or was cancelled, it comes ahead of the responses of later waits
+                deadlines.popleft()
+                self.stats.late_responses += 1
+                return
+        futures = self.waiters.get(key)
+        while futures:
+            future = futures.popleft()
+            if not future.done():
+                future.set_result(rsp_ntf_result)
+                return
+        self.stats.frames += 1
+        if self.frame_queue.full():
+            self.frame_queue.get_nowait()
+            self.stats.frame_drops += 1
+        self.frame_queue.put_nowait(rsp_ntf_result)
+
+    async def _wait_message(self, message_type, gid, oid, timeout_ms, request=None, *args):
+        '''
+            @brief register a waiter for the message, run request(*args) on the reader thread and wait
+            @return: UciRspNtfResult, status UCI_STATUS_FAILED on timeout or if the command was not transmitted
+        '''
+        key = (message_type, gid, oid)
+        future = self.loop.create_future()
+        self.waiters.setdefault(key, deque()).append(future)
+        device_call = None
+        # only a response to a transmitted command can come late, a notification is not requested
+        requested = False
+        try:
+            if request is not None:
+                device_call = self.sniffer.submit_device_call(request, *args)
+                tx_result = await asyncio.wrap_future(device_call)
+                if isinstance(tx_result, UCIPortResult) and tx_result.status not in \
+                        (EnumUCIPortStatus.UCI_PORT_STATUS_OK, EnumUCIPortStatus.UCI_PORT_STATUS_RECEIVED_PENDING_MSG):
+                    log_e("AsyncSnifferDevice: transmit failed, status: %s", tx_result.status.name)
+                    return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, gid, oid, EnumUciStatus.UCI_STATUS_FAILED, [])
+                requested = message_type == EnumUciMessageType.UCI_MT_RESPONSE
+            return await asyncio.wait_for(future, timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            if requested:
+                self._abandon(key)
+            log_e("AsyncSnifferDevice: wait response failed, status: %s", EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT.name)
+            return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+        except asyncio.CancelledError:
+            self.stats.cancelled += 1
+            # a request which the reader already took is on its way, drop its response
+            if message_type == EnumUciMessageType.UCI_MT_RESPONSE and device_call is not None \
+                    and not device_call.cancelled():
+                self._abandon(key)
+            raise
+        finally:
+            futures = self.waiters.get(key)
+            if futures and future in futures:
+                futures.remove(future)
+
+    async def _command(self, oid, timeout_ms, request, *args):
+        return await self._wait_message(EnumUciMessageType.UCI_MT_RESPONSE, EnumUciGid.UWB_SNIFFER_GID.value, oid,
+                                        timeout_ms, request, *args)
+
+    async def hard_reset(self, timeout_ms=400):
+        '''
+            @brief reset the device and wait for the reset notification,
+                   the device drops its pending responses, the late responses are not expected any more
+        '''
+        self.abandoned.clear()
+        return await self._wait_message(EnumUciMessageType.UCI_MT_NOTIFICATION, EnumUciGid.UWB_SNIFFER_GID.value,
+                                        EnumSnifferOid.SNIFFER_RESET_STATUS_NTF_OID.value, timeout_ms,
+                                        self.sniffer.hard_reset)
+
+    async def sniffer_cfg_ranging_app(self, channel_id: int, tx_power: int):
+        cfg = self.sniffer.sniffer_generate_ranging_app_cfg(channel_id, tx_power)
+        if cfg is None:
+            return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_INVALID_PARAM, [])
+        return await self._command(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, 200,
+                                   self.sniffer.uci_sniffer_cfg_ranging_app, cfg)
+
+    async def sniffer_cfg_rx_mode(self, preamble_id: int, sfd_id: int, rx_cycles=1, rx_timeout_us=0xFFFFFF):
+        cfg = self.sniffer.sniffer_generate_rx_mode_cfg(preamble_id, sfd_id, rx_cycles, rx_timeout_us)
+        return await self._command(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, 200,
+                                   self.sniffer.uci_sniffer_cfg_rx_mode, cfg)
+
+    async def sniffer_start_rx_mode(self, timeout_ms=17000):
+        return await self._command(EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value, timeout_ms,
+                                   self.sniffer.uci_sniffer_start_rx_mode)
+
+    async def sniffer_cfg_tx_mode(self, preamble_id: int, sfd_id: int, tx_num: int, tx_interval: int):
+        cfg = self.sniffer.sniffer_generate_tx_mode_cfg(preamble_id, sfd_id, tx_num, tx_interval)
+        return await self._command(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, 200,
+                                   self.sniffer.uci_sniffer_cfg_tx_mode, cfg)
+
+    async def sniffer_start_tx_mode(self, payload, timeout_ms=200):
+        data = self.sniffer.sniffer_generate_tx_payload(payload)
+        return await self._command(EnumSnifferOid.SNIFFER_START_TX_MODE_OID.value, timeout_ms,
+                                   self.sniffer.uci_sniffer_start_tx_mode, data)
+
+    async def sniffer_cfg_ranging_seq(self, cfg):
+        return await self._command(EnumSnifferOid.SNIFFER_CFG_RANGING_SEQ_OID.value, 200,
+                                   self.sniffer.uci_sniffer_cfg_ranging_seq, cfg)
+
+    async def sniffer_start_ranging(self, timeout_ms=17000):
+        return await self._command(EnumSnifferOid.SNIFFER_START_RANGING_OID.value, timeout_ms,
+                                   self.sniffer.uci_sniffer_start_ranging)
+
+    async def sniffer_get_ranging_status(self):
+        return await self._command(EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value, 200,
+                                   self.sniffer.uci_sniffer_get_ranging_status)
+
+    async def sniffer_get_ranging_result(self):
+        return await self._command(EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value, 200,
+                                   self.sniffer.uci_sniffer_get_ranging_result)
+
+    async def sniffer_get_payload(self, index: int):
+        return await self._command(EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value, 200,
+                                   self.sniffer.uci_sniffer_get_payload, index)
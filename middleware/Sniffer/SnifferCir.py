@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: channel impulse responses of the sniffed frames stacked into one array
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import time
+
+from uci_defs import *
+from uci_sniffer_rx_rsp import *
+
+class SnifferCirBatch():
+    '''
+        @brief preallocated (max_frames, tap_count) complex64 array of CIRs, one row per frame
+            add() decodes the taps of a SnifferCirResult straight into the next row, shorter CIRs are zero padded.
+            timestamps, rx_status and first_tap hold the host time, the rx_status of the frame and the tap offset per row.
+            Needs numpy.
+    '''
+    def __init__(self, max_frames: int, tap_count: int):
+        if np is None:
+            raise ImportError("SnifferCirBatch needs numpy")
+        self.max_frames = max_frames
+        self.tap_count = tap_count
+        self.taps = np.zeros((max_frames, tap_count), dtype=np.complex64)
+        self.timestamps = np.zeros(max_frames, dtype=np.float64)
+        self.rx_status = np.zeros(max_frames, dtype=np.uint16)
+        self.first_tap = np.zeros(max_frames, dtype=np.uint16)
+        self.count = 0
+
+    def add(self, cir_result: SnifferCirResult, rx_status=0, timestamp: float = None) -> bool:
+        '''
+            @return: False if the batch is full or the CIR was not read successfully
+        '''
+        if self.count >= self.max_frames or cir_result.status != EnumUciStatus.UCI_STATUS_OK.value:
+            return False
+        row = self.taps[self.count]
+        tap_count = min(cir_result.tap_count, self.tap_count)
+        decode_cir_taps(cir_result.raw, tap_count, row[:tap_count])
+        row[tap_count:] = 0
+        self.timestamps[self.count] = time.time() if timestamp is None else timestamp
+        self.rx_status[self.count] = rx_status
+        self.first_tap[self.count] = cir_result.tap_offset
+        self.count += 1
+        return True
+
+    def is_full(self) -> bool:
+        return self.count >= self.max_frames
+
+    def frames(self):
+        '''
+            @return: view of the filled rows, (count, tap_count)
+        '''
+        return self.taps[:self.count]
+
+    def reset(self):
+        '''
+            @brief start over, the arrays are reused
+        '''
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __str__(self) -> str:
+        return f" CIR_BATCH:\n" \
+            + f"          frames: {self.count} / {self.max_frames}\n" \
+            + f"       tap_count: {self.tap_count}\n"
@@ -9,11 +9,15 @@
                        All rights reserved
 """
 
+import time
+from enum import IntEnum
+
 from console_helper import *
 
 from SnifferRegionParams import *
 from uci_message import *
 from uci_defs import *
+from uci_port import *
 from uci_layer import UCILayer
 
 class SnifferParam():
@@ -25,6 +29,8 @@ class SnifferParam():
         self.tx_power = 14
         self.tx_num = 5
         self.tx_interval = 10000
+        self.rx_cycles = 1
+        self.rx_timeout = 0xFFFFFF
 
     def set_tx_power(self, dbm: int):
         '''
@@ -66,14 +72,214 @@ class SnifferParam():
             raise ValueError('Invalid value for TX interval. Must be between 0 ~ 0xFFFFFF')
         self.tx_interval = tx_interval
 
+    def set_rx_cycles(self, rx_cycles: int):
+        '''
+            rx_cycles: 1 ~ 0xFF, number of RX cycles of one start rx mode command
+        '''
+        if rx_cycles < 1 or rx_cycles > 0xFF:
+            raise ValueError('Invalid value for RX cycles. Must be between 1 ~ 0xFF')
+        self.rx_cycles = rx_cycles
+
+    def set_rx_timeout(self, rx_timeout: int):
+        '''
+            rx_timeout: 0 ~ 0xFFFFFF us
+        '''
+        if rx_timeout < 0 or rx_timeout > 0xFFFFFF:
+            raise ValueError('Invalid value for RX timeout. Must be between 0 ~ 0xFFFFFF')
+        self.rx_timeout = rx_timeout
+
+class EnumSnifferRxRearmMode(IntEnum):
+    SNIFFER_RX_REARM_IMMEDIATE = 0  # send the next start rx mode before the frame is handed to the consumer
+    SNIFFER_RX_REARM_DEFERRED = 1   # send the next start rx mode when the consumer asks for the next frame
+
+class SnifferRxStreamStats():
+    '''
+        @brief statistics of stream_rx()
+            rearm gap: time between the last response of a start rx mode and the next start rx mode command,
+                       the host side part of the window in which the sniffer does not listen
+            drained: results of the outstanding start rx mode collected after the consumer stopped
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.rearms = 0
+        self.timeouts = 0
+        self.other_messages = 0
+        self.drained = 0
+        self.gap_sum_s = 0.0
+        self.gap_min_s = 0.0
+        self.gap_max_s = 0.0
+
+    def record_gap(self, gap_s: float):
+        if self.rearms == 0 or gap_s < self.gap_min_s:
+            self.gap_min_s = gap_s
+        if gap_s > self.gap_max_s:
+            self.gap_max_s = gap_s
+        self.gap_sum_s += gap_s
+        self.rearms += 1
+
+    @property
+    def mean_gap_us(self) -> float:
+        if self.rearms == 0:
+            return 0.0
+        return self.gap_sum_s / self.rearms * 1e6
+
+    def __str__(self) -> str:
+        return f" RX_STREAM_STATS:\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"          rearms: {self.rearms}\n" \
+            + f"        timeouts: {self.timeouts}\n" \
+            + f"  other_messages: {self.other_messages}\n" \
+            + f"         drained: {self.drained}\n" \
+            + f"  mean_rearm_gap: {self.mean_gap_us:.1f} us\n" \
+            + f"   min_rearm_gap: {self.gap_min_s * 1e6:.1f} us\n" \
+            + f"   max_rearm_gap: {self.gap_max_s * 1e6:.1f} us\n"
+
+class SnifferConfigCacheStats():
+    '''
+        @brief statistics of the config cache of SnifferDevice
+            sent: config commands transmitted
+            skipped: config commands not transmitted because the device already had the config
+            invalidations: cache flushes, by a reset notification or invalidate_config_cache()
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sent = 0
+        self.skipped = 0
+        self.invalidations = 0
+
+    def __str__(self) -> str:
+        return f" CONFIG_CACHE_STATS:\n" \
+            + f"            sent: {self.sent}\n" \
+            + f"         skipped: {self.skipped}\n" \
+            + f"   invalidations: {self.invalidations}\n"
+
+class SnifferConfigSkippedResult(UciRspNtfResult):
+    '''
+        @brief result of a config command the config cache did not send as the device already has the config,
+            status UCI_STATUS_OK without payload
+    '''
+    def __init__(self, oid: int):
+        super().__init__(EnumUciMessageType.UCI_MT_RESPONSE, EnumUciGid.UWB_SNIFFER_GID.value, oid,
+                         EnumUciStatus.UCI_STATUS_OK)
+
+# a new ranging app config may reset the rx / tx config of the firmware, their cache entries go with it
+_SNIFFER_CONFIG_DEPENDENTS = {
+    EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value: (EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value,
+                                                       EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value),
+}
+
 class SnifferDevice(UCILayer):
     def __init__(self, device):
         super().__init__(device)
         self.dev = device
+        self.rx_stream_stats = SnifferRxStreamStats()
+        self.rx_stream_drained = []
+        # config OID -> config bytes the device accepted last, flushed by the reset notification
+        self.config_cache = {}
+        self.config_cache_enabled = True
+        self.config_cache_stats = SnifferConfigCacheStats()
+        self.register_notification_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_RESET_STATUS_NTF_OID.value,
+                                            self._reset_status_ntf_callback)
+
+    def set_config_cache(self, enable=True):
+        '''
+            @brief skip sniffer_cfg_ranging_app / sniffer_cfg_rx_mode / sniffer_cfg_tx_mode (and the configs of
+                   sniffer_bring_up_rx) when the device already has the same config, on by default
+                   a skipped command returns a SnifferConfigSkippedResult,
+                   the cache is flushed by hard_reset() and by the reset notification, call invalidate_config_cache()
+                   if the device may have lost its config otherwise, e.g. device.hard_reset() of the transport
+        '''
+        self.config_cache_enabled = enable
+        self.invalidate_config_cache()
+
+    def invalidate_config_cache(self):
+        self.config_cache = {}
+        self.config_cache_stats.invalidations += 1
+
+    def set_config_cached(self, oid: int, cfg):
+        '''
+            @brief record that the device has cfg without sending it, e.g. a config it restored from its NVM at boot
+        '''
+        if self.config_cache_enabled:
+            self.config_cache[oid] = bytes(cfg)
+
+    def get_config_cache_stats(self) -> SnifferConfigCacheStats:
+        return self.config_cache_stats
+
+    def hard_reset(self):
+        '''
+            @brief reset the device and flush the config cache at once, a config sent before the reset notification
+                   is read must not be skipped
+        '''
+        self.device.hard_reset()
+        self.invalidate_config_cache()
+
+    def _reset_status_ntf_callback(self, gid: int, oid: int, payload):
+        # the device starts with its default config after a reset
+        self.invalidate_config_cache()
+        return uci_sniffer_reset_status_ntf_callback(gid, oid, payload)
+
+    def _config_cached(self, oid: int, cfg) -> bool:
+        '''
+            @return: True if the device already has cfg, the command is counted as skipped
+        '''
+        if self.config_cache_enabled and self.config_cache.get(oid) == bytes(cfg):
+            self.config_cache_stats.skipped += 1
+            return True
+        return False
+
+    def _config_sent(self, oid: int):
+        # the config of the device is unknown until the response arrives
+        self.config_cache.pop(oid, None)
+        for dependent in _SNIFFER_CONFIG_DEPENDENTS.get(oid, ()):
+            self.config_cache.pop(dependent, None)
+        self.config_cache_stats.sent += 1
+
+    def _config_result(self, oid: int, cfg, result):
+        if self.config_cache_enabled and result.message_type == EnumUciMessageType.UCI_MT_RESPONSE \
+                and result.oid == oid and result.status == EnumUciStatus.UCI_STATUS_OK.value:
+            self.config_cache[oid] = bytes(cfg)
+
+    # every config command leaves the cache entry unknown, also when it is sent by other callers, e.g. AsyncSnifferDevice
+    def uci_sniffer_cfg_ranging_app(self, cfg: list[int]):
+        self._config_sent(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value)
+        return super().uci_sniffer_cfg_ranging_app(cfg)
+
+    def uci_sniffer_cfg_rx_mode(self, cfg: list[int]):
+        self._config_sent(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value)
+        return super().uci_sniffer_cfg_rx_mode(cfg)
+
+    def uci_sniffer_cfg_tx_mode(self, cfg: list[int]):
+        self._config_sent(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value)
+        return super().uci_sniffer_cfg_tx_mode(cfg)
 
     def sniffer_cfg_ranging_app(self, channel_id: int, tx_power: int):
         '''
             config sniffer ranging parameters
+            returns the response, a SnifferConfigSkippedResult if the config cache skipped the command,
+            None for an invalid channel
+        '''
+        cfg = self.sniffer_generate_ranging_app_cfg(channel_id, tx_power)
+        if cfg is None:
+            return
+        if self._config_cached(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, cfg):
+            return SnifferConfigSkippedResult(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value)
+        self.uci_sniffer_cfg_ranging_app(cfg)
+
+        result = self.wait_response(timeout_ms=200)
+        self._config_result(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, cfg, result)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: " + str(result.status))
+        return result
+
+    def sniffer_generate_ranging_app_cfg(self, channel_id: int, tx_power: int):
+        '''
+            generate the sniffer ranging parameters, None for an invalid channel
         '''
         match channel_id:
             case 5:
@@ -86,7 +292,7 @@ class SnifferDevice(UCILayer):
                 frequency = 7987200
             case default:
                 log_e('Error: Invalid channel id.')
-                return
+                return None
         tx_ramp_up = 80     # tx ramp-up time: 80us
         rx_ramp_up = 100    # rx ramp-up time: 100us
         tx_power_value = tx_power * 4 # tx power value: 0.25dBm/step
@@ -98,34 +304,42 @@ class SnifferDevice(UCILayer):
                            EnumSnifferPayloadCipherMode.SNIFFER_PAYLOAD_CIPHER_DISABLE.value,
                            EnumSnifferTXTempCompMode.SNIFFER_TX_TEMP_COMP_DISABLE.value,
                            EnumSnifferXTALTempCompMode.SNIFFER_XTAL_TEMP_COMP_ENABLE.value)
-        self.uci_sniffer_cfg_ranging_app(cfg)
+        return cfg
+
+
+    def sniffer_cfg_rx_mode(self, preamble_id: int, sfd_id: int, rx_cycles=1, rx_timeout_us=0xFFFFFF):
+        '''
+            config sniffer rx mode
+            returns the response, a SnifferConfigSkippedResult if the config cache skipped the command
+        '''
+        cfg = self.sniffer_generate_rx_mode_cfg(preamble_id, sfd_id, rx_cycles, rx_timeout_us)
+        if self._config_cached(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, cfg):
+            return SnifferConfigSkippedResult(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value)
+        self.uci_sniffer_cfg_rx_mode(cfg)
 
         result = self.wait_response(timeout_ms=200)
+        self._config_result(EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, cfg, result)
         if result.status is not EnumUciStatus.UCI_STATUS_OK:
             log_e("Error: " + str(result.status))
+        return result
 
-
-    def sniffer_cfg_rx_mode(self, preamble_id: int, sfd_id: int):
+    def sniffer_generate_rx_mode_cfg(self, preamble_id: int, sfd_id: int, rx_cycles=1, rx_timeout_us=0xFFFFFF):
         '''
-            config sniffer rx mode
+            generate the sniffer rx mode parameters
+            rx_cycles: 1 ~ 0xFF, rx_timeout_us: timeout of one RX cycle, 0 ~ 0xFFFFFF us
         '''
         radio = sfd_id + 4                  # Radio select depends on default radio setting, in this case, sfd 0 is radio 0x04 and sfd 2 is radio 0x06
         preamble_index = preamble_id - 8    # Preamble index depends on default preamble setting, in this case, preamble 9 is index 1 and preamble 24 is index 16
         sts_offset = 0
         rx_delay = 0                        # Execute rx immediately
-        timeout = 0xFFFFFF                  # Rx timeout: 16777215us, ~ 16.7ms
-        rx_cycles = 1                       # Rx cycles: 1
+        timeout = rx_timeout_us             # Rx timeout, default 16777215us, ~ 16.7s
         cfg = []
         cfg += struct.pack('<BBBBHIBBB', radio, preamble_index, sts_offset,
                            EnumSnifferToaAlgorithmMode.SNIFFER_TOA_ALGORITHM_ENABLE.value,
                            rx_delay, timeout, rx_cycles,
                            EnumSnifferPayloadCipherMode.SNIFFER_PAYLOAD_CIPHER_DISABLE.value,
                            EnumSnifferXTALTempCompMode.SNIFFER_XTAL_TEMP_COMP_ENABLE.value)
-        self.uci_sniffer_cfg_rx_mode(cfg)
-
-        result = self.wait_response(timeout_ms=200)
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+        return cfg
 
     def sniffer_start_rx_mode(self):
         '''
@@ -137,9 +351,190 @@ class SnifferDevice(UCILayer):
 
         return result
 
+    def stream_rx(self, preamble_id=None, sfd_id=None, rx_cycles=1, rx_timeout_us=0xFFFFFF,
+                  rearm=EnumSnifferRxRearmMode.SNIFFER_RX_REARM_IMMEDIATE, max_frames=0, idle_ms=0, stop_event=None):
+        '''
+            continuous sniffer rx mode, yields the SNIFFER_START_RX_MODE results as they arrive
+            preamble_id, sfd_id: config the rx mode first with rx_cycles / rx_timeout_us, None keeps the current config
+            rx_cycles: the device answers every RX cycle, one start rx mode command is re-armed after rx_cycles responses
+            rearm: SNIFFER_RX_REARM_IMMEDIATE re-arms before yielding, the consumer runs while the sniffer listens
+            max_frames: stop after max_frames results, 0 means run until the generator is closed
+            idle_ms: yield None after idle_ms without a result, the RX cycle goes on; 0 means no idle results
+            stop_event: once set, closing the generator does not wait for the outstanding responses, the device
+                        stays in rx mode until its RX timeout, reset it before the next command
+            the re-arm gaps are reported in self.rx_stream_stats
+            raises RuntimeError if the device does not accept the rx mode config
+            There is no command to stop a start rx mode: closing the generator (break, close()) waits for the
+            responses still outstanding, up to rx_timeout_us + 300 ms each, and keeps them in self.rx_stream_drained.
+            With SNIFFER_RX_REARM_IMMEDIATE one start is always outstanding; SNIFFER_RX_REARM_DEFERRED with
+            rx_cycles=1 has none between two frames and closes at once.
+        '''
+        if preamble_id is not None:
+            result = self.sniffer_cfg_rx_mode(preamble_id, sfd_id, rx_cycles, rx_timeout_us)
+            # a rejected config leaves the firmware on its own rx cycles, every start would run into the host timeout
+            if result.status != EnumUciStatus.UCI_STATUS_OK.value:
+                raise RuntimeError(f"rx mode config failed: {result.status}")
+        # host timeout of one RX cycle
+        timeout_ms = rx_timeout_us // 1000 + 300
+        wait_ms = min(idle_ms, timeout_ms) if idle_ms != 0 else timeout_ms
+        stats = self.rx_stream_stats
+        stats.reset()
+        self.rx_stream_drained = []
+        pending = 0     # responses still expected for the outstanding start rx mode command
+        rsp_time = None
+        try:
+            self.uci_sniffer_start_rx_mode()
+            pending = rx_cycles
+            deadline = time.perf_counter() + timeout_ms / 1000
+            while max_frames == 0 or stats.frames < max_frames:
+                # the timeout of an idle wait is reported below, once the RX cycle timed out
+                result = self.wait_response(timeout_ms=wait_ms, report_timeout=wait_ms == timeout_ms)
+                if result.message_type == EnumUciMessageType.UCI_MT_UNDEF and time.perf_counter() < deadline:
+                    # idle, the RX cycle is still running
+                    yield None
+                    continue
+                if result.message_type == EnumUciMessageType.UCI_MT_UNDEF:
+                    # nothing received within the RX timeout, the command is lost, arm again
+                    if wait_ms != timeout_ms:
+                        log_e("Sniffer: rx mode response failed, status: %s", EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT.name)
+                    stats.timeouts += 1
+                    pending = 0
+                elif result.gid != EnumUciGid.UWB_SNIFFER_GID.value or result.oid != EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value:
+                    stats.other_messages += 1
+                    continue
+                else:
+                    pending -= 1
+                    stats.frames += 1
+                rsp_time = time.perf_counter()
+                # the next RX cycle starts now, either by the re-arm or on the outstanding command
+                deadline = rsp_time + timeout_ms / 1000
+                last = max_frames != 0 and stats.frames >= max_frames
+                if pending == 0 and not last and rearm == EnumSnifferRxRearmMode.SNIFFER_RX_REARM_IMMEDIATE:
+                    self.uci_sniffer_start_rx_mode()
+                    stats.record_gap(time.perf_counter() - rsp_time)
+                    pending = rx_cycles
+                if result.message_type != EnumUciMessageType.UCI_MT_UNDEF:
+                    yield result
+                if pending == 0 and not last:
+                    self.uci_sniffer_start_rx_mode()
+                    stats.record_gap(time.perf_counter() - rsp_time)
+                    pending = rx_cycles
+                    deadline = time.perf_counter() + timeout_ms / 1000
+        except KeyboardInterrupt:
+            # the user stops, do not wait for the outstanding command
+            pending = 0
+            raise
+        finally:
+            if stop_event is not None and stop_event.is_set():
+                pending = 0
+            # collect the responses of the outstanding command, they would answer the next command otherwise
+            while pending > 0:
+                result = self.wait_response(timeout_ms=timeout_ms)
+                if result.message_type == EnumUciMessageType.UCI_MT_UNDEF:
+                    break
+                if result.gid == EnumUciGid.UWB_SNIFFER_GID.value and result.oid == EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value:
+                    pending -= 1
+                    stats.drained += 1
+                    self.rx_stream_drained.append(result)
+
+    def stream_rx_cir(self, preamble_id=None, sfd_id=None, tap_offset=0, tap_count=256, rx_timeout_us=0xFFFFFF,
+                      batch=None, max_frames=0):
+        '''
+            continuous rx mode with the CIR of every received frame, yields (rx mode result, SnifferCirResult)
+            the CIR is read while the receiver is idle: one rx cycle per start, re-armed after the CIR was read
+            batch: optional SnifferCirBatch, the CIRs are added until it is full
+            frames with an rx error and failed CIR reads yield None as CIR
+        '''
+        for result in self.stream_rx(preamble_id, sfd_id, rx_cycles=1, rx_timeout_us=rx_timeout_us,
+                                     rearm=EnumSnifferRxRearmMode.SNIFFER_RX_REARM_DEFERRED, max_frames=max_frames):
+            cir_result = None
+            if result.status == EnumUciStatus.UCI_STATUS_OK.value:
+                cir_rsp = self.sniffer_get_cir(tap_offset, tap_count)
+                if cir_rsp.oid == EnumSnifferOid.SNIFFER_GET_CIR_OID.value and cir_rsp.status == EnumUciStatus.UCI_STATUS_OK.value:
+                    cir_result = cir_rsp.uci_result
+                    if batch is not None:
+                        batch.add(cir_result, result.uci_result.rx_status)
+            yield result, cir_result
+
+    def stream_rx_telemetry(self, preamble_id=None, sfd_id=None, rx_timeout_us=0xFFFFFF, telemetry=None,
+                            first_path=True, cfo=True, max_frames=0):
+        '''
+            continuous rx mode with the first path info and / or the CFO of every received frame,
+            yields (rx mode result, SnifferFirstPathResult, SnifferCfoResult)
+            both are read while the receiver is idle like the CIR of stream_rx_cir()
+            telemetry: optional SnifferTelemetry, every rx mode result is added as one row
+            frames with an rx error, disabled and failed reads yield None
+        '''
+        for result in self.stream_rx(preamble_id, sfd_id, rx_cycles=1, rx_timeout_us=rx_timeout_us,
+                                     rearm=EnumSnifferRxRearmMode.SNIFFER_RX_REARM_DEFERRED, max_frames=max_frames):
+            first_path_result = None
+            cfo_result = None
+            if result.status == EnumUciStatus.UCI_STATUS_OK.value:
+                if first_path:
+                    first_path_rsp = self.sniffer_get_first_path_info()
+                    if first_path_rsp.oid == EnumSnifferOid.SNIFFER_GET_FIRST_PATH_INFO_OID.value:
+                        first_path_result = first_path_rsp.uci_result
+                if cfo:
+                    cfo_rsp = self.sniffer_get_cfo()
+                    if cfo_rsp.oid == EnumSnifferOid.SNIFFER_GET_CFO_OID.value:
+                        cfo_result = cfo_rsp.uci_result
+            if telemetry is not None:
+                telemetry.add(result.uci_result, first_path_result, cfo_result)
+            yield result, first_path_result, cfo_result
+
+    def sniffer_bring_up_rx(self, channel_id: int, tx_power: int, preamble_id: int, sfd_id: int, rx_cycles=1,
+                            rx_timeout_us=0xFFFFFF, start=False, window=1):
+        '''
+            config ranging app and rx mode (and start the rx mode) as one command pipeline
+            start: the start rx mode result is the first received frame, it is waited for up to the rx timeout
+            returns the results in command order, a SnifferConfigSkippedResult for a config the device already has
+            (see set_config_cache), None instead of the list for an invalid channel
+        '''
+        cfg = self.sniffer_generate_ranging_app_cfg(channel_id, tx_power)
+        if cfg is None:
+            return None
+        configs = ((EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, cfg),
+                   (EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, self.sniffer_generate_rx_mode_cfg(preamble_id, sfd_id, rx_cycles, rx_timeout_us)))
+        pipeline = self.command_pipeline(window)
+        futures = []
+        for oid, config in configs:
+            if self._config_cached(oid, config):
+                futures.append(SnifferConfigSkippedResult(oid))
+                continue
+            self._config_sent(oid)
+            futures.append(pipeline.submit(EnumUciGid.UWB_SNIFFER_GID.value, oid, config))
+        if start:
+            futures.append(pipeline.submit(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value,
+                                           timeout_ms=rx_timeout_us // 1000 + 300))
+        pipeline.execute()
+        results = [future if isinstance(future, SnifferConfigSkippedResult) else future.result() for future in futures]
+        for (oid, config), result in zip(configs, results):
+            if isinstance(result, SnifferConfigSkippedResult):
+                continue
+            self._config_result(oid, config, result)
+            if result.status != EnumUciStatus.UCI_STATUS_OK.value:
+                log_e("Error: %s", result.status)
+        return results
+
     def sniffer_cfg_tx_mode(self, preamble_id: int, sfd_id: int, tx_num: int, tx_interval: int):
         '''
             config sniffer tx mode
+            returns the response, a SnifferConfigSkippedResult if the config cache skipped the command
+        '''
+        cfg = self.sniffer_generate_tx_mode_cfg(preamble_id, sfd_id, tx_num, tx_interval)
+        if self._config_cached(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, cfg):
+            return SnifferConfigSkippedResult(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value)
+        self.uci_sniffer_cfg_tx_mode(cfg)
+
+        result = self.wait_response(timeout_ms=200)
+        self._config_result(EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, cfg, result)
+        if result.status is not EnumUciStatus.UCI_STATUS_OK:
+            log_e("Error: " + str(result.status))
+        return result
+
+    def sniffer_generate_tx_mode_cfg(self, preamble_id: int, sfd_id: int, tx_num: int, tx_interval: int):
+        '''
+            generate the sniffer tx mode parameters
         '''
         radio = sfd_id + 4 + 0x10           # Radio select depends on default radio setting, in this case, sfd 0 is radio 0x14 and sfd 2 is radio 0x16
         preamble_index = preamble_id - 8    # Preamble index depends on default preamble setting, in this case, preamble 9 is index 1 and preamble 24 is index 16
@@ -155,26 +550,29 @@ class SnifferDevice(UCILayer):
                            EnumSnifferPayloadCipherMode.SNIFFER_PAYLOAD_CIPHER_DISABLE.value,
                            EnumSnifferTXTempCompMode.SNIFFER_TX_TEMP_COMP_DISABLE.value,
                            EnumSnifferXTALTempCompMode.SNIFFER_XTAL_TEMP_COMP_ENABLE.value)
-        self.uci_sniffer_cfg_tx_mode(cfg)
-
-        result = self.wait_response(timeout_ms=200)
-        if result.status is not EnumUciStatus.UCI_STATUS_OK:
-            log_e("Error: " + str(result.status))
+        return cfg
 
     def sniffer_start_tx_mode(self, payload):
         '''
             start sniffer tx mode
         '''
+        data = self.sniffer_generate_tx_payload(payload)
+        self.uci_sniffer_start_tx_mode(data)
+
+        result = self.wait_response(timeout_ms=200)
+        return result
+
+    def sniffer_generate_tx_payload(self, payload):
+        '''
+            generate the start tx mode parameters
+        '''
         payload_len = len(payload)
         if payload_len > 127 or payload_len < 2:
             raise ValueError("Payload length must be between 2 ~ 127 bytes")
         data = []
         data += struct.pack('<B', payload_len)
         data += payload
-        self.uci_sniffer_start_tx_mode(data)
-
-        result = self.wait_response(timeout_ms=200)
-        return result
+        return data
     
     def sniffer_generate_ranging_cmd(self, preamble_id: int, sfd_id: int, delay: int, timeout: int, psdu_index: int):
         '''
@@ -235,3 +633,71 @@ class SnifferDevice(UCILayer):
 
         result = self.wait_response(timeout_ms=200)
         return result
+
+    def sniffer_read_ranging(self, psdu_indexes=(), window=1):
+        '''
+            read the ranging status, the ranging result and the payloads of psdu_indexes as one command pipeline
+            returns (ranging status result, ranging result, list of the payload results),
+            a command which failed with the device has a UCI_STATUS_FAILED result
+        '''
+        pipeline = self.command_pipeline(window)
+        pipeline.submit(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value)
+        pipeline.submit(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value)
+        for index in psdu_indexes:
+            pipeline.submit(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value, [index])
+        status_result, ranging_result, *payload_results = pipeline.execute()
+        return status_result, ranging_result, payload_results
+
+    def sniffer_store_radio_settings(self):
+        '''
+            store the radio settings in the non-volatile memory of the dongle
+        '''
+        self.uci_sniffer_store_radio_settings()
+
+        result = self.wait_response(timeout_ms=1000)
+        return result
+
+    def sniffer_store_ranging_app_settings(self):
+        '''
+            store the current ranging app config in the non-volatile memory, the dongle applies it after a reset
+        '''
+        self.uci_sniffer_store_ranging_app_settings()
+
+        result = self.wait_response(timeout_ms=1000)
+        return result
+
+    def sniffer_clear_ranging_app_settings(self):
+        '''
+            clear the stored ranging app config, the dongle boots with its default config again
+        '''
+        self.uci_sniffer_clear_ranging_app_settings()
+
+        result = self.wait_response(timeout_ms=1000)
+        return result
+
+    def sniffer_get_cir(self, tap_offset=0, tap_count=256):
+        '''
+            get the channel impulse response of the last received frame, uci_result is a SnifferCirResult
+        '''
+        self.uci_sniffer_get_cir(tap_offset, tap_count)
+
+        result = self.wait_response(timeout_ms=200)
+        return result
+
+    def sniffer_get_first_path_info(self):
+        '''
+            get the first path index / power of the last received frame, uci_result is a SnifferFirstPathResult
+        '''
+        self.uci_sniffer_get_first_path_info()
+
+        result = self.wait_response(timeout_ms=200)
+        return result
+
+    def sniffer_get_cfo(self):
+        '''
+            get the carrier frequency offset of the last received frame, uci_result is a SnifferCfoResult
+        '''
+        self.uci_sniffer_get_cfo()
+
+        result = self.wait_response(timeout_ms=200)
+        return result
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: capture health metrics of the sniffers, served in the Prometheus text format
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import math
+import socket
+import threading
+import time
+
+from console_helper import *
+
+from uci_defs import *
+from uci_sniffer_rx_rsp import *
+
+# upper bounds of the RSSI / noise histogram buckets in dBm, equidistant so that the bucket is computed, not searched
+SNIFFER_METRICS_DBM_FIRST_BOUND = -120
+SNIFFER_METRICS_DBM_STEP = 5
+SNIFFER_METRICS_DBM_BUCKETS = 19
+# names of the rx_status bits, see get_trx_bitmap_str()
+SNIFFER_RX_STATUS_BIT_NAMES = (
+    'RX_TOA_DETECT_FAILED', 'RX_SIGNAL_LOST', 'RX_PRMBL_TIMEOUT', 'RX_SFD_TIMEOUT',
+    'RX_SECDED_DECODE_FAILURE', 'RX_RS_DECODE_FAILURE', 'RX_DECODE_CHAIN_FAILURE', 'RX_DATA_BUFFER_OVERFLOW',
+    'RX_STS_MISMATCH', 'BIT9', 'BIT10', 'TX_ERROR', 'BIT12', 'BIT13', 'BIT14', 'BIT15',
+)
+SNIFFER_METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class SnifferMetricsHistogram():
+    '''
+        @brief dBm histogram with the fixed bounds SNIFFER_METRICS_DBM_*, record() is O(1)
+    '''
+    __slots__ = ('count', 'sum', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        # the last bucket is +Inf
+        self.buckets = [0] * (SNIFFER_METRICS_DBM_BUCKETS + 1)
+
+    def record(self, dbm: float):
+        bucket = math.ceil((dbm - SNIFFER_METRICS_DBM_FIRST_BOUND) / SNIFFER_METRICS_DBM_STEP)
+        if bucket < 0:
+            bucket = 0
+        elif bucket > SNIFFER_METRICS_DBM_BUCKETS:
+            bucket = SNIFFER_METRICS_DBM_BUCKETS
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.sum += dbm
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if bucket < SNIFFER_METRICS_DBM_BUCKETS:
+                bound = str(SNIFFER_METRICS_DBM_FIRST_BOUND + bucket * SNIFFER_METRICS_DBM_STEP)
+            else:
+                bound = '+Inf'
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class SnifferMetrics():
+    '''
+        @brief capture health counters of one sniffer, every record_*() is O(1)
+            The capture thread is the only writer, the exporter thread only reads the counters,
+            a scrape may see the counters of one frame partly updated but never blocks the capture.
+            fps: frames of the last complete second
+            rx_err_num: the 8-bit error counter of the sniffer as last reported,
+                        rx_errors: its increments summed up, wrap around included
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.rx_err_num = None
+        self.rx_errors = 0
+        self.rx_status_bits = [0] * len(SNIFFER_RX_STATUS_BIT_NAMES)
+        self.rssi = SnifferMetricsHistogram()
+        self.noise = SnifferMetricsHistogram()
+        self.uci_timeouts = 0
+        self.crc_failures = 0
+        self.queue_drops = 0
+        self.second = 0
+        self.second_frames = 0
+        self.fps = 0
+
+    def record_rx_result(self, rx_result: SnifferRxResult, timestamp: float = None):
+        '''
+            @brief count one SNIFFER_START_RX_MODE result
+            @param timestamp: host time.time() of the frame, None means now
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+        second = int(timestamp)
+        if second != self.second:
+            self.fps = self.second_frames if second == self.second + 1 else 0
+            self.second = second
+            self.second_frames = 0
+        self.second_frames += 1
+        self.frames += 1
+        rx_status = rx_result.rx_status
+        while rx_status:
+            bit = rx_status & -rx_status
+            self.rx_status_bits[bit.bit_length() - 1] += 1
+            rx_status ^= bit
+        if rx_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+            rx_err_num = rx_result.rx_err_num
+            if self.rx_err_num is not None:
+                self.rx_errors += (rx_err_num - self.rx_err_num) & 0xFF
+            self.rx_err_num = rx_err_num
+            self.rssi.record(rx_result.max_overall_rssi)
+            self.noise.record(rx_result.max_noise_rssi)
+
+    def record_result(self, rsp_ntf_result):
+        '''
+            @brief count a UciRspNtfResult, only the SNIFFER_START_RX_MODE responses are frames
+        '''
+        if rsp_ntf_result.oid == EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value and \
+                rsp_ntf_result.gid == EnumUciGid.UWB_SNIFFER_GID.value and \
+                rsp_ntf_result.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+            self.record_rx_result(rsp_ntf_result.uci_result)
+
+    def record_timeout(self):
+        self.uci_timeouts += 1
+
+    def record_crc_failure(self):
+        self.crc_failures += 1
+
+    def record_drop(self, count=1):
+        self.queue_drops += count
+
+    def current_fps(self, now: float = None) -> int:
+        if now is None:
+            now = time.time()
+        second = int(now)
+        if second == self.second:
+            return self.fps
+        if second == self.second + 1:
+            return self.second_frames
+        return 0
+
+    def render(self) -> dict:
+        '''
+            @return: metric name -> sample lines of this sniffer, HELP / TYPE are added by the exporter
+        '''
+        labels = f'sniffer="{self.name}"'
+        return {
+            'sniffer_frames_total': [f'sniffer_frames_total{{{labels}}} {self.frames}'],
+            'sniffer_frames_per_second': [f'sniffer_frames_per_second{{{labels}}} {self.current_fps()}'],
+            'sniffer_rx_err_num': [f'sniffer_rx_err_num{{{labels}}} {self.rx_err_num or 0}'],
+            'sniffer_rx_errors_total': [f'sniffer_rx_errors_total{{{labels}}} {self.rx_errors}'],
+            'sniffer_rx_status_total': [f'sniffer_rx_status_total{{{labels},bit="{bit_name}"}} {count}'
+                                        for bit_name, count in zip(SNIFFER_RX_STATUS_BIT_NAMES, self.rx_status_bits)],
+            'sniffer_rssi_dbm': self.rssi.render('sniffer_rssi_dbm', labels),
+            'sniffer_noise_dbm': self.noise.render('sniffer_noise_dbm', labels),
+            'sniffer_uci_timeouts_total': [f'sniffer_uci_timeouts_total{{{labels}}} {self.uci_timeouts}'],
+            'sniffer_crc_failures_total': [f'sniffer_crc_failures_total{{{labels}}} {self.crc_failures}'],
+            'sniffer_queue_drops_total': [f'sniffer_queue_drops_total{{{labels}}} {self.queue_drops}'],
+        }
+
+    def __str__(self) -> str:
+        return f" SNIFFER_METRICS: {self.name}\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"             fps: {self.current_fps()}\n" \
+            + f"      rx_err_num: {self.rx_err_num}\n" \
+            + f"       rx_errors: {self.rx_errors}\n" \
+            + f"    uci_timeouts: {self.uci_timeouts}\n" \
+            + f"    crc_failures: {self.crc_failures}\n" \
+            + f"     queue_drops: {self.queue_drops}\n"
+
+
+# metric name -> (type, help)
+SNIFFER_METRICS_FAMILIES = {
+    'sniffer_frames_total': ('counter', 'SNIFFER_START_RX_MODE results received'),
+    'sniffer_frames_per_second': ('gauge', 'results received in the last complete second'),
+    'sniffer_rx_err_num': ('gauge', 'rx_err_num of the last received result'),
+    'sniffer_rx_errors_total': ('counter', 'increments of rx_err_num'),
+    'sniffer_rx_status_total': ('counter', 'received results with the rx_status bit set'),
+    'sniffer_rssi_dbm': ('histogram', 'max_overall_rssi of the received results'),
+    'sniffer_noise_dbm': ('histogram', 'max_noise_rssi of the received results'),
+    'sniffer_uci_timeouts_total': ('counter', 'UCI receives ended with UCI_PORT_STATUS_ERR_TIMEOUT'),
+    'sniffer_crc_failures_total': ('counter', 'received UCI frames with an invalid CRC16'),
+    'sniffer_queue_drops_total': ('counter', 'results dropped because a queue was full'),
+}
+
+
+class SnifferMetricsExporter():
+    '''
+        @brief serves the metrics of all registered sniffers on http://host:port/metrics
+            one daemon thread answers the scrapes, it only reads the counters
+    '''
+    def __init__(self, host='127.0.0.1', port=9464):
+        self.host = host
+        self.port = port
+        self.metrics = {}   # name -> SnifferMetrics
+        self.server = None
+        self.thread = None
+        self.running = False
+
+    def get_metrics(self, name: str) -> SnifferMetrics:
+        '''
+            @brief the metrics of the sniffer name, created on first use
+        '''
+        metrics = self.metrics.get(name)
+        if metrics is None:
+            metrics = SnifferMetrics(name)
+            # replace the dict instead of adding to it, a scrape may iterate the old one meanwhile
+            self.metrics = {**self.metrics, name: metrics}
+        return metrics
+
+    def record_captured_frame(self, frame):
+        '''
+            @brief count a SnifferCapturedFrame of SnifferOrchestrator / SnifferPool, one sniffer per dongle location
+        '''
+        self.get_metrics(str(frame.location)).record_rx_result(frame.rx_result, frame.timestamp)
+
+    def render(self) -> str:
+        families = {name: [] for name in SNIFFER_METRICS_FAMILIES}
+        for metrics in self.metrics.values():
+            for name, lines in metrics.render().items():
+                families[name] += lines
+        text = []
+        for name, (metric_type, help_text) in SNIFFER_METRICS_FAMILIES.items():
+            text.append(f'# HELP {name} {help_text}')
+            text.append(f'# TYPE {name} {metric_type}')
+            text += families[name]
+        return '\n'.join(text) + '\n'
+
+    def start(self):
+        if self.running:
+            return
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        # port 0 picks a free port
+        self.port = self.server.getsockname()[1]
+        self.server.listen(8)
+        self.server.settimeout(0.5)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, name="sniffer-metrics", daemon=True)
+        self.thread.start()
+        log_i(f"Sniffer Metrics: serving http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self.server.close()
+        self.thread = None
+        self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _serve(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with conn:
+                try:
+                    self._handle(conn)
+                except OSError as e:
+                    log_w(f"Sniffer Metrics: scrape failed: {e!r}")
+
+    def _handle(self, conn):
+        conn.settimeout(2.0)
+        request = b''
+        while b'\r\n\r\n' not in request and len(request) < 8192:
+            data = conn.recv(4096)
+            if not data:
+                return
+            request += data
+        request_line = request.split(b'\r\n', 1)[0].split()
+        if len(request_line) < 2 or request_line[0] != b'GET':
+            self._reply(conn, '405 Method Not Allowed', 'text/plain', b'')
+        elif request_line[1].split(b'?', 1)[0] not in (b'/metrics', b'/'):
+            self._reply(conn, '404 Not Found', 'text/plain', b'')
+        else:
+            self._reply(conn, '200 OK', SNIFFER_METRICS_CONTENT_TYPE, self.render().encode('utf-8'))
+
+    @staticmethod
+    def _reply(conn, status: str, content_type: str, body: bytes):
+        header = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n" \
+            + "Connection: close\r\n\r\n"
+        conn.sendall(header.encode('ascii') + body)
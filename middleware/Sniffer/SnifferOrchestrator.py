@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: multi-dongle sniffer capture, one worker process per dongle
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import multiprocessing
+import struct
+import time
+from enum import IntEnum
+from multiprocessing.connection import wait
+
+from console_helper import *
+from nxp_ft4222h import *
+
+from SnifferDevice import *
+from uci_sniffer_rx_rsp import LazySnifferRxResult
+
+# one record per frame in a batch: host timestamp, target index of the worker, payload length,
+# followed by the SNIFFER_START_RX_MODE_RSP payload
+SNIFFER_BATCH_RECORD_STRUCT = struct.Struct('<dBH')
+
+class EnumSnifferWorkerMsg(IntEnum):
+    SNIFFER_WORKER_MSG_FRAMES = 0x01    # batch of frame records
+    SNIFFER_WORKER_MSG_READY = 0x02     # dongle opened and configured
+    SNIFFER_WORKER_MSG_ERROR = 0x03     # utf-8 error text, the worker exits afterwards
+
+class EnumSnifferTimeSharePolicy(IntEnum):
+    SNIFFER_TIME_SHARE_ROUND_ROBIN = 0  # every target for dwell_ms in turn
+    SNIFFER_TIME_SHARE_WEIGHTED = 1     # every target for dwell_ms * weight in turn
+    SNIFFER_TIME_SHARE_ACTIVITY = 2     # stay on a target while frames arrive, up to max_dwell_ms, at least dwell_ms
+
+
+class SnifferTarget():
+    '''
+        @brief one channel / SFD / preamble combination to listen on
+            param: the SnifferParam of the target, weight: share of the WEIGHTED time-share policy
+    '''
+    def __init__(self, channel_id: int, sfd_id: int, preamble_id: int, weight=1, param: SnifferParam = None):
+        if param is None:
+            param = SnifferParam(channel=channel_id)
+            param.set_sfd_id(sfd_id)
+            param.set_preamble_id(preamble_id)
+        self.param = param
+        self.weight = weight
+
+    @staticmethod
+    def from_param(param: SnifferParam):
+        return SnifferTarget(param.channel_id, param.sfd_id, param.preamble_id, param=param)
+
+    def key(self) -> tuple:
+        return (self.param.channel_id, self.param.sfd_id, self.param.preamble_id)
+
+    def __str__(self) -> str:
+        return f"ch{self.param.channel_id}/sfd{self.param.sfd_id}/preamble{self.param.preamble_id}"
+
+
+class _FrameBatcher():
+    def __init__(self, conn, batch_size, batch_interval_ms):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.batch_interval_s = batch_interval_ms / 1000
+        self.batch = bytearray([EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_FRAMES.value])
+        self.frames = 0
+        self.start = time.perf_counter()
+
+    def add(self, target_index: int, raw):
+        self.batch += SNIFFER_BATCH_RECORD_STRUCT.pack(time.time(), target_index, len(raw))
+        self.batch += raw
+        self.frames += 1
+        if self.frames >= self.batch_size:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        # a quiet channel sends the frames of the batch after batch_interval_ms all the same
+        if time.perf_counter() - self.start >= self.batch_interval_s:
+            self.flush()
+
+    def flush(self):
+        if self.frames > 0:
+            self.conn.send_bytes(self.batch)
+            del self.batch[1:]
+            self.frames = 0
+        self.start = time.perf_counter()
+
+
+def sniffer_capture(sniffer: SnifferDevice, targets: list[SnifferTarget], conn, stop_event, batch_size=32, batch_interval_ms=50,
+                    policy=EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_ROUND_ROBIN, dwell_ms=1000, max_dwell_ms=4000):
+    '''
+        @brief capture loop of a worker, runs on a reset sniffer until stop_event is set
+               the frames are sent to conn in batches of raw payloads, either batch_size frames or after batch_interval_ms
+               with more than one target the dongle switches between them by the time-share policy,
+               the RX timeout is cut to the dwell time so that a target is left in time
+               a time-shared target is left between two RX cycles (deferred re-arm), no frame is lost by a switch
+               the stream wakes up every batch_interval_ms without a frame to flush the batch and check stop_event,
+               the RX cycles keep the RX timeout of the target
+               only the frames received (UCI_STATUS_OK) are sent, RX timeouts and errors are not
+    '''
+    batcher = _FrameBatcher(conn, batch_size, batch_interval_ms)
+    time_share = len(targets) > 1
+    # an immediate re-arm would start the next RX cycle before the switch, closing the stream waits for its frame
+    rearm = EnumSnifferRxRearmMode.SNIFFER_RX_REARM_DEFERRED if time_share else EnumSnifferRxRearmMode.SNIFFER_RX_REARM_IMMEDIATE
+    while not stop_event.is_set():
+        for target_index, target in enumerate(targets):
+            param = target.param
+            # the channel needs the ranging app config, the rx mode is configured by stream_rx,
+            # the config cache of the sniffer skips both while they do not change
+            sniffer.sniffer_cfg_ranging_app(param.channel_id, param.tx_power)
+            rx_timeout_us = param.rx_timeout
+            if time_share:
+                dwell_s = dwell_ms / 1000
+                if policy == EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_WEIGHTED:
+                    dwell_s *= target.weight
+                rx_timeout_us = min(rx_timeout_us, round(dwell_s * 1e6))
+                switch_time = time.perf_counter()
+                leave_time = switch_time + dwell_s
+            # a stop does not wait for the outstanding RX cycle, the worker closes the dongle
+            stream = sniffer.stream_rx(param.preamble_id, param.sfd_id, rx_cycles=param.rx_cycles,
+                                       rx_timeout_us=rx_timeout_us, rearm=rearm, idle_ms=batch_interval_ms,
+                                       stop_event=stop_event)
+            for result in stream:
+                received = result is not None and result.uci_result.status == EnumUciStatus.UCI_STATUS_OK.value
+                if received:
+                    batcher.add(target_index, result.uci_result.raw)
+                else:
+                    batcher.poll()
+                if stop_event.is_set():
+                    break
+                if not time_share:
+                    continue
+                now = time.perf_counter()
+                if policy == EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_ACTIVITY and received:
+                    leave_time = min(max(leave_time, now + dwell_s), switch_time + max_dwell_ms / 1000)
+                if now >= leave_time:
+                    break
+            # the responses of the rx cycles still outstanding (rx_cycles > 1, immediate re-arm) belong to this target
+            stream.close()
+            for result in sniffer.rx_stream_drained:
+                if result.uci_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+                    batcher.add(target_index, result.uci_result.raw)
+            if stop_event.is_set():
+                break
+    batcher.flush()
+
+
+def sniffer_worker(index: int, device_location: int, targets: list[SnifferTarget], conn, stop_event,
+                   batch_size=32, batch_interval_ms=50,
+                   policy=EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_ROUND_ROBIN, dwell_ms=1000, max_dwell_ms=4000):
+    '''
+        @brief worker process of one dongle: open, reset, capture with sniffer_capture() until stop_event is set
+    '''
+    try:
+        device = Ft4222hDevice(index, device_location)
+        device.open(spi_frequency_hz=1e07, mode=EnumFtdiSpiMode.FTDI_SPI_MODE_SINGLE)
+        sniffer = SnifferDevice(device)
+        # only the raw payload is forwarded, do not decode it here
+        sniffer.set_lazy_decode(True)
+        sniffer.hard_reset()
+        result = sniffer.wait_response(timeout_ms=200)
+        if result.status is not EnumUciStatus.UCI_STATUS_REBOOT:
+            log_e(f"dongle {device_location}: " + str(result.status))
+        conn.send_bytes(bytes([EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_READY.value]))
+
+        sniffer_capture(sniffer, targets, conn, stop_event, batch_size, batch_interval_ms, policy, dwell_ms, max_dwell_ms)
+        device.close()
+    except Exception as e:
+        try:
+            conn.send_bytes(bytes([EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_ERROR.value]) + repr(e).encode('utf-8'))
+        except (OSError, ValueError):
+            pass
+        raise SystemExit(1)
+
+
+class SnifferCapturedFrame():
+    '''
+        @brief a frame received by one of the dongles
+            location: FT4222 location of the dongle, timestamp: host time.time() in the worker
+            target: SnifferTarget the dongle was configured with when it received the frame
+            rx_result: LazySnifferRxResult of the SNIFFER_START_RX_MODE_RSP payload
+    '''
+    __slots__ = ('location', 'timestamp', 'target', 'rx_result')
+
+    def __init__(self, location, timestamp, target, rx_result):
+        self.location = location
+        self.timestamp = timestamp
+        self.target = target
+        self.rx_result = rx_result
+
+
+class SnifferWorkerStats():
+    def __init__(self):
+        self.frames = 0
+        self.batches = 0
+        self.starts = 0
+        self.restarts = 0
+        self.last_error = None
+
+    def __str__(self) -> str:
+        return f" SNIFFER_WORKER_STATS:\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"         batches: {self.batches}\n" \
+            + f"        restarts: {self.restarts}\n" \
+            + f"      last_error: {self.last_error}\n"
+
+
+class SnifferWorker():
+    '''
+        @brief parent side of one worker process
+    '''
+    def __init__(self, index: int, location: int, targets: list[SnifferTarget]):
+        self.index = index
+        self.location = location
+        self.targets = targets
+        self.process = None
+        self.conn = None
+        self.stop_event = None
+        self.ready = False
+        self.restart_at = None
+        self.stats = SnifferWorkerStats()
+
+
+class SnifferOrchestrator():
+    '''
+        @brief capture with every dongle in its own worker process
+            each worker owns one dongle (no GIL shared between the busy polling transports),
+            the frames come back in batches over one pipe per worker, a worker which exits
+            is restarted after restart_backoff_s, doubled for every restart, at most max_restarts times
+    '''
+    def __init__(self, sniffer_params=None, default_param=None, batch_size=32, batch_interval_ms=50,
+                 max_restarts=5, restart_backoff_s=1.0, mp_context=None,
+                 policy=EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_ROUND_ROBIN, dwell_ms=1000, max_dwell_ms=4000):
+        '''
+            @param sniffer_params: dict of device location -> SnifferParam, only these dongles are used,
+                                   None captures with every dongle found
+            @param default_param: SnifferParam of every dongle when sniffer_params is None
+        '''
+        self.sniffer_params = sniffer_params
+        self.default_param = default_param if default_param is not None else SnifferParam(channel=9)
+        self.batch_size = batch_size
+        self.batch_interval_ms = batch_interval_ms
+        self.max_restarts = max_restarts
+        self.restart_backoff_s = restart_backoff_s
+        self.policy = EnumSnifferTimeSharePolicy(policy)
+        self.dwell_ms = dwell_ms
+        self.max_dwell_ms = max_dwell_ms
+        self.mp_context = mp_context if mp_context is not None else multiprocessing.get_context()
+        self.workers = []
+        self.running = False
+
+    def start(self):
+        locations = Ft4222hDeviceManager.get_device_locations()
+        if len(locations) == 0:
+            log_e("No FTDI devices found.")
+            return
+        log_i("Detected " + str(len(locations)) + " FTDI device(s): " + str(locations))
+        for index, location, targets in self.assign_targets(locations):
+            self.workers.append(SnifferWorker(index, location, targets))
+        self.running = True
+        for worker in self.workers:
+            self._start_worker(worker)
+
+    def assign_targets(self, locations: list[int]):
+        '''
+            @return: list of (index, location, list[SnifferTarget]) of the dongles to start
+        '''
+        assignment = []
+        for index, location in enumerate(locations):
+            if self.sniffer_params is not None and location not in self.sniffer_params:
+                continue
+            sniffer_param = self.default_param if self.sniffer_params is None else self.sniffer_params[location]
+            assignment.append((index, location, [SnifferTarget.from_param(sniffer_param)]))
+        return assignment
+
+    def stop(self, timeout_s=20.0):
+        '''
+            @brief stop all workers, a worker stops within batch_interval_ms without waiting for its RX cycle,
+                   workers which did not exit within timeout_s are terminated
+        '''
+        self.running = False
+        for worker in self.workers:
+            if worker.stop_event is not None:
+                worker.stop_event.set()
+        deadline = time.perf_counter() + timeout_s
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(deadline - time.perf_counter(), 0))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.conn.close()
+            worker.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _start_worker(self, worker: SnifferWorker):
+        recv_conn, send_conn = self.mp_context.Pipe(duplex=False)
+        worker.stop_event = self.mp_context.Event()
+        worker.process = self.mp_context.Process(target=sniffer_worker, name=f"sniffer-{worker.location}", daemon=True,
+                                                 args=(worker.index, worker.location, worker.targets, send_conn,
+                                                       worker.stop_event, self.batch_size, self.batch_interval_ms,
+                                                       self.policy, self.dwell_ms, self.max_dwell_ms))
+        worker.process.start()
+        # the child holds the only writing end, the pipe reports EOF when it exits
+        send_conn.close()
+        worker.conn = recv_conn
+        worker.ready = False
+        worker.restart_at = None
+        worker.stats.starts += 1
+
+    def _worker_exited(self, worker: SnifferWorker):
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        worker.process = None
+        worker.conn.close()
+        if not self.running:
+            return
+        if worker.stats.restarts >= self.max_restarts:
+            log_e(f"dongle {worker.location}: worker exited with {exitcode}, no restart left")
+            return
+        backoff_s = self.restart_backoff_s * (2 ** worker.stats.restarts)
+        log_w(f"dongle {worker.location}: worker exited with {exitcode}, restart in {backoff_s:.1f} s")
+        worker.stats.restarts += 1
+        worker.restart_at = time.perf_counter() + backoff_s
+
+    def _decode_batch(self, worker: SnifferWorker, data):
+        frames = []
+        view = memoryview(data)
+        offset = 1
+        while offset < len(view):
+            timestamp, target_index, length = SNIFFER_BATCH_RECORD_STRUCT.unpack_from(view, offset)
+            offset += SNIFFER_BATCH_RECORD_STRUCT.size
+            frames.append(SnifferCapturedFrame(worker.location, timestamp, worker.targets[target_index],
+                                               LazySnifferRxResult(view[offset:offset + length])))
+            offset += length
+        worker.stats.frames += len(frames)
+        worker.stats.batches += 1
+        return frames
+
+    def _handle_message(self, worker: SnifferWorker, data):
+        msg_type = data[0]
+        if msg_type == EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_FRAMES:
+            return self._decode_batch(worker, data)
+        if msg_type == EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_READY:
+            worker.ready = True
+            log_i(f"dongle {worker.location}: capturing")
+        elif msg_type == EnumSnifferWorkerMsg.SNIFFER_WORKER_MSG_ERROR:
+            worker.stats.last_error = bytes(data[1:]).decode('utf-8', 'replace')
+            log_e(f"dongle {worker.location}: {worker.stats.last_error}")
+        return []
+
+    def poll(self, timeout_ms=200) -> list[SnifferCapturedFrame]:
+        '''
+            @brief receive the batches of all workers and supervise them
+            @return: list of SnifferCapturedFrame, empty on timeout
+        '''
+        now = time.perf_counter()
+        for worker in self.workers:
+            if worker.process is None and worker.restart_at is not None and now >= worker.restart_at:
+                self._start_worker(worker)
+        conns = {worker.conn: worker for worker in self.workers if worker.process is not None}
+        timeout_s = timeout_ms / 1000
+        restart_times = [worker.restart_at for worker in self.workers if worker.restart_at is not None]
+        if restart_times:
+            timeout_s = min(timeout_s, max(min(restart_times) - now, 0))
+        if not conns:
+            time.sleep(timeout_s)
+            return []
+        frames = []
+        for conn in wait(list(conns), timeout_s):
+            worker = conns[conn]
+            try:
+                data = conn.recv_bytes()
+            except (EOFError, OSError):
+                self._worker_exited(worker)
+                continue
+            frames += self._handle_message(worker, data)
+        return frames
+
+    def frames(self, timeout_ms=200):
+        '''
+            @brief generator of the captured frames of all dongles, runs until stop()
+        '''
+        while self.running:
+            yield from self.poll(timeout_ms)
+
+    def is_alive(self) -> bool:
+        return any(worker.process is not None or worker.restart_at is not None for worker in self.workers)
+
+
+class SnifferPool(SnifferOrchestrator):
+    '''
+        @brief listen on a set of targets with all connected dongles
+            the targets are spread over the dongles round robin, a dongle with more than one target
+            switches between them by the time-share policy, every frame carries its target.
+            With more dongles than targets the remaining dongles are not used.
+    '''
+    def __init__(self, targets, policy=EnumSnifferTimeSharePolicy.SNIFFER_TIME_SHARE_ROUND_ROBIN, dwell_ms=1000,
+                 max_dwell_ms=4000, **kwargs):
+        '''
+            @param targets: SnifferTargets or (channel_id, sfd_id, preamble_id) tuples
+        '''
+        super().__init__(policy=policy, dwell_ms=dwell_ms, max_dwell_ms=max_dwell_ms, **kwargs)
+        self.targets = []
+        seen = set()
+        for target in targets:
+            if not isinstance(target, SnifferTarget):
+                target = SnifferTarget(*target)
+            if target.key() in seen:
+                continue
+            seen.add(target.key())
+            self.targets.append(target)
+        if len(self.targets) == 0:
+            raise ValueError('No sniffer target given')
+        if len(self.targets) > 0xFF:
+            raise ValueError('At most 255 sniffer targets are supported')
+
+    def assign_targets(self, locations: list[int]):
+        count = min(len(locations), len(self.targets))
+        assignment = []
+        for index in range(count):
+            # the targets of one dongle sorted by channel, a channel switch needs an extra command
+            targets = sorted(self.targets[index::count], key=lambda target: target.param.channel_id)
+            assignment.append((index, locations[index], targets))
+            log_i(f"dongle {locations[index]}: " + ', '.join(str(target) for target in targets))
+        return assignment
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: pcapng capture writer for the sniffed UWB frames
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import os
+import queue
+import struct
+import threading
+import time
+from enum import IntEnum
+
+from console_helper import *
+
+from uci_defs import *
+from uci_sniffer_rx_rsp import *
+
+# pcapng, https://www.ietf.org/archive/id/draft-ietf-opsawg-pcapng-02.html
+PCAPNG_BLOCK_SHB = 0x0A0D0D0A
+PCAPNG_BLOCK_IDB = 0x00000001
+PCAPNG_BLOCK_EPB = 0x00000006
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+PCAPNG_OPT_ENDOFOPT = 0
+PCAPNG_OPT_COMMENT = 1
+PCAPNG_OPT_SHB_USERAPPL = 4
+PCAPNG_OPT_IF_NAME = 2
+PCAPNG_OPT_IF_TSRESOL = 9
+# IEEE 802.15.4 with the TAP pseudo header, https://github.com/jkcko/ieee802.15.4-tap
+LINKTYPE_IEEE802_15_4_TAP = 283
+# channel page of the HRP UWB PHY
+IEEE802_15_4_UWB_CHANNEL_PAGE = 4
+
+class EnumTapTlvType(IntEnum):
+    TAP_TLV_FCS_TYPE = 0
+    TAP_TLV_RSS = 1
+    TAP_TLV_CHANNEL_ASSIGNMENT = 3
+    TAP_TLV_START_OF_FRAME_TS = 5
+
+class EnumTapFcsType(IntEnum):
+    TAP_FCS_NONE = 0
+    TAP_FCS_16_BIT = 1
+    TAP_FCS_32_BIT = 2
+
+_BLOCK_HEADER_STRUCT = struct.Struct('<II')
+_OPTION_HEADER_STRUCT = struct.Struct('<HH')
+_EPB_HEADER_STRUCT = struct.Struct('<IIIII')
+# TAP header with the TLVs FCS type, RSS, channel assignment, start of frame timestamp, all padded to 4 bytes
+_TAP_STRUCT = struct.Struct('<BBH' + 'HHB3x' + 'HHf' + 'HHHB1x' + 'HHQ')
+
+def _pad4(length: int) -> int:
+    return (4 - length % 4) % 4
+
+def _pcapng_options(options) -> bytes:
+    '''
+        @param options: list of (code, bytes)
+    '''
+    buffer = bytearray()
+    for code, value in options:
+        buffer += _OPTION_HEADER_STRUCT.pack(code, len(value)) + value + bytes(_pad4(len(value)))
+    buffer += _OPTION_HEADER_STRUCT.pack(PCAPNG_OPT_ENDOFOPT, 0)
+    return bytes(buffer)
+
+def _pcapng_block(block_type: int, body: bytes) -> bytes:
+    total_length = 12 + len(body)
+    return _BLOCK_HEADER_STRUCT.pack(block_type, total_length) + body + struct.pack('<I', total_length)
+
+def pcapng_section_header(application='python-sniffer') -> bytes:
+    body = struct.pack('<IHHq', PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1) \
+        + _pcapng_options([(PCAPNG_OPT_SHB_USERAPPL, application.encode('utf-8'))])
+    return _pcapng_block(PCAPNG_BLOCK_SHB, body)
+
+def pcapng_interface_description(if_name='uwb0') -> bytes:
+    # timestamps in microseconds
+    body = struct.pack('<HHI', LINKTYPE_IEEE802_15_4_TAP, 0, 0) \
+        + _pcapng_options([(PCAPNG_OPT_IF_NAME, if_name.encode('utf-8')), (PCAPNG_OPT_IF_TSRESOL, bytes([6]))])
+    return _pcapng_block(PCAPNG_BLOCK_IDB, body)
+
+def pcapng_rx_result_packet(rx_result: SnifferRxResult, channel_id: int, timestamp: float,
+                            fcs_type=EnumTapFcsType.TAP_FCS_16_BIT, interface_id=0) -> bytes:
+    '''
+        @brief enhanced packet block of one received frame
+               TAP TLVs: FCS type, RSS (max_overall_rssi), channel, start of frame (host time),
+               the block comment carries rx_status and the RSSI / noise fields
+    '''
+    timestamp_ns = round(timestamp * 1e9)
+    tap = _TAP_STRUCT.pack(0, 0, _TAP_STRUCT.size,
+                           EnumTapTlvType.TAP_TLV_FCS_TYPE.value, 1, fcs_type,
+                           EnumTapTlvType.TAP_TLV_RSS.value, 4, rx_result.max_overall_rssi,
+                           EnumTapTlvType.TAP_TLV_CHANNEL_ASSIGNMENT.value, 3, channel_id, IEEE802_15_4_UWB_CHANNEL_PAGE,
+                           EnumTapTlvType.TAP_TLV_START_OF_FRAME_TS.value, 8, timestamp_ns)
+    payload = rx_result.payload_view
+    packet_length = len(tap) + len(payload)
+    timestamp_us = timestamp_ns // 1000
+    comment = f"rx_status={get_trx_bitmap_str(rx_result.rx_status)} rx_frame_num={rx_result.rx_frame_num} " \
+        + f"rx_err_num={rx_result.rx_err_num} min_overall_rssi={rx_result.min_overall_rssi:.2f} " \
+        + f"max_overall_rssi={rx_result.max_overall_rssi:.2f} min_noise_rssi={rx_result.min_noise_rssi:.2f} " \
+        + f"max_noise_rssi={rx_result.max_noise_rssi:.2f}"
+    body = bytearray(_EPB_HEADER_STRUCT.pack(interface_id, timestamp_us >> 32, timestamp_us & 0xFFFFFFFF,
+                                             packet_length, packet_length))
+    body += tap
+    body += payload
+    body += bytes(_pad4(packet_length))
+    body += _pcapng_options([(PCAPNG_OPT_COMMENT, comment.encode('utf-8'))])
+    return _pcapng_block(PCAPNG_BLOCK_EPB, body)
+
+
+class SnifferPcapWriterStats():
+    def __init__(self):
+        self.frames = 0
+        self.drops = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.files = 0
+        self.flushes = 0
+
+    def __str__(self) -> str:
+        return f" PCAP_WRITER_STATS:\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"           drops: {self.drops}\n" \
+            + f"         skipped: {self.skipped}\n" \
+            + f"           bytes: {self.bytes}\n" \
+            + f"           files: {self.files}\n" \
+            + f"         flushes: {self.flushes}\n"
+
+
+class SnifferPcapWriter():
+    '''
+        @brief streams the received frames to pcapng files, LINKTYPE_IEEE802_15_4_TAP
+            write() only queues the frame and never blocks, a full queue drops the frame (stats.drops),
+            one writer thread encodes the blocks into a large file buffer, flushes it every flush_interval_ms
+            and starts a new file after max_file_bytes or max_file_seconds (0 means no limit)
+    '''
+    def __init__(self, path: str, max_file_bytes=0, max_file_seconds=0, flush_interval_ms=1000, queue_size=4096,
+                 buffer_size=1 << 20, fcs_type=EnumTapFcsType.TAP_FCS_16_BIT, if_name='uwb0'):
+        '''
+            @param path: file name, with rotation the files are numbered: name_00000.pcapng, name_00001.pcapng, ...
+            @param fcs_type: FCS at the end of the payload, the NCJ29D5 delivers the PSDU including the 16-bit FCS
+        '''
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        self.flush_interval_s = flush_interval_ms / 1000
+        self.buffer_size = buffer_size
+        self.fcs_type = EnumTapFcsType(fcs_type)
+        self.if_name = if_name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = SnifferPcapWriterStats()
+        self.file = None
+        self.file_index = 0
+        self.file_bytes = 0
+        self.file_start = 0.0
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_loop, name="pcap-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, rx_result: SnifferRxResult, channel_id: int, timestamp: float = None) -> bool:
+        '''
+            @brief queue one SNIFFER_START_RX_MODE result, results without payload are skipped
+            @param timestamp: host time.time() of the frame, None means now
+            @return: False if the frame was dropped
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self.queue.put_nowait((rx_result, channel_id, timestamp))
+        except queue.Full:
+            self.stats.drops += 1
+            return False
+        return True
+
+    def write_captured_frame(self, frame) -> bool:
+        '''
+            @brief queue a SnifferCapturedFrame of SnifferOrchestrator / SnifferPool
+        '''
+        return self.write(frame.rx_result, frame.target.param.channel_id, frame.timestamp)
+
+    def close(self):
+        self.running = False
+        # only wakes the writer thread up, it ends on its flush interval as well;
+        # a writer thread which died leaves a full queue behind, do not block on it
+        try:
+            self.queue.put_nowait((None, 0, 0.0))
+        except queue.Full:
+            pass
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _file_name(self) -> str:
+        if self.max_file_bytes == 0 and self.max_file_seconds == 0:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}_{self.file_index:05d}{ext if ext else '.pcapng'}"
+
+    def _open_file(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self._file_name(), 'wb', buffering=self.buffer_size)
+        self.file_index += 1
+        self.file_bytes = 0
+        self.file_start = time.perf_counter()
+        self.stats.files += 1
+        self._write_block(pcapng_section_header())
+        self._write_block(pcapng_interface_description(self.if_name))
+
+    def _write_block(self, block: bytes):
+        self.file.write(block)
+        self.file_bytes += len(block)
+        self.stats.bytes += len(block)
+
+    def _rotate_due(self) -> bool:
+        if self.max_file_bytes != 0 and self.file_bytes >= self.max_file_bytes:
+            return True
+        return self.max_file_seconds != 0 and time.perf_counter() - self.file_start >= self.max_file_seconds
+
+    def _writer_loop(self):
+        self._open_file()
+        last_flush = time.perf_counter()
+        while True:
+            try:
+                rx_result, channel_id, timestamp = self.queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                rx_result = None
+            if rx_result is not None:
+                if rx_result.status != EnumUciStatus.UCI_STATUS_OK.value or not rx_result.payload_view:
+                    self.stats.skipped += 1
+                else:
+                    if self._rotate_due():
+                        self._open_file()
+                    self._write_block(pcapng_rx_result_packet(rx_result, channel_id, timestamp, self.fcs_type))
+                    self.stats.frames += 1
+            now = time.perf_counter()
+            if now - last_flush >= self.flush_interval_s:
+                self.file.flush()
+                self.stats.flushes += 1
+                last_flush = now
+            if not self.running and self.queue.empty():
+                break
+        self.file.close()
+        self.file = None
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: per frame telemetry of a capture, stored column-wise
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import math
+import time
+from array import array
+
+from uci_defs import *
+from uci_sniffer_rx_rsp import *
+
+# column name -> array typecode, one row per SNIFFER_START_RX_MODE result
+SNIFFER_TELEMETRY_COLUMNS = (
+    ('timestamp', 'd'),
+    ('status', 'B'),
+    ('rx_status', 'H'),
+    ('rx_frame_num', 'B'),
+    ('rx_err_num', 'B'),
+    ('min_overall_rssi', 'f'),
+    ('max_overall_rssi', 'f'),
+    ('min_noise_rssi', 'f'),
+    ('max_noise_rssi', 'f'),
+    ('first_path_index', 'f'),
+    ('first_path_power', 'f'),
+    ('cfo', 'f'),
+)
+
+_NAN = math.nan
+
+class SnifferTelemetry():
+    '''
+        @brief RSSI, first path and CFO of every received frame in one array('f') / array('d') per field,
+            a row costs 41 bytes instead of a SnifferRxResult with its float objects.
+            Values which were not read (rx error, first path / CFO disabled or failed) are NaN,
+            rx_frame_num / rx_err_num are 0 then.
+            max_rows: add() refuses rows beyond it, 0 means unbounded
+    '''
+    def __init__(self, max_rows=0):
+        self.max_rows = max_rows
+        self.reset()
+
+    def reset(self):
+        '''
+            @brief drop all rows
+        '''
+        self.columns = {name: array(typecode) for name, typecode in SNIFFER_TELEMETRY_COLUMNS}
+        # bound appends of the hot path
+        columns = self.columns
+        self._append_timestamp = columns['timestamp'].append
+        self._append_status = columns['status'].append
+        self._append_rx_status = columns['rx_status'].append
+        self._append_rx_frame_num = columns['rx_frame_num'].append
+        self._append_rx_err_num = columns['rx_err_num'].append
+        self._append_min_overall_rssi = columns['min_overall_rssi'].append
+        self._append_max_overall_rssi = columns['max_overall_rssi'].append
+        self._append_min_noise_rssi = columns['min_noise_rssi'].append
+        self._append_max_noise_rssi = columns['max_noise_rssi'].append
+        self._append_first_path_index = columns['first_path_index'].append
+        self._append_first_path_power = columns['first_path_power'].append
+        self._append_cfo = columns['cfo'].append
+        self.rows = 0
+
+    def add(self, rx_result: SnifferRxResult, first_path_result: SnifferFirstPathResult = None,
+            cfo_result: SnifferCfoResult = None, timestamp: float = None) -> bool:
+        '''
+            @brief append one row
+            @param rx_result: SnifferRxResult or LazySnifferRxResult of the frame
+            @param first_path_result / cfo_result: read after the frame, None if not read
+            @return: False if max_rows is reached
+        '''
+        if self.max_rows and self.rows >= self.max_rows:
+            return False
+        self._append_timestamp(time.time() if timestamp is None else timestamp)
+        self._append_status(rx_result.status)
+        self._append_rx_status(rx_result.rx_status)
+        if rx_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+            self._append_rx_frame_num(rx_result.rx_frame_num)
+            self._append_rx_err_num(rx_result.rx_err_num)
+            self._append_min_overall_rssi(rx_result.min_overall_rssi)
+            self._append_max_overall_rssi(rx_result.max_overall_rssi)
+            self._append_min_noise_rssi(rx_result.min_noise_rssi)
+            self._append_max_noise_rssi(rx_result.max_noise_rssi)
+        else:
+            self._append_rx_frame_num(0)
+            self._append_rx_err_num(0)
+            self._append_min_overall_rssi(_NAN)
+            self._append_max_overall_rssi(_NAN)
+            self._append_min_noise_rssi(_NAN)
+            self._append_max_noise_rssi(_NAN)
+        if first_path_result is not None and first_path_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+            self._append_first_path_index(first_path_result.first_path_index)
+            self._append_first_path_power(first_path_result.first_path_power)
+        else:
+            self._append_first_path_index(_NAN)
+            self._append_first_path_power(_NAN)
+        if cfo_result is not None and cfo_result.status == EnumUciStatus.UCI_STATUS_OK.value:
+            self._append_cfo(cfo_result.cfo)
+        else:
+            self._append_cfo(_NAN)
+        self.rows += 1
+        return True
+
+    def column(self, name: str) -> array:
+        '''
+            @return: the array of the column, owned by the telemetry
+        '''
+        return self.columns[name]
+
+    def to_numpy(self) -> dict:
+        '''
+            @return: column name -> numpy array, a copy of the rows so far (a memcpy per column)
+        '''
+        if np is None:
+            raise ImportError("SnifferTelemetry.to_numpy needs numpy")
+        return {name: np.frombuffer(values, dtype=values.typecode).copy() for name, values in self.columns.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.itemsize * len(values) for values in self.columns.values())
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __str__(self) -> str:
+        return f" SNIFFER_TELEMETRY:\n" \
+            + f"            rows: {self.rows}\n" \
+            + f"          memory: {self.nbytes} bytes\n"
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file: warm boot of the sniffer from the ranging app / radio settings stored on the dongle
+
+@author: duanqiyi
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from enum import IntEnum
+
+from console_helper import *
+
+from uci_defs import *
+from SnifferDevice import SnifferDevice, SnifferParam
+
+SNIFFER_PROFILE_REGISTRY_PATH = os.path.join(os.path.expanduser('~'), '.python_sniffer_profiles.json')
+
+class EnumSnifferBootMode(IntEnum):
+    SNIFFER_BOOT_COLD = 0   # full config after the reset
+    SNIFFER_BOOT_WARM = 1   # the registry says the dongle stores the profile, only the rx mode is configured
+
+def sniffer_profile_fingerprint(ranging_app_cfg) -> str:
+    '''
+        @brief fingerprint of the config bytes a profile stores on the dongle
+    '''
+    return hashlib.sha256(bytes(ranging_app_cfg)).hexdigest()[:16]
+
+
+class SnifferProfileRegistry():
+    '''
+        @brief host side record of the profile stored on every dongle: dongle id -> name, fingerprint, store time
+            The dongle has no command to read its stored settings back, the registry is what the host knows of them:
+            settings stored by another host or tool, or a dongle stored under another id, are not seen.
+            A JSON file, rewritten atomically on every change, several processes may share it.
+    '''
+    def __init__(self, path=SNIFFER_PROFILE_REGISTRY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def get(self, dongle_id: str) -> dict:
+        '''
+            @return: {'name', 'fingerprint', 'channel_id', 'tx_power', 'stored_at'} or None
+        '''
+        with self.lock:
+            return self._load().get(str(dongle_id))
+
+    def set(self, dongle_id: str, name: str, fingerprint: str, param: SnifferParam):
+        with self.lock:
+            entries = self._load()
+            entries[str(dongle_id)] = {'name': name, 'fingerprint': fingerprint, 'channel_id': param.channel_id,
+                                       'tx_power': param.tx_power, 'stored_at': time.time()}
+            self._save(entries)
+
+    def remove(self, dongle_id: str):
+        with self.lock:
+            entries = self._load()
+            if entries.pop(str(dongle_id), None) is not None:
+                self._save(entries)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log_w("Profile registry %s unreadable, starting empty: %r", self.path, e)
+            return {}
+
+    def _save(self, entries: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class SnifferBootStats():
+    '''
+        @brief statistics of SnifferWarmBoot
+            warm_boots / cold_boots: boots with / without the stored profile
+            verify_failures: warm boots the dongle refused, e.g. the settings were cleared or the firmware was updated
+            stores: profiles stored on the dongle
+            last_boot: reset to rx mode configured of the last boot
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.warm_boots = 0
+        self.cold_boots = 0
+        self.verify_failures = 0
+        self.stores = 0
+        self.last_boot_s = 0.0
+
+    def __str__(self) -> str:
+        return f" BOOT_STATS:\n" \
+            + f"      warm_boots: {self.warm_boots}\n" \
+            + f"      cold_boots: {self.cold_boots}\n" \
+            + f" verify_failures: {self.verify_failures}\n" \
+            + f"          stores: {self.stores}\n" \
+            + f"       last_boot: {self.last_boot_s * 1e3:.1f} ms\n"
+
+
+class SnifferWarmBoot():
+    '''
+        @brief reset the dongle and bring the rx mode up, with the ranging app config of a named profile stored on the dongle
+            boot() resets the dongle. If the registry says the dongle stores the profile (same name and fingerprint),
+            the ranging app config is not sent. Otherwise the dongle is fully configured and the profile stored for
+            the next boot.
+            A warm boot trusts the host registry: the dongle cannot report which ranging app config it stores.
+            The rx mode config only shows that it stores one, the dongle rejects the rx mode without a ranging app
+            config; if it does, the boot falls back to a cold boot. A ranging app config stored on the dongle other
+            than through this class, e.g. another channel by another host, is not detected, the dongle keeps it.
+            Store and clear the profiles through store() / clear(), or boot with a cold boot (clear() first).
+            dongle_id: key of the registry, default the USB serial number of an Ft4222hDevice, which follows the
+            dongle to every USB port; 'default' for a transport without a serial number
+    '''
+    def __init__(self, sniffer: SnifferDevice, registry: SnifferProfileRegistry = None, dongle_id=None):
+        self.sniffer = sniffer
+        self.registry = registry if registry is not None else SnifferProfileRegistry()
+        if dongle_id is None:
+            get_serial_number = getattr(sniffer.device, 'get_serial_number', None)
+            dongle_id = get_serial_number() if get_serial_number is not None else None
+            if dongle_id is None:
+                log_w("Dongle serial number unknown, the profile registry entry 'default' is used")
+                dongle_id = 'default'
+        self.dongle_id = str(dongle_id)
+        self.stats = SnifferBootStats()
+
+    def boot(self, name: str, param: SnifferParam, reset=True, store=True) -> EnumSnifferBootMode:
+        '''
+            @brief reset and configure ranging app and rx mode of param,
+                   a warm boot trusts the registry entry of the dongle (see SnifferWarmBoot)
+            @param reset: False if the dongle was just reset by the caller and its reset notification read
+            @param store: store the profile on the dongle after a cold boot
+            @return: EnumSnifferBootMode, raises RuntimeError if the dongle does not accept the config
+        '''
+        start = time.perf_counter()
+        sniffer = self.sniffer
+        if reset:
+            self._reset()
+        ranging_app_cfg = sniffer.sniffer_generate_ranging_app_cfg(param.channel_id, param.tx_power)
+        if ranging_app_cfg is None:
+            raise ValueError(f"invalid channel {param.channel_id}")
+        fingerprint = sniffer_profile_fingerprint(ranging_app_cfg)
+        entry = self.registry.get(self.dongle_id)
+        if entry is not None and entry['name'] == name and entry['fingerprint'] == fingerprint:
+            # the dongle applied the stored ranging app config at boot, as far as the registry knows
+            sniffer.set_config_cached(EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, ranging_app_cfg)
+            result = self._cfg_rx_mode(param)
+            # accepted: the dongle stores a ranging app config, not necessarily this one;
+            # a skipped rx mode config is unchanged since the last reset, the dongle accepted it before
+            if result.status == EnumUciStatus.UCI_STATUS_OK.value:
+                self.stats.warm_boots += 1
+                self.stats.last_boot_s = time.perf_counter() - start
+                return EnumSnifferBootMode.SNIFFER_BOOT_WARM
+            log_w("Warm boot of profile %s refused by dongle %s, configuring it", name, self.dongle_id)
+            self.stats.verify_failures += 1
+            self.registry.remove(self.dongle_id)
+            sniffer.invalidate_config_cache()
+        result = sniffer.sniffer_cfg_ranging_app(param.channel_id, param.tx_power)
+        if result.status != EnumUciStatus.UCI_STATUS_OK.value:
+            raise RuntimeError(f"ranging app config failed: {result.status}")
+        if store:
+            self.store(name, param)
+        result = self._cfg_rx_mode(param)
+        if result.status != EnumUciStatus.UCI_STATUS_OK.value:
+            raise RuntimeError(f"rx mode config failed: {result.status}")
+        self.stats.cold_boots += 1
+        self.stats.last_boot_s = time.perf_counter() - start
+        return EnumSnifferBootMode.SNIFFER_BOOT_COLD
+
+    def store(self, name: str, param: SnifferParam) -> bool:
+        '''
+            @brief store the current radio settings and ranging app config of the dongle as profile name,
+                   the ranging app config of param has to be applied
+            @return: True if the dongle stored both
+        '''
+        sniffer = self.sniffer
+        ranging_app_cfg = sniffer.sniffer_generate_ranging_app_cfg(param.channel_id, param.tx_power)
+        # the registry entry is stale as soon as the dongle starts to overwrite its settings
+        self.registry.remove(self.dongle_id)
+        for result in (sniffer.sniffer_store_radio_settings(), sniffer.sniffer_store_ranging_app_settings()):
+            if result.status != EnumUciStatus.UCI_STATUS_OK.value:
+                log_w("Storing profile %s on dongle %s failed: %s", name, self.dongle_id, result.status)
+                return False
+        self.registry.set(self.dongle_id, name, sniffer_profile_fingerprint(ranging_app_cfg), param)
+        self.stats.stores += 1
+        return True
+
+    def clear(self) -> bool:
+        '''
+            @brief clear the stored ranging app config, the next boot is a cold boot
+        '''
+        self.registry.remove(self.dongle_id)
+        result = self.sniffer.sniffer_clear_ranging_app_settings()
+        return result.status == EnumUciStatus.UCI_STATUS_OK.value
+
+    def _reset(self):
+        sniffer = self.sniffer
+        sniffer.hard_reset()
+        while True:
+            result = sniffer.wait_response(timeout_ms=400)
+            if result.message_type == EnumUciMessageType.UCI_MT_UNDEF:
+                log_e("Dongle %s: no reset notification", self.dongle_id)
+                return
+            if result.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION and \
+                    result.oid == EnumSnifferOid.SNIFFER_RESET_STATUS_NTF_OID.value:
+                return
+
+    def _cfg_rx_mode(self, param: SnifferParam):
+        return self.sniffer.sniffer_cfg_rx_mode(param.preamble_id, param.sfd_id, param.rx_cycles, param.rx_timeout)
@@ -181,7 +181,11 @@ class InvalidFormatError(Exception):
         super().__init__(message)
 
 class UciMessage:
-    def __init__(self, message_type: EnumUciMessageType, packet_boundary_flag: int, gid: int, payload_extension: int, oid: int, payload_length: int, payload: list[int], uci_packets: list = None, response_status: EnumUciStatus = None):
+    def __init__(self, message_type: EnumUciMessageType, packet_boundary_flag: int, gid: int, payload_extension: int, oid: int, payload_length: int, payload: list[int], uci_packets: list = None, response_status: EnumUciStatus = None, byte_stream = None):
+        '''
+            @param payload: list[int] or any bytes-like object
+            @param byte_stream: the received packet, decoded messages keep it instead of assembling the byte stream again
+        '''
         self.message_type = message_type
         self.packet_boundary_flag = packet_boundary_flag
         self.gid = gid
@@ -191,10 +195,17 @@ class UciMessage:
         self.response_status = response_status
         self.payload = payload
         self.uci_packets = uci_packets
-        self.to_byte_stream()
+        if byte_stream is None:
+            self.to_byte_stream()
+        else:
+            self.byte_stream = byte_stream
 
     @classmethod
-    def from_bytes(cls, bytes: list[int], remove_crc: bool = False, prior_pbf: bool = False):
+    def from_bytes(cls, bytes, remove_crc: bool = False, prior_pbf: bool = False):
+        '''
+            @param bytes: the UCI packet, list[int] or bytes-like. A memoryview is sliced without copying,
+                          the payload of the message is then a view into the received frame
+        '''
         uci_packets = [bytes]
         bytes = bytes[:-2] if remove_crc == True else bytes
         if len(bytes) >= 4:
@@ -231,7 +242,8 @@ class UciMessage:
                           payload_length=payload_length,
                           payload=payload,
                           uci_packets=uci_packets,
-                          response_status=response_status)
+                          response_status=response_status,
+                          byte_stream=bytes)
 
     def __str__(self):
         return "message type: " + str(self.message_type.name) + " (" + str("0x{:02x}".format(self.message_type.value)) + ")\n" \
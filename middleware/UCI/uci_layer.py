@@ -1,10 +1,58 @@
+import queue
 import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from enum import IntEnum
 
 from console_helper import *
 
 from uci_defs import *
 from uci_port import *
 from uci_message import *
+from uci_segmentation import *
+from uci_pipeline import *
+
+# messages kept for wait_response() which a command pipeline received for nobody, the oldest are dropped beyond
+UCI_PENDING_RESULTS_MAX = 256
+
+class EnumReaderOverflowPolicy(IntEnum):
+    READER_OVERFLOW_DROP_NEWEST = 0   # keep the queued results, drop the one just received
+    READER_OVERFLOW_DROP_OLDEST = 1   # drop the oldest queued result to make room
+    READER_OVERFLOW_BLOCK = 2         # the reader waits for room, the device is not serviced meanwhile
+
+
+class UCIReaderStats():
+    '''
+        @brief counters of the reader thread
+            frames: results received from the device
+            drops: results lost because the queue was full
+            high_water_mark: highest queue fill level seen
+            idle_polls: receive polls which timed out without a frame
+            receive_errors: failed receives and invalid frames
+            commands: commands transmitted on behalf of other threads
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.drops = 0
+        self.high_water_mark = 0
+        self.idle_polls = 0
+        self.receive_errors = 0
+        self.commands = 0
+
+    def __str__(self) -> str:
+        return f" UCI_READER_STATS:\n" \
+            + f"          frames: {self.frames}\n" \
+            + f"           drops: {self.drops}\n" \
+            + f" high_water_mark: {self.high_water_mark}\n" \
+            + f"      idle_polls: {self.idle_polls}\n" \
+            + f"  receive_errors: {self.receive_errors}\n" \
+            + f"        commands: {self.commands}\n"
+
 
 class UCILayer():
 
@@ -27,11 +75,39 @@ class UCILayer():
         self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value, uci_sniffer_get_ranging_status_rsp_callback)
         self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value, uci_sniffer_get_ranging_result_rsp_callback)
         self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value, uci_sniffer_get_payload_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_CIR_OID.value, uci_sniffer_get_cir_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_FIRST_PATH_INFO_OID.value, uci_sniffer_get_first_path_info_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_CFO_OID.value, uci_sniffer_get_cfo_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_STORE_RADIO_SETTINGS_OID.value, uci_sniffer_store_radio_settings_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_STORE_RANGING_APP_SETTINGS_OID.value, uci_sniffer_store_ranging_app_settings_rsp_callback)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_CLEAR_RANGING_APP_SETTINGS_OID.value, uci_sniffer_clear_ranging_app_settings_rsp_callback)
+        # reader thread mode, see start_reader()
+        self.reader_thread = None
+        self.reader_running = False
+        self.reader_queue = None
+        self.reader_overflow_policy = EnumReaderOverflowPolicy.READER_OVERFLOW_DROP_OLDEST
+        self.reader_poll_timeout_ms = 10
+        self.reader_crc_enabled = False
+        self.reader_sink = None
+        self.reader_stats = UCIReaderStats()
+        self.reader_lock = threading.Lock()
+        self.command_queue = queue.SimpleQueue()
+        self.raw_frame_sink = None
+        # per-stage timings, see set_perf_probe()
+        self.perf_probe = None
+        # capture health counters, see set_metrics()
+        self.metrics = None
+        # PBF segmented messages
+        self.reassembler = UciReassembler()
+        # messages a command pipeline received for nobody, wait_response() returns them first
+        self.pending_results = deque()
+        self.pending_results_drops = 0
         
 
     def register_response_callback(self, gid: int, oid: int, callback):
         '''
-            @brief callback  func(gid, oid, payload: list[int])
+            @brief callback  func(gid, oid, payload: memoryview)
+                   payload is a view into the received frame, convert with list(payload) where a list is needed
         '''
         index = gid * 256 + oid
         # if callback already exists, overwrite it
@@ -39,44 +115,376 @@ class UCILayer():
 
     def register_notification_callback(self, gid: int, oid: int, callback):
         '''
-            @brief callback func(gid, oid, payload: list[int])
+            @brief callback func(gid, oid, payload: memoryview)
         '''
         index = gid * 256 + oid
         self.ntf_callback_table[index] = callback
 
-    def wait_response(self, timeout_ms=200, crc_enabled=False):
-        result = self.device.receive_uci_message(timeout_ms, crc_enabled)
-        rsp_ntf_result = UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+    def set_lazy_decode(self, enable=True):
+        '''
+            @brief decode the rx/ranging results on first field access instead of in the callback
+                   the result objects keep the raw payload, a loop which only checks the status
+                   skips the decoding of the rest; a consumer of every field (pcapng writer, telemetry)
+                   is slower with it, see LazySnifferRxResult
+        '''
+        if enable:
+            start_rx_mode_cb = uci_sniffer_start_rx_mode_rsp_lazy_callback
+            get_ranging_status_cb = uci_sniffer_get_ranging_status_rsp_lazy_callback
+            get_ranging_result_cb = uci_sniffer_get_ranging_result_rsp_lazy_callback
+        else:
+            start_rx_mode_cb = uci_sniffer_start_rx_mode_rsp_callback
+            get_ranging_status_cb = uci_sniffer_get_ranging_status_rsp_callback
+            get_ranging_result_cb = uci_sniffer_get_ranging_result_rsp_callback
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value, start_rx_mode_cb)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value, get_ranging_status_cb)
+        self.register_response_callback(EnumUciGid.UWB_SNIFFER_GID.value, EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value, get_ranging_result_cb)
+
+    def set_raw_frame_sink(self, sink):
+        '''
+            @brief sink(frame) is called with every received raw UCI frame before it is decoded, e.g. UciRingStore.append
+                   the frame is a view of the receive buffer, the sink has to copy what it keeps
+            @param sink: callable, None removes the sink
+        '''
+        self.raw_frame_sink = sink
+
+    def set_perf_probe(self, probe):
+        '''
+            @brief record the stage timings into probe (perf_probe.PerfProbe), None disables
+                   uci.receive / uci.queue_wait, uci.decode, uci.callback per GID/OID; share the probe with the device
+                   (Ft4222hDevice.set_perf_probe) to see the transport stages next to them
+        '''
+        self.perf_probe = probe
+
+    def set_metrics(self, metrics):
+        '''
+            @brief count the received results, UCI timeouts, CRC failures and reader queue drops into metrics
+            @param metrics: SnifferMetrics.SnifferMetrics, None disables
+        '''
+        self.metrics = metrics
+
+    def wait_response(self, timeout_ms=200, crc_enabled=False, report_timeout=True):
+        '''
+            @brief receive one message and run its callback
+                   in reader thread mode the next result is taken from the reader queue instead
+            @param timeout_ms: 0 means wait forever, in both modes, like UCIDevice.receive_uci_message()
+            @param report_timeout: False for a poll, a timeout is then neither logged nor counted
+        '''
+        probe = self.perf_probe
+        if probe is not None:
+            start_ns = time.perf_counter_ns()
+        if self.reader_running:
+            rsp_ntf_result = self.get_frame(timeout_ms)
+            if probe is not None:
+                probe.record('uci.queue_wait', time.perf_counter_ns() - start_ns)
+            if rsp_ntf_result is None:
+                if report_timeout:
+                    if probe is not None:
+                        probe.count('uci.timeout')
+                    if self.metrics is not None:
+                        self.metrics.record_timeout()
+                    log_e("UCI Layer: wait response failed, status: %s", EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT.name)
+                return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+            return rsp_ntf_result
+        if self.pending_results:
+            return self.pending_results.popleft()
+        result, frame = self._receive_assembled(timeout_ms, crc_enabled)
+        if probe is not None:
+            probe.record('uci.receive', time.perf_counter_ns() - start_ns)
         if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_OK:
-            msg = UciMessage.from_bytes(result.msg_buffer)
-            if msg is not None:
-                if msg.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
-                    index = msg.gid * 256 + msg.oid
-                    if index in self.rsp_callback_table:
-                        rsp_ntf_result = self.rsp_callback_table[index](msg.gid, msg.oid, msg.payload)
-                    else:
-                        log_i("UCI Layer: recv a response, no callback, GID: " + hex(msg.gid) + " OID: " + hex(msg.oid) + " payload len: " + str(msg.payload_length))
-                        rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, msg.payload)
-                elif msg.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
-                    index = msg.gid * 256 + msg.oid
-                    if index in self.ntf_callback_table:
-                        rsp_ntf_result = self.ntf_callback_table[index](msg.gid, msg.oid, msg.payload)
-                    else:
-                        log_i("UCI Layer: recv a notification, no callback, GID: " + hex(msg.gid) + " OID:" + hex(msg.oid) + " payload len: " + str(msg.payload_length))
-                        rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, msg.payload)
-                else:
-                    log_e(f"UCI Layer: unknown message type: {msg.message_type}")
-                    return UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_UNKNOWN)
+            rsp_ntf_result = self._dispatch(frame)
+            if rsp_ntf_result is not None:
+                return rsp_ntf_result
+        elif report_timeout or result.status != EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT:
+            if probe is not None:
+                probe.count('uci.timeout' if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT else 'uci.receive_error')
+            if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT and self.metrics is not None:
+                self.metrics.record_timeout()
+            log_e("UCI Layer: wait response failed, status: %s", result.status.name)
+        return UciRspNtfResult(EnumUciMessageType.UCI_MT_UNDEF, 0, 0, EnumUciStatus.UCI_STATUS_FAILED, [])
+
+    def _receive_assembled(self, timeout_ms, crc_enabled):
+        '''
+            @brief receive the next message, the packets of a segmented message are joined
+            @return: (UCIPortResult of the last packet, frame), frame is None if the receive failed
+        '''
+        while True:
+            result = self.device.receive_uci_message(timeout_ms, crc_enabled)
+            if result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                return result, None
+            if crc_enabled and not result.is_crc_valid and self.metrics is not None:
+                self.metrics.record_crc_failure()
+            frame = result.buffer
+            if not (frame[0] & UCI_PBF_MASK or self.reassembler.pending):
+                return result, frame
+            frame = self.reassembler.add(frame, 2 if crc_enabled else 0)
+            if frame is not None:
+                return result, frame
+            # more packets of a segmented message follow
+
+    def _route_result(self, rsp_ntf_result):
+        '''
+            @brief pass on a message received outside of wait_response() / the reader loop
+        '''
+        if self.reader_running and self.reader_thread is threading.current_thread():
+            self.reader_stats.frames += 1
+            if self.reader_sink is not None:
+                self.reader_sink(rsp_ntf_result)
+            else:
+                self._reader_put(rsp_ntf_result)
+        else:
+            if len(self.pending_results) >= UCI_PENDING_RESULTS_MAX:
+                # nobody calls wait_response(), keep the newest
+                self.pending_results.popleft()
+                if self.pending_results_drops == 0:
+                    log_w("UCI Layer: %d messages not read, dropping the oldest", UCI_PENDING_RESULTS_MAX)
+                self.pending_results_drops += 1
+            self.pending_results.append(rsp_ntf_result)
+
+    def _dispatch(self, frame):
+        '''
+            @brief decode a received frame and run its callback
+            @return: UciRspNtfResult, None for an invalid frame
+        '''
+        if self.raw_frame_sink is not None:
+            self.raw_frame_sink(frame)
+        probe = self.perf_probe
+        if probe is not None:
+            decode_start_ns = time.perf_counter_ns()
+        msg = UciMessage.from_bytes(frame)
+        if probe is not None:
+            callback_start_ns = time.perf_counter_ns()
+            probe.record('uci.decode', callback_start_ns - decode_start_ns)
+        if msg is None:
+            if probe is not None:
+                probe.count('uci.invalid_message')
+            log_e("UCI Layer: invalid message received!")
+            return None
+        if msg.message_type == EnumUciMessageType.UCI_MT_RESPONSE:
+            index = msg.gid * 256 + msg.oid
+            if index in self.rsp_callback_table:
+                rsp_ntf_result = self.rsp_callback_table[index](msg.gid, msg.oid, msg.payload)
             else:
-                log_e("UCI Layer: invalid message received!")
+                log_i("UCI Layer: recv a response, no callback, GID: %#x OID: %#x payload len: %d", msg.gid, msg.oid, msg.payload_length)
+                rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, list(msg.payload))
+        elif msg.message_type == EnumUciMessageType.UCI_MT_NOTIFICATION:
+            index = msg.gid * 256 + msg.oid
+            if index in self.ntf_callback_table:
+                rsp_ntf_result = self.ntf_callback_table[index](msg.gid, msg.oid, msg.payload)
+            else:
+                log_i("UCI Layer: recv a notification, no callback, GID: %#x OID: %#x payload len: %d", msg.gid, msg.oid, msg.payload_length)
+                rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_NOT_IMPLEMENTED, list(msg.payload))
         else:
-            log_e(f"UCI Layer: wait response failed, status: {result.status.name}")
+            log_e("UCI Layer: unknown message type: %s", msg.message_type)
+            rsp_ntf_result = UciRspNtfResult(msg.message_type, msg.gid, msg.oid, EnumUciStatus.UCI_STATUS_UNKNOWN)
+        if probe is not None:
+            probe.record('uci.callback', time.perf_counter_ns() - callback_start_ns, (msg.gid, msg.oid))
+        if self.metrics is not None:
+            self.metrics.record_result(rsp_ntf_result)
         return rsp_ntf_result
 
+    # Reader thread mode
+    # One thread owns the UCIDevice: it receives and decodes the messages and pushes the UciRspNtfResults
+    # into a bounded queue, commands of other threads are handed over to it and transmitted between two receives.
+    def start_reader(self, queue_size=256, overflow_policy=EnumReaderOverflowPolicy.READER_OVERFLOW_DROP_OLDEST,
+                     poll_timeout_ms=10, crc_enabled=False, sink=None):
+        '''
+            @brief start the reader thread
+            @param queue_size: maximum number of queued results
+            @param poll_timeout_ms: receive timeout of the reader, upper bound of the command latency while idle
+            @param sink: optional callable sink(rsp_ntf_result), called in the reader thread instead of queueing
+        '''
+        if self.reader_running:
+            return
+        self.reader_queue = queue.Queue(maxsize=queue_size)
+        self.reader_overflow_policy = EnumReaderOverflowPolicy(overflow_policy)
+        self.reader_poll_timeout_ms = poll_timeout_ms
+        self.reader_crc_enabled = crc_enabled
+        self.reader_sink = sink
+        self.reader_stats.reset()
+        self.reader_running = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, name="uci-reader", daemon=True)
+        self.reader_thread.start()
+
+    def stop_reader(self):
+        '''
+            @brief stop the reader thread, queued results stay available through get_frame()
+        '''
+        with self.reader_lock:
+            if not self.reader_running:
+                return
+            self.reader_running = False
+        if self.reader_thread is not threading.current_thread():
+            self.reader_thread.join()
+        self.reader_thread = None
+        # commands handed over during the last loop of the reader
+        self._run_device_calls()
+
+    def get_frame(self, timeout_ms=200):
+        '''
+            @brief next result of the reader thread
+            @param timeout_ms: 0 means wait forever, like wait_response(); a stopped reader returns its queued
+                               results without waiting
+            @return: UciRspNtfResult, None on timeout
+        '''
+        if self.reader_queue is None:
+            return None
+        try:
+            if not self.reader_running:
+                return self.reader_queue.get_nowait()
+            return self.reader_queue.get(timeout=timeout_ms / 1000 if timeout_ms != 0 else None)
+        except queue.Empty:
+            return None
+
+    def get_reader_stats(self) -> UCIReaderStats:
+        return self.reader_stats
+
+    def _reader_loop(self):
+        try:
+            self._reader_run()
+        except Exception as e:
+            log_e(f"UCI Layer: reader thread stopped: {e!r}")
+            with self.reader_lock:
+                self.reader_running = False
+            self._run_device_calls()
+
+    def _reader_run(self):
+        while self.reader_running:
+            self._run_device_calls()
+            result = self.device.receive_uci_message(self.reader_poll_timeout_ms, self.reader_crc_enabled)
+            if result.status == EnumUCIPortStatus.UCI_PORT_STATUS_ERR_TIMEOUT:
+                self.reader_stats.idle_polls += 1
+                continue
+            if result.status != EnumUCIPortStatus.UCI_PORT_STATUS_OK:
+                self.reader_stats.receive_errors += 1
+                continue
+            if self.reader_crc_enabled and not result.is_crc_valid and self.metrics is not None:
+                self.metrics.record_crc_failure()
+            frame = result.buffer
+            if frame[0] & UCI_PBF_MASK or self.reassembler.pending:
+                frame = self.reassembler.add(frame, 2 if self.reader_crc_enabled else 0)
+                if frame is None:
+                    continue
+            try:
+                rsp_ntf_result = self._dispatch(frame)
+            except Exception as e:
+                # a malformed payload must not stop the reader
+                log_e("UCI Layer: callback failed: %r", e)
+                rsp_ntf_result = None
+            if rsp_ntf_result is None:
+                self.reader_stats.receive_errors += 1
+                continue
+            self.reader_stats.frames += 1
+            if self.reader_sink is not None:
+                self.reader_sink(rsp_ntf_result)
+            else:
+                self._reader_put(rsp_ntf_result)
+
+    def _reader_put(self, rsp_ntf_result):
+        reader_queue = self.reader_queue
+        if self.reader_overflow_policy == EnumReaderOverflowPolicy.READER_OVERFLOW_BLOCK:
+            while self.reader_running:
+                try:
+                    reader_queue.put(rsp_ntf_result, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            else:
+                self.reader_stats.drops += 1
+                if self.metrics is not None:
+                    self.metrics.record_drop()
+                return
+        else:
+            try:
+                reader_queue.put_nowait(rsp_ntf_result)
+            except queue.Full:
+                self.reader_stats.drops += 1
+                if self.metrics is not None:
+                    self.metrics.record_drop()
+                if self.reader_overflow_policy == EnumReaderOverflowPolicy.READER_OVERFLOW_DROP_NEWEST:
+                    return
+                try:
+                    reader_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                # only the reader puts, so there is room now
+                reader_queue.put_nowait(rsp_ntf_result)
+        fill_level = reader_queue.qsize()
+        if fill_level > self.reader_stats.high_water_mark:
+            self.reader_stats.high_water_mark = fill_level
+
+    def _run_device_calls(self):
+        while True:
+            try:
+                future, func, args = self.command_queue.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            self.reader_stats.commands += 1
+
+    def device_call(self, func, *args):
+        '''
+            @brief run func(*args) on the thread which owns the device
+                   in reader thread mode the call is handed over to the reader, otherwise it runs right away
+        '''
+        return self.submit_device_call(func, *args).result()
+
+    def submit_device_call(self, func, *args) -> Future:
+        '''
+            @brief non-blocking device_call(), the returned concurrent.futures.Future resolves with func(*args)
+        '''
+        with self.reader_lock:
+            future = Future()
+            hand_over = self.reader_running and self.reader_thread is not threading.current_thread()
+            if hand_over:
+                self.command_queue.put((future, func, args))
+                return future
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _send_command(self, byte_stream):
+        return self.device_call(self._transmit, byte_stream)
+
+    def _transmit(self, byte_stream):
+        '''
+            @brief transmit a command on the thread which owns the device, segmented if it is too long for one packet
+        '''
+        if len(byte_stream) > UCI_PACKET_HEADER_SIZE + UCI_MAX_PACKET_PAYLOAD:
+            return self._transmit_segments(uci_segment_packet(byte_stream))
+        return self.device.transmit_uci_command(byte_stream)
+
+    def _transmit_segments(self, packets: list[bytes]):
+        '''
+            @brief transmit the packets of a segmented command, stops at the first failed packet
+        '''
+        for packet in packets:
+            result = self.device.transmit_uci_command(packet)
+            if result.status not in (EnumUCIPortStatus.UCI_PORT_STATUS_OK, EnumUCIPortStatus.UCI_PORT_STATUS_RECEIVED_PENDING_MSG):
+                break
+        return result
+
+    def get_reassembly_stats(self) -> UciReassemblyStats:
+        return self.reassembler.stats
+
+    def command_pipeline(self, window=1) -> UciCommandPipeline:
+        '''
+            @brief pipeline of commands executed with one hand-over to the device, see UciCommandPipeline;
+                   saves the per command hand-over to the reader thread, not the round trips (window 1)
+                   in reader mode the CRC setting of the reader is used
+        '''
+        return UciCommandPipeline(self, window, self.reader_crc_enabled if self.reader_running else False)
 
     def uci_layer_user_defined_cmd(self, gid: int, oid: int, payload: list[int]):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, gid, 0, oid, len(payload), payload)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
     
     # UCI Sniffer Commands
     def uci_sniffer_cfg_ranging_app(self, cfg: list[int]):
@@ -84,59 +492,90 @@ class UCILayer():
         buf += cfg
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_CFG_RANGING_APP_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
         
     def uci_sniffer_cfg_rx_mode(self, cfg: list[int]):
         buf = []
         buf += cfg
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_CFG_RX_MODE_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
 
     def uci_sniffer_start_rx_mode(self):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_START_RX_MODE_OID.value, 0, [])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
     
     def uci_sniffer_cfg_tx_mode(self, cfg: list[int]):
         buf = []
         buf += cfg
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_CFG_TX_MODE_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
 
     def uci_sniffer_start_tx_mode(self, cfg: list[int]):
         buf = []
         buf += cfg
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_START_TX_MODE_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
     
     def uci_sniffer_cfg_ranging_seq(self, cfg: list[int]):
         buf = []
         buf += cfg
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_CFG_RANGING_SEQ_OID.value, len(buf), buf)
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
     
     def uci_sniffer_start_ranging(self):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_START_RANGING_OID.value, 0, [])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
 
     def uci_sniffer_get_ranging_status(self):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_GET_RANGING_STATUS_OID.value, 0, [])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
 
     def uci_sniffer_get_ranging_result(self):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_GET_RANGING_RESULT_OID.value, 0, [])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
 
     def uci_sniffer_get_payload(self, index):
         msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
                             EnumSnifferOid.SNIFFER_GET_PAYLOAD_OID.value, 1, [index])
-        return self.device.transmit_uci_command(msg.to_byte_stream())
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_get_cir(self, tap_offset: int, tap_count: int):
+        buf = list(SNIFFER_CIR_CMD_STRUCT.pack(tap_offset, tap_count))
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_GET_CIR_OID.value, len(buf), buf)
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_get_first_path_info(self):
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_GET_FIRST_PATH_INFO_OID.value, 0, [])
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_get_cfo(self):
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_GET_CFO_OID.value, 0, [])
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_store_radio_settings(self):
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_STORE_RADIO_SETTINGS_OID.value, 0, [])
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_store_ranging_app_settings(self):
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_STORE_RANGING_APP_SETTINGS_OID.value, 0, [])
+        return self._send_command(msg.to_byte_stream())
+
+    def uci_sniffer_clear_ranging_app_settings(self):
+        msg = UciMessage(EnumUciMessageType.UCI_MT_COMMAND, 0, EnumUciGid.UWB_SNIFFER_GID.value, 0,
+                            EnumSnifferOid.SNIFFER_CLEAR_RANGING_APP_SETTINGS_OID.value, 0, [])
+        return self._send_command(msg.to_byte_stream())
 
 
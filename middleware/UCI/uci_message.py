@@ -25,7 +25,7 @@ def uci_sniffer_reset_status_ntf_callback(gid: int, oid: int, payload: list[int]
         GID OID: 0x6E 0x00
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_RESET_STATUS_NTF: Status: {status.name}")
+    log_d("SNIFFER_RESET_STATUS_NTF: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_NOTIFICATION, gid, oid, status)
 
 
@@ -34,7 +34,7 @@ def uci_sniffer_cfg_tx_mode_rsp_callback(gid: int, oid: int, payload: list[int])
         GID OID: 0x4E 0x18
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_CFG_TX_MODE_RSP: Status: {status.name}")
+    log_d("SNIFFER_CFG_TX_MODE_RSP: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 def uci_sniffer_start_tx_mode_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -49,7 +49,7 @@ def uci_sniffer_cfg_rx_mode_rsp_callback(gid: int, oid: int, payload: list[int])
         GID OID: 0x4E 0x1A
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_CFG_RX_MODE_RSP: Status: {status.name}")
+    log_d("SNIFFER_CFG_RX_MODE_RSP: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 def uci_sniffer_start_rx_mode_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -65,7 +65,7 @@ def uci_sniffer_cfg_ranging_rsp_callback(gid: int, oid: int, payload: list[int])
         GID OID: 0x4E 0x28
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_CFG_RANGING_RSP: Status: {status.name}")
+    log_d("SNIFFER_CFG_RANGING_RSP: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 def uci_sniffer_cfg_ranging_seq_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -73,7 +73,7 @@ def uci_sniffer_cfg_ranging_seq_rsp_callback(gid: int, oid: int, payload: list[i
         GID OID: 0x4E 0x2D
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_CFG_RANGING_SEQ_RSP: Status: {status.name}")
+    log_d("SNIFFER_CFG_RANGING_SEQ_RSP: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 def uci_sniffer_start_ranging_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -81,7 +81,7 @@ def uci_sniffer_start_ranging_rsp_callback(gid: int, oid: int, payload: list[int
         GID OID: 0x4E 0x2E
     '''
     status = EnumUciStatus(payload[0])
-    log_i(f"SNIFFER_START_RANGING_RSP: Status: {status.name}")
+    log_d("SNIFFER_START_RANGING_RSP: Status: %s", status.name)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
 
 def uci_sniffer_get_ranging_status_rsp_callback(gid: int, oid: int, payload: list[int]):
@@ -105,5 +105,72 @@ def uci_sniffer_get_payload_rsp_callback(gid: int, oid: int, payload: list[int])
     rx_payload = SnifferPayload.from_bytes(payload)
     return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, rx_payload.status, rx_payload)
 
+def uci_sniffer_get_cir_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x37
+    '''
+    cir_result = SnifferCirResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, cir_result.status, cir_result)
+
+def uci_sniffer_get_first_path_info_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x39
+    '''
+    first_path_result = SnifferFirstPathResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, first_path_result.status, first_path_result)
+
+def uci_sniffer_get_cfo_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x38
+    '''
+    cfo_result = SnifferCfoResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, cfo_result.status, cfo_result)
+
+def uci_sniffer_store_radio_settings_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x10
+    '''
+    status = EnumUciStatus(payload[0])
+    log_d("SNIFFER_STORE_RADIO_SETTINGS_RSP: Status: %s", status.name)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
+
+def uci_sniffer_store_ranging_app_settings_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x3A
+    '''
+    status = EnumUciStatus(payload[0])
+    log_d("SNIFFER_STORE_RANGING_APP_SETTINGS_RSP: Status: %s", status.name)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
+
+def uci_sniffer_clear_ranging_app_settings_rsp_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x3B
+    '''
+    status = EnumUciStatus(payload[0])
+    log_d("SNIFFER_CLEAR_RANGING_APP_SETTINGS_RSP: Status: %s", status.name)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, status)
+
+# Lazy variants of the result callbacks, the fields are decoded on first access
+def uci_sniffer_start_rx_mode_rsp_lazy_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x1B
+    '''
+    rx_result = LazySnifferRxResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, rx_result.status, rx_result)
+
+def uci_sniffer_get_ranging_status_rsp_lazy_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x35
+    '''
+    rx_status = LazySnifferRangingStatusResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, rx_status.status, rx_status)
+
+def uci_sniffer_get_ranging_result_rsp_lazy_callback(gid: int, oid: int, payload: list[int]):
+    '''
+        GID OID: 0x4E 0x36
+    '''
+    rx_results = LazySnifferRangingResult.from_bytes(payload)
+    return UciRspNtfResult(EnumUciMessageType.UCI_MT_RESPONSE, gid, oid, rx_results.status, rx_results)
+
 
 # @}
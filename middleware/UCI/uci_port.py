@@ -36,10 +36,29 @@ class EnumUCIDeviceStatus(IntEnum):
     UCI_DEVICE_STATUS_CLOSED = 0x01
 
 class UCIPortResult():
-    def __init__(self, status, msg_buffer: list[int], is_crc_valid):
+    def __init__(self, status, msg_buffer, is_crc_valid):
+        '''
+            @param msg_buffer: the received frame, one bytes-like object (bytes, bytearray, memoryview) per frame,
+                               list[int] is accepted as well
+        '''
         self.status = status
-        self.msg_buffer = msg_buffer
+        self.buffer = msg_buffer
         self.is_crc_valid = is_crc_valid
+        self._msg_list = None
+
+    @property
+    def msg_buffer(self) -> list[int]:
+        '''
+            @brief the frame as list[int], built on first access for callers which expect a list
+        '''
+        if self._msg_list is None:
+            self._msg_list = self.buffer if isinstance(self.buffer, list) else list(self.buffer)
+        return self._msg_list
+
+    @msg_buffer.setter
+    def msg_buffer(self, msg_buffer):
+        self.buffer = msg_buffer
+        self._msg_list = None
 
 
 class UCIDevice(ABC):
@@ -66,7 +85,7 @@ class UCIDevice(ABC):
         '''
             @brief abstract method to transmit UCI message, max pakcet size is: 4 + 255 = 259 bytes
             @param msg: list[int]
-            @return: UCIPortResult / [status, list(target_miso_bytes), is_crc_valid]
+            @return: UCIPortResult / [status, target_miso_bytes, is_crc_valid]
                     if param wrong, status = EnumUCIPortStatus.UCI_PORT_STATUS_ERR_BAD_PARAM
         '''
         pass
@@ -75,6 +94,7 @@ class UCIDevice(ABC):
     def receive_uci_message(self, timeout_ms=200, crc_enabled=False) -> UCIPortResult:
         '''
             @brief abstract method to receive UCI message
+            @param timeout_ms: 0 means wait forever
             @return: UCIPortResult / [status: EnumUCIPortStatus, recv_msg_buffer, is_crc_valid]
         '''
         pass
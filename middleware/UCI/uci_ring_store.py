@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file:   memory-mapped ring file of the received raw UCI frames
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+import mmap
+import os
+import struct
+import time
+
+from console_helper import *
+
+# File layout
+#   header (64 bytes): magic, version, header size, capacity, write cursor, oldest cursor, sequence, create time
+#   data area (capacity bytes): records, 8-byte aligned, a record never wraps around the end of the data area,
+#   the unused tail in front of the wrap is marked with UCI_RING_PAD_MARKER.
+# The cursors are byte positions since the creation of the file, the position in the data area is cursor % capacity.
+# The writer publishes the oldest cursor before it overwrites a record and the write cursor / sequence after
+# the record is complete, a reader checks the oldest cursor again after copying a record.
+UCI_RING_MAGIC = b'UCIRING1'
+UCI_RING_VERSION = 1
+UCI_RING_HEADER_SIZE = 64
+UCI_RING_PAD_MARKER = 0xFFFFFFFF
+UCI_RING_HEADER_STRUCT = struct.Struct('<8sIIQQQQd')
+# write cursor, oldest cursor, sequence
+UCI_RING_CURSOR_STRUCT = struct.Struct('<QQQ')
+UCI_RING_CURSOR_OFFSET = 24
+UCI_RING_OLDEST_STRUCT = struct.Struct('<Q')
+UCI_RING_OLDEST_OFFSET = 32
+# record header: frame length, sequence (low 32 bits), host timestamp
+UCI_RING_RECORD_STRUCT = struct.Struct('<IId')
+UCI_RING_LENGTH_STRUCT = struct.Struct('<I')
+
+def _align8(length: int) -> int:
+    return (length + 7) & ~7
+
+
+class UciRingRecord():
+    __slots__ = ('sequence', 'timestamp', 'frame')
+
+    def __init__(self, sequence: int, timestamp: float, frame: bytes):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.frame = frame
+
+    def __str__(self) -> str:
+        return f"#{self.sequence} {self.timestamp:.6f}: {self.frame.hex(' ')}"
+
+
+class UciRingStore():
+    '''
+        @brief fixed-size memory-mapped ring file, append() copies a raw UCI frame into the mapping,
+               no system call per frame, the oldest records are overwritten when the ring is full.
+               An existing ring file of the same capacity is continued, e.g. after a crash, a ring file of another
+               capacity or version is recreated with a warning. Raises ValueError for an existing file which is
+               not a ring file, it is left untouched.
+               Use as raw frame sink of the UCI layer: uci_layer.set_raw_frame_sink(store.append)
+    '''
+    def __init__(self, path: str, capacity=64 << 20):
+        capacity = _align8(capacity)
+        self.path = path
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self.file.seek(0, os.SEEK_END)
+        file_size = self.file.tell()
+        resume = False
+        if file_size != 0:
+            self.file.seek(0)
+            header = self.file.read(UCI_RING_HEADER_STRUCT.size)
+            if len(header) < UCI_RING_HEADER_STRUCT.size or header[:len(UCI_RING_MAGIC)] != UCI_RING_MAGIC:
+                self.file.close()
+                raise ValueError(f"UCI Ring Store: {path} is not a ring file, not overwritten")
+            version, _, file_capacity = UCI_RING_HEADER_STRUCT.unpack(header)[1:4]
+            resume = version == UCI_RING_VERSION and file_capacity == capacity and file_size == UCI_RING_HEADER_SIZE + capacity
+            if not resume:
+                log_w(f"UCI Ring Store: {path} is a ring file of {file_capacity} bytes (version {version}), "
+                      + f"recreated with {capacity} bytes, its records are lost")
+        if resume:
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+        else:
+            self.file.truncate(0)
+            self.file.truncate(UCI_RING_HEADER_SIZE + capacity)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            UCI_RING_HEADER_STRUCT.pack_into(self.mm, 0, UCI_RING_MAGIC, UCI_RING_VERSION, UCI_RING_HEADER_SIZE,
+                                             capacity, 0, 0, 0, time.time())
+        self.capacity = capacity
+        self.write_cursor, self.oldest_cursor, self.sequence = UCI_RING_CURSOR_STRUCT.unpack_from(self.mm, UCI_RING_CURSOR_OFFSET)
+
+    def append(self, frame, timestamp: float = None):
+        '''
+            @brief store one raw UCI frame
+            @param frame: bytes / bytearray / memoryview of the frame
+        '''
+        length = len(frame)
+        record_size = _align8(UCI_RING_RECORD_STRUCT.size + length)
+        if record_size > self.capacity:
+            log_e(f"UCI Ring Store: frame of {length} bytes does not fit into the ring")
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        mm = self.mm
+        cursor = self.write_cursor
+        position = cursor % self.capacity
+        pad_size = 0
+        if position + record_size > self.capacity:
+            pad_size = self.capacity - position
+        end_cursor = cursor + pad_size + record_size
+        if end_cursor - self.oldest_cursor > self.capacity:
+            self._drop_oldest(end_cursor - self.capacity)
+        if pad_size != 0:
+            UCI_RING_LENGTH_STRUCT.pack_into(mm, UCI_RING_HEADER_SIZE + position, UCI_RING_PAD_MARKER)
+            position = 0
+        offset = UCI_RING_HEADER_SIZE + position
+        UCI_RING_RECORD_STRUCT.pack_into(mm, offset, length, self.sequence & 0xFFFFFFFF, timestamp)
+        offset += UCI_RING_RECORD_STRUCT.size
+        mm[offset:offset + length] = frame
+        self.write_cursor = end_cursor
+        self.sequence += 1
+        UCI_RING_CURSOR_STRUCT.pack_into(mm, UCI_RING_CURSOR_OFFSET, self.write_cursor, self.oldest_cursor, self.sequence)
+
+    def _drop_oldest(self, min_cursor: int):
+        # walk over the records which the next record overwrites, publish the new oldest cursor before writing
+        cursor = self.oldest_cursor
+        while cursor < min_cursor:
+            position = cursor % self.capacity
+            length = UCI_RING_LENGTH_STRUCT.unpack_from(self.mm, UCI_RING_HEADER_SIZE + position)[0]
+            if length == UCI_RING_PAD_MARKER:
+                cursor += self.capacity - position
+            else:
+                cursor += _align8(UCI_RING_RECORD_STRUCT.size + length)
+        self.oldest_cursor = cursor
+        UCI_RING_OLDEST_STRUCT.pack_into(self.mm, UCI_RING_OLDEST_OFFSET, cursor)
+
+    def flush(self):
+        '''
+            @brief write the dirty pages to the file, only needed to survive a crash of the operating system
+        '''
+        self.mm.flush()
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.mm.flush()
+        self.mm.close()
+        self.file.close()
+        self.mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class UciRingReader():
+    '''
+        @brief reads a ring file while another process appends to it, or after the writer is gone
+            records overwritten before they were read are counted in lost
+    '''
+    def __init__(self, path: str, from_oldest=True):
+        '''
+            @param from_oldest: start with the oldest record in the ring, otherwise with the next new record
+        '''
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size, capacity = UCI_RING_HEADER_STRUCT.unpack_from(self.mm)[:4]
+        if magic != UCI_RING_MAGIC or version != UCI_RING_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a UCI ring file")
+        self.capacity = capacity
+        self.lost = 0
+        write_cursor, oldest_cursor, sequence = UCI_RING_CURSOR_STRUCT.unpack_from(self.mm, UCI_RING_CURSOR_OFFSET)
+        if from_oldest:
+            self._resync(oldest_cursor, write_cursor, sequence, count_lost=False)
+        else:
+            self.cursor = write_cursor
+            self.next_sequence = sequence & 0xFFFFFFFF
+
+    def _resync(self, oldest_cursor: int, write_cursor: int, sequence: int, count_lost=True):
+        self.cursor = oldest_cursor
+        if oldest_cursor == write_cursor:
+            next_sequence = sequence & 0xFFFFFFFF
+        else:
+            position = oldest_cursor % self.capacity
+            if UCI_RING_LENGTH_STRUCT.unpack_from(self.mm, UCI_RING_HEADER_SIZE + position)[0] == UCI_RING_PAD_MARKER:
+                # the record behind the pad starts the data area
+                position = 0
+            next_sequence = UCI_RING_RECORD_STRUCT.unpack_from(self.mm, UCI_RING_HEADER_SIZE + position)[1]
+        if count_lost:
+            self.lost += (next_sequence - self.next_sequence) & 0xFFFFFFFF
+        self.next_sequence = next_sequence
+
+    def read(self, max_records=0) -> list:
+        '''
+            @brief records appended since the last read
+            @param max_records: 0 means all available records
+            @return: list of UciRingRecord
+        '''
+        records = []
+        mm = self.mm
+        while max_records == 0 or len(records) < max_records:
+            write_cursor, oldest_cursor, sequence = UCI_RING_CURSOR_STRUCT.unpack_from(mm, UCI_RING_CURSOR_OFFSET)
+            if self.cursor < oldest_cursor:
+                self._resync(oldest_cursor, write_cursor, sequence)
+            if self.cursor >= write_cursor:
+                break
+            position = self.cursor % self.capacity
+            offset = UCI_RING_HEADER_SIZE + position
+            if UCI_RING_LENGTH_STRUCT.unpack_from(mm, offset)[0] == UCI_RING_PAD_MARKER:
+                self.cursor += self.capacity - position
+                continue
+            length, record_sequence, timestamp = UCI_RING_RECORD_STRUCT.unpack_from(mm, offset)
+            offset += UCI_RING_RECORD_STRUCT.size
+            frame = mm[offset:offset + length]
+            # the writer may have overwritten the record while it was copied
+            oldest_cursor = UCI_RING_OLDEST_STRUCT.unpack_from(mm, UCI_RING_OLDEST_OFFSET)[0]
+            if self.cursor < oldest_cursor:
+                continue
+            if record_sequence != self.next_sequence:
+                self.lost += (record_sequence - self.next_sequence) & 0xFFFFFFFF
+            records.append(UciRingRecord(record_sequence, timestamp, frame))
+            self.next_sequence = (record_sequence + 1) & 0xFFFFFFFF
+            self.cursor += _align8(UCI_RING_RECORD_STRUCT.size + length)
+        return records
+
+    def tail(self, poll_interval_ms=10, stop_event=None):
+        '''
+            @brief generator of the records as they are appended
+            @param stop_event: optional threading / multiprocessing Event which ends the generator
+        '''
+        while stop_event is None or not stop_event.is_set():
+            records = self.read()
+            if not records:
+                time.sleep(poll_interval_ms / 1000)
+                continue
+            yield from records
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.mm.close()
+        self.file.close()
+        self.mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
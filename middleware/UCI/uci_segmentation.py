@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+
+@file:   UCI segmentation and reassembly by the packet boundary flag (PBF)
+
+@author: luochao
+
+@copyright  Copyright (c) 2019 - 2024, chengdu forthink tech. Co., Ltd.
+                       All rights reserved
+"""
+
+from uci_defs import *
+
+# UCI packet: MT | PBF | GID, OID, length high byte (extended length of the NCJ29D5), length low byte, payload
+UCI_PACKET_HEADER_SIZE = 4
+UCI_MAX_PACKET_PAYLOAD = 255
+UCI_PBF_MASK = 0x10
+
+def uci_segment_packet(byte_stream, max_payload=UCI_MAX_PACKET_PAYLOAD) -> list[bytes]:
+    '''
+        @brief split an assembled UCI message into packets of at most max_payload bytes,
+               PBF is set in all packets but the last
+        @param byte_stream: header and payload of the message, the length field of the header is not used
+        @return: list of packets, the message itself if it fits into one packet
+    '''
+    header = bytes(byte_stream[:UCI_PACKET_HEADER_SIZE])
+    payload = memoryview(bytes(byte_stream))[UCI_PACKET_HEADER_SIZE:]
+    if len(payload) <= max_payload:
+        return [bytes(byte_stream)]
+    first_byte = header[0] & ~UCI_PBF_MASK
+    packets = []
+    for offset in range(0, len(payload), max_payload):
+        segment = payload[offset:offset + max_payload]
+        last = offset + max_payload >= len(payload)
+        packets.append(bytes([first_byte if last else first_byte | UCI_PBF_MASK, header[1],
+                              len(segment) >> 8, len(segment) & 0xFF]) + segment)
+    return packets
+
+
+class UciReassemblyStats():
+    '''
+        @brief counters of the UciReassembler
+            messages: messages reassembled from more than one packet
+            segments: packets received as part of those messages
+            grows: reassembly buffers enlarged because a message was longer than the preallocated size
+            max_message_bytes: longest reassembled payload
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.messages = 0
+        self.segments = 0
+        self.grows = 0
+        self.max_message_bytes = 0
+
+    def __str__(self) -> str:
+        return f" UCI_REASSEMBLY_STATS:\n" \
+            + f"        messages: {self.messages}\n" \
+            + f"        segments: {self.segments}\n" \
+            + f"           grows: {self.grows}\n" \
+            + f"     max_message: {self.max_message_bytes} bytes\n"
+
+
+class _UciPartialMessage():
+    __slots__ = ('buffer', 'length', 'segments')
+
+    def __init__(self, capacity: int):
+        self.buffer = bytearray(UCI_PACKET_HEADER_SIZE + capacity)
+        self.length = UCI_PACKET_HEADER_SIZE
+        self.segments = 0
+
+
+class UciReassembler():
+    '''
+        @brief joins the packets of PBF-segmented messages, one partial message per message type / GID / OID
+            The payloads are copied into a preallocated buffer which doubles when it is too small, the cost is
+            linear in the message length. A completed message hands its buffer over to the caller, the next
+            message of the same GID / OID starts with a new buffer of the size of the largest one seen.
+    '''
+    def __init__(self, initial_capacity=1024):
+        self.initial_capacity = initial_capacity
+        self.partial = {}       # first header byte without PBF, OID -> _UciPartialMessage
+        self.capacity = {}      # same key -> largest payload seen
+        self.pending = 0        # number of partial messages
+        self.stats = UciReassemblyStats()
+
+    def add(self, frame, crc_length=0):
+        '''
+            @brief add a received packet
+            @param frame: the UCI packet, bytes-like
+            @param crc_length: 2 if the packet ends with the CRC16, it is not copied
+            @return: the complete message, a memoryview (header with PBF cleared and the 16-bit length,
+                     truncated at 0xFFFF, followed by the payload) for a segmented message,
+                     frame itself if it is not segmented, None while more packets are expected
+        '''
+        first_byte = frame[0]
+        key = ((first_byte & ~UCI_PBF_MASK) << 8) | (frame[1] & 0x3F)
+        partial = self.partial.get(key)
+        if partial is None:
+            if not first_byte & UCI_PBF_MASK:
+                # not segmented
+                return frame
+            partial = _UciPartialMessage(self.capacity.get(key, self.initial_capacity))
+            partial.buffer[0] = first_byte & ~UCI_PBF_MASK
+            partial.buffer[1] = frame[1]
+            self.partial[key] = partial
+            self.pending += 1
+        end = len(frame) - crc_length
+        segment_length = end - UCI_PACKET_HEADER_SIZE
+        length = partial.length + segment_length
+        buffer = partial.buffer
+        if length > len(buffer):
+            buffer.extend(bytes(max(length, 2 * len(buffer)) - len(buffer)))
+            self.stats.grows += 1
+        buffer[partial.length:length] = frame[UCI_PACKET_HEADER_SIZE:end]
+        partial.length = length
+        partial.segments += 1
+        if first_byte & UCI_PBF_MASK:
+            return None
+        del self.partial[key]
+        self.pending -= 1
+        payload_length = length - UCI_PACKET_HEADER_SIZE
+        if payload_length > self.capacity.get(key, 0):
+            self.capacity[key] = payload_length
+        buffer[2] = min(payload_length, 0xFFFF) >> 8
+        buffer[3] = min(payload_length, 0xFFFF) & 0xFF
+        self.stats.messages += 1
+        self.stats.segments += partial.segments
+        if payload_length > self.stats.max_message_bytes:
+            self.stats.max_message_bytes = payload_length
+        return memoryview(buffer)[:length]
+
+    def reset(self):
+        '''
+            @brief drop the partial messages, e.g. after a reset of the device
+        '''
+        self.partial = {}
+        self.pending = 0